@@ -1,3 +1,4 @@
+from datetime import timedelta
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
@@ -25,12 +26,46 @@ def create_app(config_name='default'):
 
     # JWT configuration
     app.config.setdefault('JWT_SECRET_KEY', app.config.get('SECRET_KEY', 'change-this-jwt-secret'))
-    app.config.setdefault('JWT_ACCESS_TOKEN_EXPIRES', False)  # Token 不过期（开发环境）
+    app.config.setdefault('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))  # 短期 access token，过期后用 refresh token 换新
+    app.config.setdefault('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
     app.config.setdefault('JWT_TOKEN_LOCATION', ['headers'])  # 从请求头读取 token
     app.config.setdefault('JWT_HEADER_NAME', 'Authorization')  # Authorization 头
     app.config.setdefault('JWT_HEADER_TYPE', 'Bearer')  # Bearer token
     jwt.init_app(app)
 
+    from .services.ai_cache_service import init_ai_cache
+    init_ai_cache(app)
+
+    from .services.ai_service import init_deepseek_client
+    init_deepseek_client(app)
+
+    from .services.document_service import init_document_extraction
+    init_document_extraction(app)
+
+    from .services.document_job_service import init_document_jobs
+    init_document_jobs(app)
+
+    from .services.password_service import init_password_hasher
+    init_password_hasher(app)
+
+    from .services.user_cache_service import init_user_cache
+    init_user_cache(app)
+
+    from .services.token_revocation_service import init_token_revocation
+    init_token_revocation(app)
+
+    from .services.dashboard_service import init_dashboard_cache
+    init_dashboard_cache(app)
+
+    from .services.notice_search_service import init_notice_search
+    init_notice_search(app)
+
+    from .services.courseware_search_service import init_courseware_search
+    init_courseware_search(app)
+
+    from .services.event_stream_service import init_event_stream
+    init_event_stream(app)
+
     # Register Blueprints
     from .api import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/api/auth')
@@ -47,4 +82,9 @@ def create_app(config_name='default'):
     from .api import ai_assistant as ai_blueprint
     app.register_blueprint(ai_blueprint.ai, url_prefix='/api/ai')
 
+    from .services.rate_limit_service import init_rate_limiter, limit_blueprints
+    init_rate_limiter(app)
+    if app.config.get('RATE_LIMIT_DEFAULT'):
+        limit_blueprints(app, app.config.get('RATE_LIMITED_BLUEPRINTS') or app.blueprints.keys())
+
     return app
@@ -1,9 +1,25 @@
-from flask import request, jsonify
+import math
+from flask import Response, abort, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
 from datetime import datetime
 from . import admin_mgmt
 from app import db
 from app.models import Notice, User, Class, StudentProfile, Grade, Assignment, AssignmentSubmission
 from app.utils.decorators import jwt_required, role_required
+from app.utils.helpers import keyset_paginate, parse_page_limit, wants_pagination
+from app.services.grade_histogram_service import (
+    apply_student_change, delete_class_histograms, read_class_histogram, snapshot_student
+)
+from app.services.grade_analytics_service import DEFAULT_PERCENTILES, compute_grade_analytics, fetch_grade_rows
+from app.services.grade_import_service import import_grades, iter_upload_rows
+from app.services.dashboard_service import get_dashboard_summary
+from app.services.notice_search_service import apply_search
+from app.services.event_stream_service import broadcaster, format_sse, visible_to
+from app.services.token_revocation_service import is_token_expired, is_token_revoked
+from app.services.password_service import PasswordHasherBusy, hash_password, legacy_plaintext
+
+# Initial password of students created without one
+DEFAULT_STUDENT_PASSWORD = '123456'
 def _sync_student_average(student_id, term='current'):
     """Recalculate and persist a student's average score for the specified term."""
     grades = Grade.query.filter_by(student_id=student_id, term=term).all()
@@ -17,6 +33,16 @@ def _sync_student_average(student_id, term='current'):
     return avg_score
 
 
+def _author_dict(author_obj):
+    if not author_obj:
+        return None
+    return {
+        'id': author_obj.id,
+        'full_name': author_obj.full_name,
+        'username': author_obj.username
+    }
+
+
 @admin_mgmt.route('/notices', methods=['GET'])
 @jwt_required
 def get_notices(*args, **kwargs):
@@ -24,38 +50,51 @@ def get_notices(*args, **kwargs):
     # Support filtering by priority and category
     priority = request.args.get('priority')
     category = request.args.get('category')
+    # Full-text search over title and content
+    q = (request.args.get('q') or '').strip()
     
-    query = Notice.query
+    # Authors are loaded through the same query
+    query = db.session.query(Notice, User).outerjoin(User, User.id == Notice.author_id)
     if priority:
-        query = query.filter_by(priority=priority)
+        query = query.filter(Notice.priority == priority)
     if category:
-        query = query.filter_by(category=category)
+        query = query.filter(Notice.category == category)
+    if q:
+        query = apply_search(query, q)
     
-    notices = query.order_by(Notice.date.desc(), Notice.created_at.desc()).all()
+    # Cursor pagination (opt-in via `limit`/`cursor`), ordered by date, created_at then id
+    paginate = wants_pagination(request.args)
+    next_cursor = None
+    if paginate:
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+            rows, next_cursor = keyset_paginate(
+                query,
+                [Notice.date, Notice.created_at, Notice.id],
+                limit,
+                cursor=request.args.get('cursor'),
+                key_func=lambda row: [row[0].date, row[0].created_at, row[0].id]
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    else:
+        rows = query.order_by(Notice.date.desc(), Notice.created_at.desc(), Notice.id.desc()).all()
     
     result = []
-    for notice in notices:
-        author = None
-        if notice.author_id:
-            author_obj = User.query.get(notice.author_id)
-            if author_obj:
-                author = {
-                    'id': author_obj.id,
-                    'full_name': author_obj.full_name,
-                    'username': author_obj.username
-                }
-        
+    for notice, author_obj in rows:
         result.append({
             'id': notice.id,
             'title': notice.title,
             'content': notice.content,
-            'author': author,
+            'author': _author_dict(author_obj),
             'date': notice.date.strftime('%Y-%m-%d') if notice.date else None,
             'priority': notice.priority,
             'category': notice.category,
             'created_at': notice.created_at.isoformat() if notice.created_at else None
         })
     
+    if paginate:
+        return jsonify({'items': result, 'next_cursor': next_cursor}), 200
     return jsonify(result), 200
 
 
@@ -63,23 +102,18 @@ def get_notices(*args, **kwargs):
 @jwt_required
 def get_notice(notice_id, *args, **kwargs):
     """Get a single notice detail"""
-    notice = Notice.query.get_or_404(notice_id)
-    
-    author = None
-    if notice.author_id:
-        author_obj = User.query.get(notice.author_id)
-        if author_obj:
-            author = {
-                'id': author_obj.id,
-                'full_name': author_obj.full_name,
-                'username': author_obj.username
-            }
+    row = db.session.query(Notice, User).outerjoin(
+        User, User.id == Notice.author_id
+    ).filter(Notice.id == notice_id).first()
+    if row is None:
+        abort(404)
+    notice, author_obj = row
     
     return jsonify({
         'id': notice.id,
         'title': notice.title,
         'content': notice.content,
-        'author': author,
+        'author': _author_dict(author_obj),
         'date': notice.date.strftime('%Y-%m-%d') if notice.date else None,
         'priority': notice.priority,
         'category': notice.category,
@@ -384,7 +418,10 @@ def delete_class(class_id, *args, **kwargs):
         # 3) Delete the student records of this class (break the relationship)
         StudentProfile.query.filter_by(class_id=class_id).delete()
         
-        # 4) Delete the class itself
+        # 4) Delete the precomputed grade histograms of the class
+        delete_class_histograms(class_id)
+        
+        # 5) Delete the class itself
         db.session.delete(class_obj)
         db.session.commit()
         return jsonify({'message': 'Class deleted successfully'}), 200
@@ -407,47 +444,51 @@ def get_class_students(class_id, *args, **kwargs):
     if current_user_role == 'teacher' and class_obj.teacher_id != current_user_id:
         return jsonify({'message': 'You can only view your own classes'}), 403
     
-    # Get all student profiles in the class, ordered by student number
-    profiles = StudentProfile.query.filter_by(class_id=class_id).order_by(StudentProfile.student_no).all()
+    # Profiles joined to their users in one query, ordered by student number
+    rows = db.session.query(StudentProfile, User).join(
+        User, User.id == StudentProfile.user_id
+    ).filter(
+        StudentProfile.class_id == class_id
+    ).order_by(StudentProfile.student_no).all()
+    
+    # All current-term grades for the class in one query, pivoted to {user_id: {subject: score}}
+    grades_by_student = {}
+    if rows:
+        grades = db.session.query(Grade.student_id, Grade.subject, Grade.score).join(
+            StudentProfile, StudentProfile.user_id == Grade.student_id
+        ).filter(
+            StudentProfile.class_id == class_id,
+            Grade.term == 'current'
+        ).all()
+        for student_id, subject, score in grades:
+            if score is not None:
+                grades_by_student.setdefault(student_id, {})[subject] = float(score)
     
     result = []
-    for profile in profiles:
-        user = User.query.get(profile.user_id)
-        if user:
-            # Get the student's grades for three subjects (only for the current term)
-            grades = Grade.query.filter_by(student_id=profile.user_id, term='current').all()
-            grades_dict = {}
-            for grade in grades:
-                if grade.score is not None:
-                    grades_dict[grade.subject] = float(grade.score)
-            
-            # Calculate average score (only for subjects with grades)
-            avg_score = None
-            scores = []
-            for subject in ['chinese', 'math', 'english']:
-                if subject in grades_dict:
-                    scores.append(grades_dict[subject])
-            if scores:
-                avg_score = sum(scores) / len(scores)
-            
-            computed_avg = round(avg_score, 2) if avg_score is not None else None
-            result.append({
-                'id': profile.id,
-                'user_id': profile.user_id,
-                'student_no': profile.student_no,
-                'full_name': user.full_name,
-                'username': user.username,
-                'email': user.email,
-                'status': profile.status,
-                'attendance_rate': float(profile.attendance_rate) if profile.attendance_rate else 0,
-                'avg_grade': float(profile.avg_grade) if profile.avg_grade not in (None, '') else computed_avg,
-                'grades': {
-                    'chinese': grades_dict.get('chinese'),
-                    'math': grades_dict.get('math'),
-                    'english': grades_dict.get('english'),
-                    'average': computed_avg
-                }
-            })
+    for profile, user in rows:
+        grades_dict = grades_by_student.get(profile.user_id, {})
+        
+        # Calculate average score (only for subjects with grades)
+        scores = [grades_dict[subject] for subject in ('chinese', 'math', 'english') if subject in grades_dict]
+        computed_avg = round(sum(scores) / len(scores), 2) if scores else None
+        
+        result.append({
+            'id': profile.id,
+            'user_id': profile.user_id,
+            'student_no': profile.student_no,
+            'full_name': user.full_name,
+            'username': user.username,
+            'email': user.email,
+            'status': profile.status,
+            'attendance_rate': float(profile.attendance_rate) if profile.attendance_rate else 0,
+            'avg_grade': float(profile.avg_grade) if profile.avg_grade not in (None, '') else computed_avg,
+            'grades': {
+                'chinese': grades_dict.get('chinese'),
+                'math': grades_dict.get('math'),
+                'english': grades_dict.get('english'),
+                'average': computed_avg
+            }
+        })
     
     return jsonify(result), 200
 
@@ -486,9 +527,12 @@ def add_student_to_class(class_id, *args, **kwargs):
         if User.query.filter_by(username=username).first():
             return jsonify({'message': 'Username already exists'}), 400
 
-        password_value = data.get('password_hash') or data.get('password') or 'hashed:123456'
-        if not str(password_value).startswith('hashed:'):
-            password_value = f'hashed:{password_value}'
+        # Legacy clients send 'hashed:<plaintext>'; either way only a real hash is stored
+        raw_password = legacy_plaintext(str(data.get('password_hash') or data.get('password') or DEFAULT_STUDENT_PASSWORD))
+        try:
+            password_value = hash_password(raw_password) if raw_password is not None else data.get('password_hash')
+        except PasswordHasherBusy:
+            return jsonify({'message': 'Server is busy, please try again shortly'}), 503
 
         user = User(
             username=username,
@@ -505,6 +549,9 @@ def add_student_to_class(class_id, *args, **kwargs):
 
     # Check if a profile already exists
     existing_profile = StudentProfile.query.filter_by(user_id=user_id).first()
+    # Remember where the student's scores were counted before, for the grade histograms
+    previous_class_id = existing_profile.class_id if existing_profile else None
+    scores_before = snapshot_student(user_id)
     if existing_profile:
         existing_profile.class_id = class_id
     else:
@@ -552,6 +599,7 @@ def add_student_to_class(class_id, *args, **kwargs):
                 db.session.delete(existing_grade)
 
     avg_score = _sync_student_average(user_id, term)
+    apply_student_change(user_id, previous_class_id, scores_before, class_id, snapshot_student(user_id))
 
     # Update the number of students in the class
     class_obj.students_count = StudentProfile.query.filter_by(class_id=class_id).count()
@@ -637,7 +685,9 @@ def remove_student_from_class(class_id, student_id, *args, **kwargs):
     profile = StudentProfile.query.filter_by(id=student_id, class_id=class_id).first_or_404()
     
     try:
+        scores_before = snapshot_student(profile.user_id)
         db.session.delete(profile)
+        apply_student_change(profile.user_id, class_id, scores_before, None, {})
         
         # Update the number of students in the class
         class_obj.students_count = StudentProfile.query.filter_by(class_id=class_id).count()
@@ -718,6 +768,7 @@ def update_student_grades(class_id, student_id, *args, **kwargs):
     data = request.get_json() or {}
     
     term = data.get('term', 'current')
+    scores_before = snapshot_student(profile.user_id, term)
     
     # Update or create grades for three subjects
     subjects = ['chinese', 'math', 'english']
@@ -753,12 +804,58 @@ def update_student_grades(class_id, student_id, *args, **kwargs):
     
     try:
         avg_score = _sync_student_average(profile.user_id, term)
+        apply_student_change(
+            profile.user_id, profile.class_id, scores_before,
+            profile.class_id, snapshot_student(profile.user_id, term)
+        )
         db.session.commit()
         return jsonify({'message': 'Grades updated successfully', 'avg_grade': avg_score}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Failed to update grades: {str(e)}'}), 500
 
+@admin_mgmt.route('/grades/import', methods=['POST'])
+@jwt_required
+@role_required('admin', 'teacher')
+def import_student_grades(*args, **kwargs):
+    """Bulk import grades from a CSV/XLSX upload (multipart 'file').
+    Columns: one of student_id / username / student_no, then either subject + score
+    or one column per subject (chinese, math, english); an optional term column
+    overrides the 'term' form field. Optional 'class_id' form field restricts the
+    import to one class (teachers are always restricted to their own classes).
+    Returns a per-row error report.
+    """
+    current_user_id = kwargs.get('current_user_id')
+    current_user_role = kwargs.get('current_user_role')
+
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'message': 'No file provided'}), 400
+    upload = request.files['file']
+
+    class_id = request.form.get('class_id', type=int)
+    if class_id is not None:
+        class_obj = Class.query.get_or_404(class_id)
+        if current_user_role == 'teacher' and class_obj.teacher_id != current_user_id:
+            return jsonify({'message': 'You can only manage your own classes'}), 403
+
+    try:
+        rows = iter_upload_rows(upload.filename, upload.stream)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        report = import_grades(
+            rows,
+            default_term=request.form.get('term') or 'current',
+            class_id=class_id,
+            teacher_id=current_user_id if current_user_role == 'teacher' else None
+        )
+        return jsonify(report), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to import grades: {str(e)}'}), 500
+
+
 @admin_mgmt.route('/users', methods=['GET'])
 @jwt_required
 @role_required('admin')
@@ -771,7 +868,22 @@ def get_users(*args, **kwargs):
     if role:
         query = query.filter_by(role=role)
     
-    users = query.order_by(User.created_at.desc()).all()
+    # Cursor pagination (opt-in via `limit`/`cursor`), ordered by created_at then id
+    paginate = wants_pagination(request.args)
+    next_cursor = None
+    if paginate:
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+            users, next_cursor = keyset_paginate(
+                query,
+                [User.created_at, User.id],
+                limit,
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    else:
+        users = query.order_by(User.created_at.desc(), User.id.desc()).all()
     
     result = []
     for user in users:
@@ -786,16 +898,41 @@ def get_users(*args, **kwargs):
             'created_at': user.created_at.isoformat() if user.created_at else None
         })
     
+    if paginate:
+        return jsonify({'items': result, 'next_cursor': next_cursor}), 200
     return jsonify(result), 200
 
 
+@admin_mgmt.route('/users/<int:user_id>/status', methods=['PUT'])
+@jwt_required
+@role_required('admin')
+def update_user_status(user_id, *args, **kwargs):
+    """Activate or deactivate a user; a deactivated user's tokens stop working immediately"""
+    current_user_id = kwargs.get('current_user_id')
+    data = request.get_json() or {}
+    if 'is_active' not in data:
+        return jsonify({'message': 'is_active is required'}), 400
+    if user_id == current_user_id:
+        return jsonify({'message': 'You cannot change your own status'}), 400
+
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    try:
+        user.is_active = bool(data.get('is_active'))
+        db.session.commit()
+        return jsonify({'id': user.id, 'is_active': user.is_active}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to update user status: {str(e)}'}), 500
+
+
 @admin_mgmt.route('/classes/<int:class_id>/grade-distribution', methods=['GET'])
 @jwt_required
 @role_required('admin', 'teacher')
 def get_class_grade_distribution(class_id, *args, **kwargs):
     """Return the grade distribution for a class (0-100, one bucket per point). Includes four curves for Chinese, Math, English, and Average."""
-    from math import floor
-
     current_user_id = kwargs.get('current_user_id')
     current_user_role = kwargs.get('current_user_role')
 
@@ -806,56 +943,8 @@ def get_class_grade_distribution(class_id, *args, **kwargs):
 
     term = request.args.get('term', 'current')
 
-    # The list of all student user_ids in this class
-    profiles = StudentProfile.query.filter_by(class_id=class_id).all()
-    student_ids = [p.user_id for p in profiles]
-    if not student_ids:
-        zeros = [0] * 101
-        return jsonify({
-            'labels': list(range(101)),
-            'chinese': zeros,
-            'math': zeros,
-            'english': zeros,
-            'average': zeros
-        }), 200
-
-    # Check the grades for this semester
-    grades = Grade.query.filter(Grade.student_id.in_(student_ids), Grade.term == term).all()
-
-    # The organization is represented as {student_id: {subject: score}}
-    stu_scores = {}
-    for g in grades:
-        try:
-            score_val = float(g.score) if g.score is not None else None
-        except Exception:
-            score_val = None
-        if score_val is None:
-            continue
-        # Trim to 0-10
-        score_val = max(0.0, min(100.0, score_val))
-        stu_scores.setdefault(g.student_id, {})[g.subject] = score_val
-
-    def empty_bucket():
-        return [0] * 101
-
-    buckets = {
-        'chinese': empty_bucket(),
-        'math': empty_bucket(),
-        'english': empty_bucket(),
-        'average': empty_bucket(),
-    }
-
-    for sid, subj_map in stu_scores.items():
-        for subj in ('chinese', 'math', 'english'):
-            if subj in subj_map:
-                idx = int(round(subj_map[subj]))
-                buckets[subj][idx] += 1
-        # Average score (calculated if there is any subject)
-        vals = [v for k, v in subj_map.items() if k in ('chinese', 'math', 'english')]
-        if vals:
-            avg = sum(vals) / len(vals)
-            idx = int(round(max(0.0, min(100.0, avg))))
-            buckets['average'][idx] += 1
+    # Read the precomputed histogram (kept up to date on every grade write)
+    buckets = read_class_histogram(class_id, term)
 
     return jsonify({
         'labels': list(range(101)),
@@ -866,6 +955,72 @@ def get_class_grade_distribution(class_id, *args, **kwargs):
     }), 200
 
 
+@admin_mgmt.route('/grade-analytics', methods=['GET'])
+@jwt_required
+@role_required('admin', 'teacher')
+def get_grade_analytics(*args, **kwargs):
+    """Grade analytics across many classes, a grade level or the whole school for one term.
+    Query params:
+    - term: defaults to 'current'
+    - class_ids: comma-separated class ids (optional)
+    - grade: restrict to classes of this grade level (optional)
+    - bucket_width: histogram bucket width in points, 1-100 (default 10)
+    - percentiles: comma-separated percentiles, 0-100 (default 10,25,50,75,90)
+    Without class_ids/grade the whole school is included (teachers: their own classes only).
+    """
+    current_user_id = kwargs.get('current_user_id')
+    current_user_role = kwargs.get('current_user_role')
+
+    term = request.args.get('term', 'current')
+    try:
+        bucket_width = int(request.args.get('bucket_width', 10))
+        if bucket_width < 1 or bucket_width > 100:
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': 'bucket_width must be an integer between 1 and 100'}), 400
+    try:
+        percentiles_raw = request.args.get('percentiles')
+        percentiles = [float(p) for p in percentiles_raw.split(',') if p.strip()] if percentiles_raw else list(DEFAULT_PERCENTILES)
+        if any(not math.isfinite(p) or p < 0 or p > 100 for p in percentiles):
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': 'percentiles must be numbers between 0 and 100'}), 400
+    try:
+        class_ids_raw = request.args.get('class_ids')
+        requested_ids = [int(c) for c in class_ids_raw.split(',') if c.strip()] if class_ids_raw else None
+    except ValueError:
+        return jsonify({'message': 'class_ids must be a comma-separated list of integers'}), 400
+
+    # Resolve the classes in scope
+    class_query = db.session.query(Class.id, Class.name, Class.grade)
+    if current_user_role == 'teacher':
+        class_query = class_query.filter(Class.teacher_id == current_user_id)
+    if requested_ids is not None:
+        class_query = class_query.filter(Class.id.in_(requested_ids))
+    grade_level = request.args.get('grade')
+    if grade_level:
+        class_query = class_query.filter(Class.grade == grade_level)
+    classes = {c.id: c for c in class_query.all()}
+
+    if requested_ids is not None and set(requested_ids) - set(classes):
+        return jsonify({'message': 'Some classes do not exist or are not yours'}), 403
+
+    # One bulk fetch of all scores, then vectorized statistics
+    analytics = compute_grade_analytics(
+        fetch_grade_rows(term, list(classes)),
+        bucket_width=bucket_width,
+        percentiles=percentiles
+    )
+    for summary in analytics['classes']:
+        class_obj = classes.get(summary['class_id'])
+        summary['name'] = class_obj.name if class_obj else None
+        summary['grade'] = class_obj.grade if class_obj else None
+
+    analytics['term'] = term
+    analytics['class_ids'] = sorted(classes)
+    return jsonify(analytics), 200
+
+
 # Dashboard summary (reducing multiple requests at the front end)
 @admin_mgmt.route('/dashboard/summary', methods=['GET'])
 @jwt_required
@@ -874,53 +1029,62 @@ def dashboard_summary(*args, **kwargs):
     current_user_id = kwargs.get('current_user_id')
     current_user_role = kwargs.get('current_user_role')
 
-    class_count = 0
-    total_students = 0
-
-    if current_user_role in ('admin', 'teacher'):
-        # Class level
-        class_query = Class.query
-        if current_user_role == 'teacher':
-            class_query = class_query.filter_by(teacher_id=current_user_id)
-        classes = class_query.all()
+    # Cached per (role, user); notice/class/assignment writes invalidate it
+    return jsonify(get_dashboard_summary(current_user_role, current_user_id)), 200
 
-        class_count = len(classes)
-        total_students = sum([(c.students_count or 0) for c in classes])
 
-        # Pending tasks (only the teacher counts the ones they have assigned)
-        assignment_query = Assignment.query.filter_by(status='pending')
-        if current_user_role == 'teacher':
-            assignment_query = assignment_query.filter_by(teacher_id=current_user_id)
-        pending_assignments = assignment_query.count()
-
-    else:
-        # Student: Based on the statistics of one's own class and the school-wide announcements.
+@admin_mgmt.route('/events/stream', methods=['GET'])
+def event_stream():
+    """Server-sent events: notice create/update/delete and dashboard counter deltas.
+    EventSource cannot set headers, so the token may also be passed as ?jwt=<token>.
+    Events: notice_created, notice_updated, notice_deleted, counters (deltas), resync (refetch).
+    """
+    try:
+        verify_jwt_in_request(locations=['headers', 'query_string'])
+        claims = get_jwt()
+        current_user_role = claims.get('role')
+        current_user_id = int(get_jwt_identity())
+    except Exception:
+        return jsonify({'message': 'Token is missing or invalid'}), 401
+
+    def student_class_id():
         profile = StudentProfile.query.filter_by(user_id=current_user_id).first()
-        if profile and profile.class_id:
-            class_count = 1
-            class_obj = Class.query.get(profile.class_id)
-            total_students = class_obj.students_count if class_obj and class_obj.students_count else 0
-        else:
-            class_count = 0
-            total_students = 0
-        # Consistent with the Assignments page: Students see the total number of all pending assignments
-        pending_assignments = Assignment.query.filter_by(status='pending').count()
-
-    # Notice (Shared by All Characters)
-    total_notices = Notice.query.count()
-    recent = Notice.query.order_by(Notice.date.desc(), Notice.created_at.desc()).limit(5).all()
-    recent_notices = [{
-        'id': n.id,
-        'title': n.title,
-        'date': n.date.strftime('%Y-%m-%d') if n.date else None,
-        'priority': n.priority,
-        'category': n.category
-    } for n in recent]
+        class_id = profile.class_id if profile else None
+        # Do not hold a pooled connection for the lifetime of the stream
+        db.session.close()
+        return class_id
 
-    return jsonify({
-        'class_count': class_count,
-        'total_students': total_students,
-        'pending_assignments': pending_assignments,
-        'total_notices': total_notices,
-        'recent_notices': recent_notices
-    }), 200
+    class_id = student_class_id() if current_user_role == 'student' else None
+    heartbeat = current_app.config.get('EVENT_STREAM_HEARTBEAT', 15)
+    subscription = broadcaster.subscribe()
+
+    def generate():
+        nonlocal class_id
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    # Tokens are only checked on connect; end the stream once this one
+                    # expires or is revoked, and let the client reconnect with a fresh one
+                    revoked = is_token_expired(claims) or is_token_revoked(claims)
+                    db.session.close()
+                    if revoked:
+                        return
+                    # Comment line keeps proxies from closing the idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                message = visible_to(message, current_user_role, current_user_id, class_id)
+                if message is None:
+                    continue
+                if message['event'] == 'resync' and current_user_role == 'student':
+                    class_id = student_class_id()
+                yield format_sse(message)
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            broadcaster.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
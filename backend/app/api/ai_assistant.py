@@ -1,23 +1,48 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-import os
-from app.services.ai_service import DeepseekAPIService
-from app.services.document_service import DocumentAnalysisService
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from app.services.ai_service import UNAVAILABLE_MESSAGE, DeepseekAPIService, upstream_stats
+from app.services.event_stream_service import format_sse
+from app.services.ai_cache_service import response_cache
+from app.utils.decorators import jwt_required, role_required
+from app.services.document_job_service import (
+    DocumentJobQueueFull, STATUS_DONE, STATUS_FAILED, create_document_job, job_analysis, job_to_dict
+)
+from app import db
+from app.models import AIFile
+from app.services.document_service import EXTRACTORS, extraction_pool
+from app.services.courseware_search_service import search_courseware
+from app.utils.resilience import ServiceUnavailable
 
 ai = Blueprint('ai', __name__)
 
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'docx'}
+# Every format with a registered text extractor: docx, pptx, pdf, txt, md
+ALLOWED_EXTENSIONS = set(EXTRACTORS)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+
+def _unavailable(error):
+    """503 for calls shed by the DeepSeek bulkhead or circuit breaker."""
+    response = jsonify({'error': UNAVAILABLE_MESSAGE})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @ai.route('/chat', methods=['POST'])
 def chat():
     """
     Handle chat requests to the AI assistant.
-    Expects JSON: {"message": "user's question"}
+    Expects JSON: {"message": "user's question", "stream": false, "cache": true}
     Returns JSON: {"response": "AI's answer"}
+
+    Repeated questions are answered from the response cache; "cache": false
+    (or a Cache-Control: no-cache header) forces a fresh answer.
+
+    With "stream": true (or Accept: text/event-stream) the answer is relayed
+    as server-sent events while it is generated:
+    `token` events {"content": "..."}, then `done` {} or `error` {"error": "..."}.
+
+    When too many AI calls are already in flight, or DeepSeek keeps failing,
+    the request is rejected at once with 503 and a Retry-After header.
     """
     try:
         data = request.get_json()
@@ -26,21 +51,84 @@ def chat():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Call DeepSeek API
+        use_cache = data.get('cache', True) is not False and 'no-cache' not in request.headers.get('Cache-Control', '')
         ai_service = DeepseekAPIService()
-        response = ai_service.generate_text(user_message)
+        if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+            return _stream_chat(ai_service, user_message, use_cache)
+
+        # Call DeepSeek API
+        response = ai_service.generate_text(user_message, use_cache=use_cache)
         
         return jsonify({'response': response}), 200
-        
+
+    except ServiceUnavailable as e:
+        return _unavailable(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def _stream_chat(ai_service, user_message, use_cache):
+    tokens = ai_service.stream_text(user_message, use_cache=use_cache)
+    # Start the upstream call before answering, so a shed call still gets a plain 503
+    try:
+        first = next(tokens, None)
+        first_error = None
+    except ServiceUnavailable as e:
+        return _unavailable(e)
+    except Exception as e:
+        first, first_error = None, e
+
+    def generate():
+        event_id = 0
+        try:
+            if first_error is not None:
+                raise first_error
+            if first is not None:
+                event_id += 1
+                yield format_sse({'id': event_id, 'event': 'token', 'data': {'content': first}})
+            for content in tokens:
+                event_id += 1
+                yield format_sse({'id': event_id, 'event': 'token', 'data': {'content': content}})
+            yield format_sse({'id': event_id + 1, 'event': 'done', 'data': {}})
+        except Exception as e:
+            current_app.logger.error(f"DeepSeek API streaming error: {str(e)}")
+            yield format_sse({'id': event_id + 1, 'event': 'error', 'data': {'error': UNAVAILABLE_MESSAGE}})
+        finally:
+            # Runs on GeneratorExit too: when the client disconnects the server closes
+            # this generator, and closing the token stream aborts the upstream request
+            tokens.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@ai.route('/cache/stats', methods=['GET'])
+@jwt_required
+@role_required('admin')
+def cache_stats(*args, **kwargs):
+    """Hit/miss metrics of this worker's AI response cache"""
+    return jsonify(response_cache.stats()), 200
+
+
+@ai.route('/upstream/stats', methods=['GET'])
+@jwt_required
+@role_required('admin')
+def upstream_status(*args, **kwargs):
+    """Bulkhead occupancy and circuit breaker state of this worker's DeepSeek calls"""
+    return jsonify(upstream_stats()), 200
+
+
 @ai.route('/analyze-document', methods=['POST'])
-def analyze_document():
+@role_required('admin', 'teacher')
+def analyze_document(*args, **kwargs):
     """
-    Analyze uploaded courseware document.
-    Expects: multipart/form-data with 'file' field
-    Returns: JSON with analysis results
+    Submit uploaded courseware for analysis.
+    Expects: multipart/form-data with 'file' field, optional 'refresh' ('true'
+    re-analyzes a document whose content was analyzed before)
+    Returns: 202 with the job (file_id, status); poll GET /documents/<file_id>
+    and fetch the analysis from GET /documents/<file_id>/result
     """
     try:
         # Check if file is present
@@ -53,31 +141,79 @@ def analyze_document():
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Only .docx files are supported'}), 400
-        
-        # Create upload directory if it doesn't exist
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # Save file securely
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        
-        try:
-            # Analyze document
-            doc_service = DocumentAnalysisService()
-            text_content = doc_service.extract_text_from_docx(filepath)
-            analysis = doc_service.analyze_document(text_content)
-            
-            return jsonify({
-                'success': True,
-                'analysis': analysis
-            }), 200
-            
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        
+            return jsonify({'error': f"Supported file types: {', '.join(sorted(ALLOWED_EXTENSIONS))}"}), 400
+
+        file_type = file.filename.rsplit('.', 1)[1].lower()
+        force_refresh = (request.form.get('refresh') or request.args.get('refresh', '')).lower() in ('1', 'true')
+        ai_file = create_document_job(kwargs.get('current_user_id'), file, file_type, force_refresh=force_refresh)
+        return jsonify(job_to_dict(ai_file)), 202
+
+    except DocumentJobQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@ai.route('/documents/stats', methods=['GET'])
+@jwt_required
+@role_required('admin')
+def extraction_stats(*args, **kwargs):
+    """Per-format text extraction counts and timings of this worker"""
+    return jsonify(extraction_pool.metrics.stats()), 200
+
+
+@ai.route('/documents/search', methods=['GET'])
+@role_required('admin', 'teacher')
+def search_documents(*args, **kwargs):
+    """
+    Search the text of previously uploaded courseware.
+    Query: q (required), limit (default 10, at most 50)
+    Returns: {"results": [{file_id, file_name, file_type, status, score, snippet, created_at}]},
+    best match first. Teachers search their own files, admins every file.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    user_id = None if kwargs.get('current_user_role') == 'admin' else kwargs.get('current_user_id')
+    return jsonify({'results': search_courseware(query, user_id=user_id, limit=limit)}), 200
+
+
+def _get_own_file(file_id, user_id, role):
+    ai_file = db.session.get(AIFile, file_id)
+    if ai_file is None or (role != 'admin' and ai_file.user_id != user_id):
+        return None
+    return ai_file
+
+
+@ai.route('/documents/<int:file_id>', methods=['GET'])
+@role_required('admin', 'teacher')
+def get_document_job(file_id, *args, **kwargs):
+    """Status of an analysis job: uploaded, processing, done or failed"""
+    ai_file = _get_own_file(file_id, kwargs.get('current_user_id'), kwargs.get('current_user_role'))
+    if ai_file is None:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(job_to_dict(ai_file)), 200
+
+
+@ai.route('/documents/<int:file_id>/result', methods=['GET'])
+@role_required('admin', 'teacher')
+def get_document_result(file_id, *args, **kwargs):
+    """
+    Analysis of a finished job: 200 with the analysis when done, 202 with the
+    job while it is still running, 500 with the error when it failed.
+    """
+    ai_file = _get_own_file(file_id, kwargs.get('current_user_id'), kwargs.get('current_user_role'))
+    if ai_file is None:
+        return jsonify({'error': 'Document not found'}), 404
+    if ai_file.status == STATUS_FAILED:
+        return jsonify({'error': ai_file.error_message or 'Analysis failed'}), 500
+    if ai_file.status != STATUS_DONE:
+        return jsonify(job_to_dict(ai_file)), 202
+    return jsonify({
+        'success': True,
+        'file_id': ai_file.id,
+        'analysis': job_analysis(ai_file)
+    }), 200
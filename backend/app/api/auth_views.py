@@ -1,14 +1,26 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_jwt, verify_jwt_in_request
 from sqlalchemy.exc import SQLAlchemyError
 from . import auth
 from app import db
 from app.models import User, UserPreferences
 from app.utils.decorators import jwt_required, get_current_user
+from app.services.token_revocation_service import revoke_tokens
+from app.services.user_cache_service import get_user
+from app.services.rate_limit_service import rate_limit, reset_rate_limit
+from app.services.password_service import PasswordHasherBusy, hash_password, needs_rehash, verify_password
 import traceback
 
 
+def _login_username():
+    # Read from the body only; rate limiting must not query the database
+    username = (request.get_json(silent=True) or {}).get('username')
+    return str(username).strip().lower() if username else None
+
+
 @auth.route('/login', methods=['POST'])
+@rate_limit('login-ip', 'LOGIN_RATE_LIMIT_PER_IP')
+@rate_limit('login-user', 'LOGIN_RATE_LIMIT_PER_USERNAME', key_func=_login_username)
 def login():
     try:
         data = request.get_json() or {}
@@ -30,15 +42,39 @@ def login():
                 'error': str(e)
             }), 500
 
-        if not user or not _verify_password(user.password_hash, password):
+        # Hashing runs on a bounded pool; when it is saturated, shed load instead of queueing
+        try:
+            password_ok = user is not None and verify_password(user.password_hash, password)
+        except PasswordHasherBusy:
+            return jsonify({'message': 'Too many concurrent logins, please try again shortly'}), 503
+
+        if not password_ok:
             return jsonify({'message': 'Invalid username or password'}), 401
 
+        if not user.is_active:
+            return jsonify({'message': 'Account is disabled'}), 403
+
+        # A successful login clears the failed attempts counted against this username
+        reset_rate_limit('login-user', _login_username())
+
+        if needs_rehash(user.password_hash):
+            # Upgrade legacy 'hashed:' values (or an outdated cost) now that the password is known
+            try:
+                user.password_hash = hash_password(password)
+                db.session.commit()
+            except (PasswordHasherBusy, SQLAlchemyError) as e:
+                # Not fatal: the login succeeds and the rehash is retried next time
+                db.session.rollback()
+                print(f"Password rehash skipped for user {user.id}: {str(e)}")
+
         additional_claims = {'role': user.role}
         # JWT identity (sub field) must be a string
         access_token = create_access_token(identity=str(user.id), additional_claims=additional_claims)
+        refresh_token = create_refresh_token(identity=str(user.id))
 
         return jsonify({
             'access_token': access_token,
+            'refresh_token': refresh_token,
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -58,6 +94,45 @@ def login():
         }), 500
 
 
+@auth.route('/refresh', methods=['POST'])
+def refresh():
+    """Exchange a refresh token (Authorization: Bearer <refresh_token>) for a new access token"""
+    try:
+        verify_jwt_in_request(refresh=True)
+        user_id = int(get_jwt()['sub'])
+    except Exception:
+        return jsonify({'message': 'Refresh token is missing or invalid'}), 401
+
+    # Role is re-read so a changed role takes effect on the next refresh
+    user = get_user(user_id)
+    if not user or not user.is_active:
+        return jsonify({'message': 'Refresh token is missing or invalid'}), 401
+
+    access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+    return jsonify({'access_token': access_token}), 200
+
+
+@auth.route('/logout', methods=['POST'])
+@jwt_required
+def logout():
+    """Revoke the current access token and, if given, the refresh token"""
+    claims = get_jwt()
+    payloads = [claims]
+
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            refresh_claims = None
+        # Only the caller's own refresh token can be revoked this way
+        if refresh_claims and refresh_claims.get('type') == 'refresh' and refresh_claims.get('sub') == claims.get('sub'):
+            payloads.append(refresh_claims)
+
+    revoke_tokens(*payloads)
+    return jsonify({'message': 'Logged out successfully'}), 200
+
+
 @auth.route('/me', methods=['GET'])
 @jwt_required
 def me():
@@ -123,19 +198,3 @@ def update_preferences():
 
     return jsonify({'message': 'Preferences updated successfully'}), 200
 
-
-def _verify_password(stored_hash: str, raw_password: str) -> bool:
-    """
-    Simple password verification helper.
-
-    - If stored_hash starts with 'hashed:', treat the suffix as plain text for demo purposes.
-    - Otherwise, compare directly (you can later replace with real hashing like werkzeug.security).
-    """
-    if not stored_hash:
-        return False
-
-    if stored_hash.startswith('hashed:'):
-        return stored_hash[len('hashed:'):] == raw_password
-
-    # Fallback: direct comparison
-    return stored_hash == raw_password
@@ -1,9 +1,11 @@
 from flask import request, jsonify
 from datetime import datetime
+from sqlalchemy import func
 from . import teacher_tasks
 from app import db
-from app.models import Assignment, Class, User
-from app.utils.decorators import jwt_required, role_required, get_current_user
+from app.models import Assignment, AssignmentSubmission, Class
+from app.utils.decorators import jwt_required, role_required
+from app.utils.helpers import keyset_paginate, parse_page_limit, wants_pagination
 
 
 @teacher_tasks.route('/assignments', methods=['GET'])
@@ -27,23 +29,52 @@ def get_assignments(*args, **kwargs):
     if subject:
         query = query.filter_by(subject=subject)
     
-    assignments = query.order_by(Assignment.due_date.desc()).all()
-    
-    # Count the completion status of each assignment
-    from app.models import AssignmentSubmission
+    # Submission counts are aggregated once per assignment and joined in,
+    # so the listing costs a single round trip regardless of its size
+    submitted_counts = db.session.query(
+        AssignmentSubmission.assignment_id.label('assignment_id'),
+        func.count(AssignmentSubmission.id).label('completed')
+    ).filter(
+        AssignmentSubmission.status == 'submitted'
+    ).group_by(AssignmentSubmission.assignment_id).subquery()
+
+    query = query.outerjoin(
+        Class, Class.id == Assignment.class_id
+    ).outerjoin(
+        submitted_counts, submitted_counts.c.assignment_id == Assignment.id
+    ).add_columns(
+        Class.id.label('joined_class_id'),
+        Class.students_count,
+        submitted_counts.c.completed
+    )
+
+    # Cursor pagination (opt-in via `limit`/`cursor`), ordered by due date then id
+    paginate = wants_pagination(request.args)
+    next_cursor = None
+    if paginate:
+        try:
+            limit = parse_page_limit(request.args.get('limit'))
+            rows, next_cursor = keyset_paginate(
+                query,
+                [Assignment.due_date, Assignment.id],
+                limit,
+                cursor=request.args.get('cursor'),
+                key_func=lambda row: [row[0].due_date, row[0].id]
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    else:
+        rows = query.order_by(Assignment.due_date.desc(), Assignment.id.desc()).all()
+
     result = []
-    for assignment in assignments:
+    for assignment, joined_class_id, students_count, completed in rows:
         total_students = 0
         completed_count = 0
-        
-        if assignment.class_id:
-            class_obj = Class.query.get(assignment.class_id)
-            if class_obj:
-                total_students = class_obj.students_count or 0
-                completed_count = AssignmentSubmission.query.filter_by(
-                    assignment_id=assignment.id,
-                    status='submitted'
-                ).count()
+
+        # Only assignments attached to an existing class report completion stats
+        if joined_class_id is not None:
+            total_students = students_count or 0
+            completed_count = completed or 0
         
         result.append({
             'id': assignment.id,
@@ -59,6 +90,8 @@ def get_assignments(*args, **kwargs):
             'created_at': assignment.created_at.isoformat() if assignment.created_at else None
         })
     
+    if paginate:
+        return jsonify({'items': result, 'next_cursor': next_cursor}), 200
     return jsonify(result), 200
 
 
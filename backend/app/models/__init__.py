@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
 
 
 class User(db.Model):
@@ -85,6 +86,9 @@ class Notice(db.Model):
 
 class Grade(db.Model):
     __tablename__ = 'grades'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'term', 'subject', name='uq_grades__student_term_subject'),
+    )
 
     id = db.Column('grade_id', db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -103,8 +107,16 @@ class AIFile(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(50))
     source = db.Column(db.String(20), default='upload')
-    status = db.Column(db.String(20), default='uploaded')
+    # uploaded -> processing -> done / failed, driven by document_job_service
+    status = db.Column(db.String(20), default='uploaded', index=True)
+    # SHA-256 of the extracted text; identical courseware reuses an earlier analysis
+    content_hash = db.Column(db.String(64), index=True)
+    # Extracted text, searchable via courseware_search_service; deferred so
+    # listing and polling jobs do not load it
+    text_content = db.deferred(db.Column(db.Text().with_variant(MEDIUMTEXT(), 'mysql')))
+    # JSON analysis result once done
     analysis_summary = db.Column(db.Text)
+    error_message = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -120,3 +132,32 @@ class UserPreferences(db.Model):
     email_alerts = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class GradeHistogram(db.Model):
+    __tablename__ = 'grade_histograms'
+    __table_args__ = (
+        db.UniqueConstraint('class_id', 'term', 'series', 'bucket', name='uq_grade_histograms__class_term_series_bucket'),
+    )
+
+    id = db.Column('histogram_id', db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.class_id'), nullable=False)
+    term = db.Column(db.String(50), nullable=False)
+    # 'chinese', 'math', 'english' or 'average'
+    series = db.Column(db.String(20), nullable=False)
+    # Rounded score 0-100
+    bucket = db.Column(db.SmallInteger, nullable=False)
+    student_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column('revoked_token_id', db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    # 'access' or 'refresh'
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    # Rows can be pruned once the token would have expired anyway
+    expires_at = db.Column(db.DateTime, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from app.utils.cache import TTLCache
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# Chance per store that the disk tier deletes expired rows
+_PRUNE_PROBABILITY = 0.01
+
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a prompt, so trivially different questions share an entry."""
+    return _WHITESPACE_RE.sub(' ', (prompt or '').strip()).casefold()
+
+
+def cache_key(prompt, system_prompt, model):
+    payload = json.dumps([model, system_prompt, normalize_prompt(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SQLiteResponseStore:
+    """Disk tier: responses in a local SQLite file, shared by the workers on a host and kept across restarts."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ai_responses ('
+                'key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._connection().execute(
+            'SELECT response, expires_at FROM ai_responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self.delete(key)
+            return None
+        return row[0], row[1]
+
+    def set(self, key, response, expires_at):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO ai_responses (key, response, expires_at) VALUES (?, ?, ?)',
+            (key, response, expires_at)
+        )
+        if random.random() < _PRUNE_PROBABILITY:
+            conn.execute('DELETE FROM ai_responses WHERE expires_at <= ?', (time.time(),))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM ai_responses WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM ai_responses')
+
+
+class ResponseCache:
+    """
+    Two-tier cache of AI answers: an in-memory LRU per worker, backed by an
+    optional disk store. A disk hit is promoted into memory for its remaining TTL.
+    """
+
+    def __init__(self, maxsize=1024, ttl=86400, store=None, enabled=True):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl, clock=time.time)
+        self.store = store
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        response = self.memory.get(key)
+        if response is not None:
+            self._count('memory_hits')
+            return response
+        if self.store is not None:
+            now = time.time()
+            entry = self.store.get(key, now)
+            if entry is not None:
+                response, expires_at = entry
+                self.memory.set(key, response, ttl=expires_at - now)
+                self._count('disk_hits')
+                return response
+        self._count('misses')
+        return None
+
+    def set(self, key, response):
+        if not self.enabled:
+            return
+        self.memory.set(key, response)
+        if self.store is not None:
+            self.store.set(key, response, time.time() + self.ttl)
+        self._count('stores')
+
+    def record_bypass(self):
+        self._count('bypassed')
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self):
+        """Hit/miss counters of this worker since start, and the memory tier size."""
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['memory_hits'] + counts['disk_hits'] + counts['misses']
+        counts['hit_rate'] = round((counts['memory_hits'] + counts['disk_hits']) / lookups, 4) if lookups else None
+        counts['memory_size'] = len(self.memory)
+        counts['disk_enabled'] = self.store is not None
+        counts['enabled'] = self.enabled
+        return counts
+
+
+response_cache = ResponseCache()
+
+
+def init_ai_cache(app):
+    """Configure the AI response cache from AI_CACHE_* settings."""
+    response_cache.enabled = app.config.get('AI_CACHE_ENABLED', True)
+    response_cache.ttl = app.config.get('AI_CACHE_TTL', 86400)
+    response_cache.memory = TTLCache(maxsize=app.config.get('AI_CACHE_SIZE', 1024), ttl=response_cache.ttl, clock=time.time)
+    disk_path = app.config.get('AI_CACHE_DISK_PATH')
+    if disk_path:
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        response_cache.store = SQLiteResponseStore(disk_path)
+    else:
+        response_cache.store = None
@@ -1,50 +1,289 @@
 import os
-from openai import OpenAI
+import random
+import sys
+import threading
+import time
+from openai import (
+    APIConnectionError, APITimeoutError, DefaultHttpxClient, InternalServerError, OpenAI, RateLimitError, Timeout
+)
 from flask import current_app
+from app.services.ai_cache_service import cache_key, response_cache
+from app.utils.resilience import Bulkhead, CircuitBreaker, ServiceUnavailable
+
+# System prompt: Restrict domain to education and ENFORCE ENGLISH responses
+EDUCATION_SYSTEM_PROMPT = (
+    "You are a professional educational AI assistant specialized in teaching design, student management, and course analysis."
+    "You MUST ALWAYS answer in ENGLISH."
+    "Only answer questions related to education, teaching, learning, and school management."
+    "If the user asks about non-educational topics (e.g., entertainment, sports), politely refuse and guide them back to educational topics."
+    "Your tone should be professional, encouraging, and helpful."
+)
+UNAVAILABLE_MESSAGE = "I apologize, but I'm currently unable to process your request. Please try again later."
+
+# Failures worth another attempt: network errors, timeouts, 429 and 5xx
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+_settings = {
+    'api_key': None,
+    'base_url': 'https://api.deepseek.com',
+    'model': 'deepseek-chat',
+    'connect_timeout': 5.0,
+    'read_timeout': 60.0,
+    'max_retries': 2,
+    'backoff_base': 0.5,
+    'backoff_max': 8.0,
+    'max_concurrency': 8,
+    'max_waiting': 16,
+    'queue_timeout': 5.0,
+    'breaker_failures': 5,
+    'breaker_reset': 30.0,
+    'keepalive_expiry': 30.0
+}
+_client = None
+_client_pid = None
+# Upstream calls are isolated from the rest of the worker: at most
+# max_concurrency in flight and max_waiting queued, the rest fail fast
+_bulkhead = Bulkhead(_settings['max_concurrency'], _settings['max_waiting'], _settings['queue_timeout'])
+_breaker = CircuitBreaker(_settings['breaker_failures'], _settings['breaker_reset'])
+_client_lock = threading.Lock()
+
+
+def _http_limits(**limits):
+    """
+    A Limits object of the HTTP library the installed SDK is built on:
+    httpx up to openai 2.x, httpx2 from 3.x on. The SDK rejects clients of
+    the other library, so it is taken from DefaultHttpxClient's base class.
+    """
+    http_library = sys.modules[DefaultHttpxClient.__bases__[0].__module__.split('.')[0]]
+    return http_library.Limits(**limits)
+
+
+def _build_client():
+    http_client = DefaultHttpxClient(
+        limits=_http_limits(
+            max_connections=_settings['max_concurrency'],
+            max_keepalive_connections=_settings['max_concurrency'],
+            keepalive_expiry=_settings['keepalive_expiry']
+        ),
+        timeout=Timeout(_settings['read_timeout'], connect=_settings['connect_timeout'])
+    )
+    return OpenAI(
+        api_key=_settings['api_key'],
+        base_url=_settings['base_url'],
+        http_client=http_client,
+        # Retries are handled by DeepseekAPIService so they share the concurrency limit
+        max_retries=0
+    )
+
+
+def get_shared_client():
+    """
+    The worker's single OpenAI client. Its connection pool keeps connections
+    (and their TLS sessions) alive between calls. A forked worker builds its
+    own, since connections cannot be shared across processes.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(_settings['backoff_max'], _settings['backoff_base'] * 2 ** attempt))
+
 
 class DeepseekAPIService:
     """
     Service layer for handling external API calls to Deepseek (LLM).
+    Cheap to construct: every instance shares the worker's pooled client.
     """
-    def __init__(self):
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        if not api_key:
-            current_app.logger.warning('DEEPSEEK_API_KEY not found in environment variables')
-        
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com"
-        )
-
-    def generate_text(self, prompt):
+    def __init__(self, client=None):
+        self.client = client or get_shared_client()
+        self.model = _settings['model']
+
+    def _request(self, messages, **kwargs):
+        """
+        Send a chat completions request while holding one of the worker's
+        `max_concurrency` bulkhead slots, retrying transient failures with
+        jittered backoff (outside the slot, so waiting retries do not block
+        others). Transient failures count towards the circuit breaker.
+
+        Returns:
+            tuple: (response, slot) - the caller must release the slot
+
+        Raises:
+            ServiceUnavailable: No slot freed up in time, or the circuit is open
+        """
+        attempt = 0
+        while True:
+            slot, breaker = _bulkhead, _breaker
+            slot.acquire()
+            try:
+                breaker.before_call()
+            except ServiceUnavailable:
+                slot.release()
+                raise
+            try:
+                response = self.client.chat.completions.create(model=self.model, messages=messages, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                slot.release()
+                breaker.record_failure()
+                if attempt >= _settings['max_retries']:
+                    raise
+                current_app.logger.warning(f"DeepSeek API retry {attempt + 1}: {type(e).__name__}: {str(e)}")
+            except Exception:
+                # Anything else (bad request, auth) means the API itself answered
+                slot.release()
+                breaker.record_success()
+                raise
+            else:
+                breaker.record_success()
+                return response, slot
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def create_completion(self, messages, **kwargs):
+        """
+        Call the chat completions API with at most `max_concurrency` calls in
+        flight per worker, retrying transient failures with jittered backoff.
+
+        Raises:
+            ServiceUnavailable: When the call is rejected by the bulkhead or circuit breaker
+            openai.OpenAIError: When the call still fails after the retries
+        """
+        response, slot = self._request(messages, **kwargs)
+        slot.release()
+        return response
+
+    def stream_completion(self, messages, **kwargs):
+        """
+        Yield the answer's text deltas as the API generates them (stream=True).
+
+        Only opening the stream is retried. Closing the generator (e.g. when
+        the browser disconnects) closes the upstream response, which stops
+        generation and frees the concurrency slot.
+        """
+        stream, slot = self._request(messages, stream=True, **kwargs)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except RETRYABLE_ERRORS:
+            _breaker.record_failure()
+            raise
+        finally:
+            stream.close()
+            slot.release()
+
+    def _chat_messages(self, prompt):
+        messages = [{"role": "system", "content": EDUCATION_SYSTEM_PROMPT}]
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def generate_text(self, prompt, use_cache=True):
         """
         Generate text response from DeepSeek API.
-        
+
         Args:
             prompt (str): User's input message
-            
+            use_cache (bool): Serve a cached answer to the same question when
+                available; False forces a fresh answer (which refreshes the cache)
+
         Returns:
             str: The AI's response.
-        """
-        # System prompt: Restrict domain to education and ENFORCE ENGLISH responses
-        system_prompt = (
-            "You are a professional educational AI assistant specialized in teaching design, student management, and course analysis."
-            "You MUST ALWAYS answer in ENGLISH."
-            "Only answer questions related to education, teaching, learning, and school management."
-            "If the user asks about non-educational topics (e.g., entertainment, sports), politely refuse and guide them back to educational topics."
-            "Your tone should be professional, encouraging, and helpful."
-        )
 
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.append({"role": "user", "content": prompt})
+        Raises:
+            ServiceUnavailable: When the call is shed by the bulkhead or circuit
+            breaker, so the caller can answer 503 instead of an apology
+        """
+        key = cache_key(prompt, EDUCATION_SYSTEM_PROMPT, self.model)
+        if use_cache:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
+        else:
+            response_cache.record_bypass()
 
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                stream=False
-            )
-            return response.choices[0].message.content
+            response = self.create_completion(self._chat_messages(prompt), stream=False)
+            content = response.choices[0].message.content
+        except ServiceUnavailable:
+            raise
         except Exception as e:
             current_app.logger.error(f"DeepSeek API error: {str(e)}")
-            return "I apologize, but I'm currently unable to process your request. Please try again later."
+            return UNAVAILABLE_MESSAGE
+        if content:
+            response_cache.set(key, content)
+        return content
+
+    def stream_text(self, prompt, use_cache=True):
+        """
+        Streaming counterpart of generate_text. A cached answer is yielded in
+        one piece; a fresh one is cached once it has streamed completely.
+
+        Args:
+            prompt (str): User's input message
+            use_cache (bool): As for generate_text
+
+        Yields:
+            str: Pieces of the AI's response, in order
+
+        Raises:
+            ServiceUnavailable: When the call is shed (before anything is yielded)
+            openai.OpenAIError: When the API fails; unlike generate_text the caller
+            decides how to report it, since part of the answer may already be sent
+        """
+        key = cache_key(prompt, EDUCATION_SYSTEM_PROMPT, self.model)
+        if use_cache:
+            cached = response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        else:
+            response_cache.record_bypass()
+
+        pieces = []
+        for content in self.stream_completion(self._chat_messages(prompt)):
+            pieces.append(content)
+            yield content
+        if pieces:
+            response_cache.set(key, ''.join(pieces))
+
+
+def upstream_stats():
+    """Bulkhead occupancy and circuit breaker state of this worker."""
+    return {'bulkhead': _bulkhead.stats(), 'circuit_breaker': _breaker.stats()}
+
+
+def init_deepseek_client(app):
+    """Apply the DEEPSEEK_* settings; the client itself is built on first use."""
+    global _client, _bulkhead, _breaker
+    _settings.update({
+        'api_key': app.config.get('DEEPSEEK_API_KEY'),
+        'base_url': app.config.get('DEEPSEEK_BASE_URL', _settings['base_url']),
+        'model': app.config.get('DEEPSEEK_MODEL', _settings['model']),
+        'connect_timeout': app.config.get('DEEPSEEK_CONNECT_TIMEOUT', _settings['connect_timeout']),
+        'read_timeout': app.config.get('DEEPSEEK_READ_TIMEOUT', _settings['read_timeout']),
+        'max_retries': app.config.get('DEEPSEEK_MAX_RETRIES', _settings['max_retries']),
+        'backoff_base': app.config.get('DEEPSEEK_BACKOFF_BASE', _settings['backoff_base']),
+        'backoff_max': app.config.get('DEEPSEEK_BACKOFF_MAX', _settings['backoff_max']),
+        'max_concurrency': app.config.get('DEEPSEEK_MAX_CONCURRENCY', _settings['max_concurrency']),
+        'max_waiting': app.config.get('DEEPSEEK_MAX_WAITING', _settings['max_waiting']),
+        'queue_timeout': app.config.get('DEEPSEEK_QUEUE_TIMEOUT', _settings['queue_timeout']),
+        'breaker_failures': app.config.get('DEEPSEEK_BREAKER_FAILURES', _settings['breaker_failures']),
+        'breaker_reset': app.config.get('DEEPSEEK_BREAKER_RESET', _settings['breaker_reset']),
+        'keepalive_expiry': app.config.get('DEEPSEEK_KEEPALIVE_EXPIRY', _settings['keepalive_expiry'])
+    })
+    if not _settings['api_key']:
+        app.logger.warning('DEEPSEEK_API_KEY not found in environment variables')
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _bulkhead = Bulkhead(_settings['max_concurrency'], _settings['max_waiting'], _settings['queue_timeout'])
+        _breaker = CircuitBreaker(_settings['breaker_failures'], _settings['breaker_reset'])
@@ -0,0 +1,338 @@
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import attributes, undefer
+from app import db
+from app.models import AIFile
+from app.services.notice_search_service import tokenize
+
+_PENDING_KEY = 'courseware_index_changes'
+_BULK_KEY = 'courseware_index_bulk_delete'
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 200
+# Files written per transaction while rebuilding the index
+REBUILD_BATCH = 200
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS {documents} ('
+    'file_id INTEGER PRIMARY KEY, user_id INTEGER, length INTEGER NOT NULL);'
+    'CREATE TABLE IF NOT EXISTS {postings} ('
+    'term TEXT NOT NULL, file_id INTEGER NOT NULL, tf INTEGER NOT NULL, '
+    'PRIMARY KEY (term, file_id)) WITHOUT ROWID;'
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class CoursewareIndex:
+    """
+    BM25 inverted index over the extracted text of uploaded courseware, kept
+    in a local SQLite file: postings (term, file, term frequency), document
+    lengths, and corpus totals. Adding or removing a file only touches that
+    file's postings, and a search reads just the postings of its terms.
+    """
+
+    def __init__(self, path=None):
+        self.configure(path)
+
+    def configure(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(
+                _SCHEMA.format(documents='documents', postings='postings')
+                + 'CREATE INDEX IF NOT EXISTS idx_postings__file_id ON postings (file_id);'
+            )
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            statements(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _delete(conn, file_id):
+        conn.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        conn.execute('DELETE FROM documents WHERE file_id = ?', (file_id,))
+
+    @staticmethod
+    def _insert(conn, file_id, user_id, text, documents='documents', postings='postings'):
+        counts = Counter(tokenize(text))
+        if not counts:
+            return
+        conn.execute(
+            f'INSERT INTO {documents} (file_id, user_id, length) VALUES (?, ?, ?)',
+            (file_id, user_id, sum(counts.values()))
+        )
+        conn.executemany(
+            f'INSERT INTO {postings} (term, file_id, tf) VALUES (?, ?, ?)',
+            [(term, file_id, tf) for term, tf in counts.items()]
+        )
+
+    def add(self, file_id, user_id, text):
+        """Index (or re-index) one file's text."""
+        def statements(conn):
+            self._delete(conn, file_id)
+            self._insert(conn, file_id, user_id, text)
+        self._write(statements)
+
+    def remove(self, file_id):
+        self._write(lambda conn: self._delete(conn, file_id))
+
+    def rebuild(self, files):
+        """
+        Replace the whole index with `files`, (file_id, user_id, text) rows.
+        They are indexed into separate tables in small batches, which are
+        then swapped in by one short transaction, so searches keep reading
+        the complete old index until the new one is ready.
+        """
+        conn = self._connection()
+        conn.executescript(
+            'DROP TABLE IF EXISTS documents_next; DROP TABLE IF EXISTS postings_next;'
+            + _SCHEMA.format(documents='documents_next', postings='postings_next')
+        )
+        batch = []
+
+        def flush(conn):
+            for file_id, user_id, text in batch:
+                self._insert(conn, file_id, user_id, text, 'documents_next', 'postings_next')
+
+        for row in files:
+            batch.append(row)
+            if len(batch) >= REBUILD_BATCH:
+                self._write(flush)
+                batch = []
+        self._write(flush)
+
+        def swap(conn):
+            conn.execute('DROP TABLE postings')
+            conn.execute('DROP TABLE documents')
+            conn.execute('ALTER TABLE documents_next RENAME TO documents')
+            conn.execute('ALTER TABLE postings_next RENAME TO postings')
+            conn.execute('CREATE INDEX idx_postings__file_id ON postings (file_id)')
+        self._write(swap)
+
+    def search(self, text, limit=10, user_id=None):
+        """
+        Rank indexed files against the query by BM25 (any query term may match).
+
+        Args:
+            user_id (int): Only rank this user's files; None ranks every file
+
+        Returns:
+            list: (file_id, score) pairs, best first
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        conn = self._connection()
+        total_docs, total_length = conn.execute('SELECT COUNT(*), SUM(length) FROM documents').fetchone()
+        if not total_docs:
+            return []
+        average_length = total_length / total_docs
+
+        scores = {}
+        for term in terms:
+            rows = conn.execute(
+                'SELECT p.file_id, p.tf, d.length, d.user_id FROM postings p '
+                'JOIN documents d ON d.file_id = p.file_id WHERE p.term = ?', (term,)
+            ).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (total_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            for file_id, tf, length, owner_id in rows:
+                if user_id is not None and owner_id != user_id:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                scores[file_id] = scores.get(file_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def stats(self):
+        conn = self._connection()
+        documents, total_length = conn.execute('SELECT COUNT(*), SUM(length) FROM documents').fetchone()
+        terms = conn.execute('SELECT COUNT(DISTINCT term) FROM postings').fetchone()[0]
+        return {'documents': documents, 'terms': terms, 'tokens': total_length or 0}
+
+
+courseware_index = CoursewareIndex()
+_rebuild_needed = threading.Event()
+_rebuild_worker_lock = threading.Lock()
+_rebuild_worker = None
+
+
+def make_snippet(text, query, width=SNIPPET_CHARS):
+    """About `width` characters of `text` around the first occurrence of a query term."""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in set(tokenize(query))]
+    positions = [position for position in positions if position >= 0]
+    start = max(min(positions) - width // 3, 0) if positions else 0
+    snippet = _WHITESPACE_RE.sub(' ', text[start:start + width]).strip()
+    if start > 0:
+        snippet = '…' + snippet
+    if start + width < len(text):
+        snippet += '…'
+    return snippet
+
+
+def rebuild_courseware_index():
+    """
+    Re-index every AIFile with extracted text, e.g. after a bulk delete or
+    when the index file was lost. Files changed while the rebuild ran are
+    indexed again afterwards; files deleted meanwhile may linger in the
+    index, but search_courseware skips them.
+
+    Returns:
+        int: Number of files indexed
+    """
+    _rebuild_needed.clear()
+    started_at = datetime.utcnow()
+    total = 0
+
+    def files():
+        nonlocal total
+        rows = db.session.query(AIFile.id, AIFile.user_id, AIFile.text_content) \
+            .filter(AIFile.text_content.isnot(None)).yield_per(REBUILD_BATCH)
+        for row in rows:
+            total += 1
+            yield row
+
+    courseware_index.rebuild(files())
+    changed = db.session.query(AIFile.id, AIFile.user_id, AIFile.text_content) \
+        .filter(AIFile.updated_at >= started_at).all()
+    for file_id, user_id, text_content in changed:
+        if text_content is None:
+            courseware_index.remove(file_id)
+        else:
+            courseware_index.add(file_id, user_id, text_content)
+    db.session.commit()
+    return total
+
+
+def _run_rebuilds(app):
+    while True:
+        _rebuild_needed.wait()
+        with app.app_context():
+            try:
+                rebuild_courseware_index()
+            except Exception as e:
+                app.logger.error(f"Courseware index rebuild failed: {str(e)}")
+
+
+def _schedule_rebuild():
+    """Rebuild the index on a background thread, never inside a request."""
+    global _rebuild_worker
+    _rebuild_needed.set()
+    with _rebuild_worker_lock:
+        if _rebuild_worker is None:
+            _rebuild_worker = threading.Thread(
+                target=_run_rebuilds, args=(current_app._get_current_object(),),
+                name='courseware-index-rebuild', daemon=True
+            )
+            _rebuild_worker.start()
+
+
+def search_courseware(query, user_id=None, limit=10):
+    """
+    Ranked courseware matching `query`, with a text snippet for each.
+
+    Args:
+        user_id (int): Only search this user's files; None searches all
+
+    Returns:
+        list: Dicts with file_id, file_name, file_type, status, score, snippet and created_at
+    """
+    ranked = courseware_index.search(query, limit=limit, user_id=user_id)
+    if not ranked:
+        return []
+    files = {
+        ai_file.id: ai_file
+        for ai_file in AIFile.query.options(undefer(AIFile.text_content))
+        .filter(AIFile.id.in_([file_id for file_id, _ in ranked])).all()
+    }
+    results = []
+    for file_id, score in ranked:
+        ai_file = files.get(file_id)
+        if ai_file is None or ai_file.text_content is None:
+            continue
+        results.append({
+            'file_id': ai_file.id,
+            'file_name': ai_file.file_name,
+            'file_type': ai_file.file_type,
+            'status': ai_file.status,
+            'score': round(score, 4),
+            'snippet': make_snippet(ai_file.text_content, query),
+            'created_at': ai_file.created_at.isoformat() if ai_file.created_at else None
+        })
+    return results
+
+
+def _collect_flush(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, AIFile) and attributes.get_history(obj, 'text_content').added:
+            pending[obj.id] = (obj.user_id, obj.text_content)
+    for obj in session.deleted:
+        if isinstance(obj, AIFile):
+            pending[obj.id] = None
+
+
+def _collect_bulk(orm_execute_state):
+    if orm_execute_state.is_delete \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is AIFile:
+        orm_execute_state.session.info[_BULK_KEY] = True
+
+
+def _apply_on_commit(session):
+    # The database commit already succeeded: an index failure is logged and
+    # must not fail the caller (`flask rebuild-courseware-index` repairs it)
+    changes = session.info.pop(_PENDING_KEY, {})
+    if session.info.pop(_BULK_KEY, False):
+        _schedule_rebuild()
+        return
+    for file_id, values in changes.items():
+        try:
+            if values is None or values[1] is None:
+                courseware_index.remove(file_id)
+            else:
+                courseware_index.add(file_id, *values)
+        except Exception as e:
+            current_app.logger.error(f"Courseware index update for file {file_id} failed: {str(e)}")
+
+
+def _discard_on_rollback(session):
+    # Ignore savepoint rollbacks, the enclosing transaction can still commit
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BULK_KEY, None)
+
+
+def init_courseware_search(app):
+    """Open the on-disk courseware index and keep it in sync with committed AIFile text."""
+    path = app.config.get('COURSEWARE_INDEX_PATH', 'data/courseware_index.db')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    courseware_index.configure(path)
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk)
+        event.listen(db.session, 'after_commit', _apply_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
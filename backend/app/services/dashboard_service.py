@@ -0,0 +1,165 @@
+from sqlalchemy import event, func, select, true
+from sqlalchemy.orm import attributes
+from app import db
+from app.models import Assignment, Class, Notice, StudentProfile
+from app.utils.cache import TTLCache
+
+# Summaries keyed by (role, user_id); configured by init_dashboard_cache
+summary_cache = TTLCache(maxsize=4096, ttl=60)
+
+_PENDING_KEY = 'dashboard_invalidations'
+# Invalidation tokens
+_ALL = ('all',)
+
+
+def _role_token(role):
+    return ('role', role)
+
+
+def _user_token(role, user_id):
+    return ('user', role, user_id)
+
+
+def _summary_statement(role, user_id):
+    """Build one SELECT returning all counters joined with the five most recent notices."""
+    if role in ('admin', 'teacher'):
+        class_filter = [Class.teacher_id == user_id] if role == 'teacher' else []
+        class_count = select(func.count(Class.id)).where(*class_filter).scalar_subquery()
+        total_students = select(func.coalesce(func.sum(Class.students_count), 0)).where(*class_filter).scalar_subquery()
+        assignment_filter = [Assignment.status == 'pending']
+        if role == 'teacher':
+            assignment_filter.append(Assignment.teacher_id == user_id)
+        pending_assignments = select(func.count(Assignment.id)).where(*assignment_filter).scalar_subquery()
+    else:
+        # Student: their own class and all pending assignments
+        class_count = select(func.count(StudentProfile.id)).where(
+            StudentProfile.user_id == user_id, StudentProfile.class_id.isnot(None)
+        ).scalar_subquery()
+        total_students = select(func.coalesce(func.max(Class.students_count), 0)).join(
+            StudentProfile, StudentProfile.class_id == Class.id
+        ).where(StudentProfile.user_id == user_id).scalar_subquery()
+        pending_assignments = select(func.count(Assignment.id)).where(Assignment.status == 'pending').scalar_subquery()
+
+    counters = select(
+        class_count.label('class_count'),
+        total_students.label('total_students'),
+        pending_assignments.label('pending_assignments'),
+        select(func.count(Notice.id)).scalar_subquery().label('total_notices')
+    ).subquery()
+    recent = select(
+        Notice.id, Notice.title, Notice.date, Notice.priority, Notice.category, Notice.created_at
+    ).order_by(Notice.date.desc(), Notice.created_at.desc(), Notice.id.desc()).limit(5).subquery()
+
+    return select(counters, recent).select_from(
+        counters.outerjoin(recent, true())
+    ).order_by(recent.c.date.desc(), recent.c.created_at.desc(), recent.c.id.desc())
+
+
+def _query_summary(role, user_id):
+    rows = db.session.execute(_summary_statement(role, user_id)).mappings().all()
+    first = rows[0]
+    return {
+        'class_count': int(first['class_count'] or 0),
+        'total_students': int(first['total_students'] or 0),
+        'pending_assignments': int(first['pending_assignments'] or 0),
+        'total_notices': int(first['total_notices'] or 0),
+        'recent_notices': [{
+            'id': row['id'],
+            'title': row['title'],
+            'date': row['date'].strftime('%Y-%m-%d') if row['date'] else None,
+            'priority': row['priority'],
+            'category': row['category']
+        } for row in rows if row['id'] is not None]
+    }
+
+
+def get_dashboard_summary(role, user_id):
+    """Return the dashboard summary for a user, from cache when fresh."""
+    key = (role, user_id)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = _query_summary(role, user_id)
+        summary_cache.set(key, summary)
+    return summary
+
+
+def invalidate(tokens):
+    """Drop cached summaries matched by any of the invalidation tokens."""
+    tokens = set(tokens)
+    if not tokens:
+        return
+    if _ALL in tokens:
+        summary_cache.clear()
+        return
+
+    def affected(key):
+        role, user_id = key
+        return _role_token(role) in tokens or _user_token(role, user_id) in tokens
+
+    summary_cache.delete_where(affected)
+
+
+def _tokens_for_instance(obj):
+    """Which cached summaries a changed row can affect."""
+    if isinstance(obj, (Notice, Assignment)):
+        # Notices are shared by everyone; students count every pending assignment
+        return {_ALL}
+    if isinstance(obj, Class):
+        tokens = {_role_token('admin'), _role_token('student')}
+        history = attributes.get_history(obj, 'teacher_id')
+        for teacher_id in list(history.added or ()) + list(history.deleted or ()) + list(history.unchanged or ()):
+            if teacher_id is not None:
+                tokens.add(_user_token('teacher', teacher_id))
+        return tokens
+    if isinstance(obj, StudentProfile):
+        tokens = set()
+        history = attributes.get_history(obj, 'user_id')
+        for user_id in list(history.added or ()) + list(history.deleted or ()) + list(history.unchanged or ()):
+            if user_id is not None:
+                tokens.add(_user_token('student', user_id))
+        return tokens
+    return set()
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _collect_flush(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(_tokens_for_instance(obj))
+
+
+def _collect_bulk(orm_execute_state):
+    # Query.update()/delete() bypass the flush, so record them by mapped class
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if mapper.class_ in (Notice, Assignment, Class):
+        _pending(orm_execute_state.session).add(_ALL)
+    elif mapper.class_ is StudentProfile:
+        _pending(orm_execute_state.session).add(_role_token('student'))
+
+
+def _apply_on_commit(session):
+    invalidate(session.info.pop(_PENDING_KEY, set()))
+
+
+def _discard_on_rollback(session):
+    # Savepoint rollbacks also fire this; keep the outer transaction's invalidations
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_dashboard_cache(app):
+    """Configure the summary cache TTL and hook invalidation into the session lifecycle."""
+    summary_cache.ttl = app.config.get('DASHBOARD_CACHE_TTL', 60)
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk)
+        event.listen(db.session, 'after_commit', _apply_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
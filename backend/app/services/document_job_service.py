@@ -0,0 +1,321 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import AIFile
+from app.services.document_service import DocumentAnalysisService
+from app.utils.resilience import ServiceUnavailable
+
+STATUS_UPLOADED = 'uploaded'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+# Attempts per job when the DeepSeek bulkhead or circuit breaker sheds the call
+ANALYSIS_ATTEMPTS = 3
+
+
+class DocumentJobQueueFull(Exception):
+    """Every analysis worker is busy and the job queue is full."""
+
+
+class DocumentJobQueue:
+    """
+    Runs document analyses on a small local thread pool, each in its own app
+    context, so upload requests return as soon as the AIFile row is saved and
+    an analysis carries on when the client goes away.
+
+    At most `workers + queue_size` jobs are admitted at once; beyond that,
+    submit raises DocumentJobQueueFull instead of queueing without bound.
+    """
+
+    def __init__(self, workers=2, queue_size=32):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.app = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def configure(self, app, workers=None, queue_size=None):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.app = app
+            self.workers = workers or self.workers
+            self.queue_size = self.queue_size if queue_size is None else queue_size
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='document-job')
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            return self._executor, self._slots
+
+    def submit(self, file_id, source=None, force_refresh=False):
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            raise DocumentJobQueueFull('Document analysis queue is full')
+        try:
+            future = executor.submit(self._run, file_id, source, force_refresh)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _run(self, file_id, source, force_refresh):
+        with self.app.app_context():
+            try:
+                process_document_job(file_id, source=source, force_refresh=force_refresh)
+            except Exception as e:
+                current_app.logger.error(f"Document job {file_id} crashed: {str(e)}")
+            finally:
+                if source is not None:
+                    source.close()
+
+
+document_jobs = DocumentJobQueue()
+# Per content hash: a lock and the number of jobs holding or waiting for it
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _spool_upload(upload, file_type):
+    """
+    Copy an upload for its job: held in memory up to DOCUMENT_SPOOL_MAX_BYTES,
+    larger ones spilled to a uniquely named file in UPLOAD_FOLDER, which
+    stays on disk until the job finishes so requeue-document-jobs can pick
+    the job up again after a worker stops.
+
+    Returns:
+        tuple: (seekable file object, path of the spilled file or '')
+    """
+    max_size = current_app.config.get('DOCUMENT_SPOOL_MAX_BYTES', 2 * 1024 * 1024)
+    head = upload.stream.read(max_size + 1)
+    if len(head) <= max_size:
+        return io.BytesIO(head), ''
+
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    os.makedirs(upload_folder, exist_ok=True)
+    spool = tempfile.NamedTemporaryFile(prefix='upload-', suffix=f'.{file_type}', dir=upload_folder, delete=False)
+    try:
+        spool.write(head)
+        shutil.copyfileobj(upload.stream, spool)
+        spool.flush()
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        _remove_file(spool.name)
+        raise
+    return spool, spool.name
+
+
+def create_document_job(user_id, upload, file_type, force_refresh=False):
+    """
+    Record an upload as an 'uploaded' AIFile and queue its analysis. The
+    job reads the upload from a spooled copy, so small files never touch the
+    disk. With `force_refresh` the document is analyzed again even when
+    identical content has been analyzed before.
+
+    Raises:
+        DocumentJobQueueFull: Nothing is stored when the queue is full
+    """
+    spool, spool_path = _spool_upload(upload, file_type)
+    ai_file = AIFile(
+        user_id=user_id,
+        file_name=upload.filename[:255],
+        # Empty when the upload only lives in the job's in-memory copy
+        file_path=spool_path,
+        file_type=file_type,
+        source='upload',
+        status=STATUS_UPLOADED
+    )
+    try:
+        db.session.add(ai_file)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        spool.close()
+        _remove_file(spool_path)
+        raise
+
+    try:
+        document_jobs.submit(ai_file.id, source=spool, force_refresh=force_refresh)
+    except DocumentJobQueueFull:
+        spool.close()
+        _remove_file(spool_path)
+        db.session.delete(ai_file)
+        db.session.commit()
+        raise
+    return ai_file
+
+
+def _claim(file_id):
+    """Move a job from uploaded to processing; False when another worker got there first."""
+    result = db.session.execute(
+        update(AIFile)
+        .where(AIFile.id == file_id, AIFile.status == STATUS_UPLOADED)
+        .values(status=STATUS_PROCESSING, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _analyze(doc_service, text_content):
+    for attempt in range(ANALYSIS_ATTEMPTS):
+        try:
+            return doc_service.analyze_document(text_content)
+        except ServiceUnavailable as e:
+            if attempt == ANALYSIS_ATTEMPTS - 1:
+                raise
+            time.sleep(e.retry_after)
+
+
+def content_hash(text_content):
+    return hashlib.sha256(text_content.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def _single_flight(key):
+    """
+    Serialize this worker's jobs for the same content, so that concurrent
+    uploads of one document wait for a single analysis instead of each
+    calling the model.
+    """
+    with _inflight_lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _inflight_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _inflight[key]
+
+
+def _previous_analysis(digest, file_id):
+    """analysis_summary of the latest finished job with the same content hash, or None."""
+    row = db.session.query(AIFile.analysis_summary).filter(
+        AIFile.content_hash == digest,
+        AIFile.status == STATUS_DONE,
+        AIFile.id != file_id
+    ).order_by(AIFile.updated_at.desc()).first()
+    return row[0] if row else None
+
+
+def _remove_file(file_path):
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def process_document_job(file_id, source=None, force_refresh=False):
+    """
+    Extract and analyze one uploaded document, read from `source` (a file
+    object) or else from the row's file_path, recording the outcome on its
+    AIFile row. Unless `force_refresh`, a document whose extracted text was
+    analyzed before reuses that analysis without calling the model.
+    """
+    if not _claim(file_id):
+        return
+    ai_file = db.session.get(AIFile, file_id)
+    try:
+        doc_service = DocumentAnalysisService()
+        text_content = doc_service.extract_text(
+            source if source is not None else ai_file.file_path, ai_file.file_type
+        )
+        ai_file.content_hash = content_hash(text_content)
+        # Kept for courseware search, indexed when this is committed
+        ai_file.text_content = text_content
+        with _single_flight(ai_file.content_hash):
+            # Start a new transaction so analyses committed by other jobs meanwhile are visible
+            db.session.commit()
+            summary = None if force_refresh else _previous_analysis(ai_file.content_hash, file_id)
+            if summary is None:
+                summary = json.dumps(_analyze(doc_service, text_content), ensure_ascii=False)
+            ai_file.analysis_summary = summary
+            ai_file.error_message = None
+            ai_file.status = STATUS_DONE
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Document analysis {file_id} failed: {str(e)}")
+        ai_file = db.session.get(AIFile, file_id)
+        ai_file.status = STATUS_FAILED
+        ai_file.error_message = str(e)[:255]
+        db.session.commit()
+    _remove_file(ai_file.file_path)
+
+
+def job_to_dict(ai_file):
+    data = {
+        'file_id': ai_file.id,
+        'file_name': ai_file.file_name,
+        'file_type': ai_file.file_type,
+        'status': ai_file.status,
+        'created_at': ai_file.created_at.isoformat() if ai_file.created_at else None,
+        'updated_at': ai_file.updated_at.isoformat() if ai_file.updated_at else None
+    }
+    if ai_file.status == STATUS_FAILED:
+        data['error'] = ai_file.error_message
+    return data
+
+
+def job_analysis(ai_file):
+    """The stored analysis of a finished job, or None."""
+    if ai_file.status != STATUS_DONE or not ai_file.analysis_summary:
+        return None
+    return json.loads(ai_file.analysis_summary)
+
+
+def pending_document_jobs(stale_after_minutes=30):
+    """
+    Jobs lost when a worker stopped: rows still 'uploaded', and rows stuck in
+    'processing' for `stale_after_minutes` (reset to 'uploaded'). A job whose
+    upload was only held in memory cannot be run again; it is marked failed
+    once it has been waiting for `stale_after_minutes`, since until then it
+    may still be queued in a running worker.
+
+    Returns:
+        list: AIFile ids ready for process_document_job
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=stale_after_minutes)
+    db.session.execute(
+        update(AIFile)
+        .where(AIFile.status == STATUS_PROCESSING, AIFile.updated_at < cutoff)
+        .values(status=STATUS_UPLOADED)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    file_ids = []
+    for ai_file in AIFile.query.filter_by(status=STATUS_UPLOADED).order_by(AIFile.id).all():
+        if ai_file.file_path and os.path.exists(ai_file.file_path):
+            file_ids.append(ai_file.id)
+        elif ai_file.updated_at < cutoff:
+            ai_file.status = STATUS_FAILED
+            ai_file.error_message = 'Uploaded file is missing'
+    db.session.commit()
+    return file_ids
+
+
+def init_document_jobs(app):
+    """Apply the DOCUMENT_JOB_* settings; the pool starts on the first job."""
+    document_jobs.configure(
+        app,
+        workers=app.config.get('DOCUMENT_JOB_WORKERS'),
+        queue_size=app.config.get('DOCUMENT_JOB_QUEUE_SIZE')
+    )
@@ -1,7 +1,371 @@
+import io
+import json
+import multiprocessing
 import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from docx import Document
 from flask import current_app
-from app.services.ai_service import DeepseekAPIService
+from app.services.ai_service import UNAVAILABLE_MESSAGE, DeepseekAPIService
+from app.utils.docx_text import iter_docx_text
+from app.utils.pptx_text import iter_pptx_text
+
+ANALYSIS_KEYS = ('key_topics', 'learning_objectives', 'suggested_activities')
+# Items kept per list in the final analysis
+MAX_ITEMS = 5
+_CJK_RE = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+_OUTPUT_FORMAT = """
+Format your response as JSON with these exact keys:
+- key_topics: array of strings
+- learning_objectives: array of strings
+- suggested_activities: array of strings
+"""
+
+ANALYSIS_PROMPT = """
+Analyze the following educational courseware content and provide:
+
+1. Key Topics: List 3-5 main topics covered
+2. Learning Objectives: List 3-5 specific learning objectives
+3. Suggested Activities: List 3-5 teaching activities that would complement this content
+""" + _OUTPUT_FORMAT + """
+Content to analyze:
+{content}
+
+Provide ONLY the JSON response, no additional text.
+"""
+
+CHUNK_PROMPT = """
+The following is part {index} of {total} of one educational courseware document.
+Analyze this part only and provide:
+
+1. Key Topics: The main topics covered in this part
+2. Learning Objectives: Specific learning objectives this part supports
+3. Suggested Activities: Teaching activities that would complement this part
+""" + _OUTPUT_FORMAT + """
+Content to analyze:
+{content}
+
+Provide ONLY the JSON response, no additional text.
+"""
+
+MERGE_PROMPT = """
+The lists below were extracted separately from consecutive parts of one educational courseware document.
+Merge them into a single analysis of the whole document: combine duplicates and near-duplicates,
+and keep the 3-5 most important items of each list.
+""" + _OUTPUT_FORMAT + """
+Partial lists:
+{partials}
+
+Provide ONLY the JSON response, no additional text.
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count: about 4 characters per token, one per CJK character."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Split text into chunks of at most about `max_tokens` tokens, breaking
+    between paragraphs; a paragraph longer than that is cut into pieces.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for paragraph in text.split('\n'):
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            step = max(len(paragraph) * max_tokens // tokens, 1)
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current and any(part.strip() for part in current):
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def _strip_code_fence(response):
+    return _CODE_FENCE_RE.sub('', response.strip())
+
+
+def _dedupe(items):
+    seen = set()
+    unique = []
+    for item in items:
+        key = ' '.join(item.split()).casefold()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+# File extension -> (extractor, runs in the process pool). Register extractors at
+# import time of this module, so that pool processes know them too.
+EXTRACTORS = {}
+
+
+def register_extractor(*extensions, process_pool=True):
+    """
+    Register `extractor(source) -> str` for the given file extensions. The
+    source is a path or a seekable binary file object. CPU-bound extractors
+    run in the extraction process pool; cheap ones (process_pool=False) run
+    on the calling thread.
+    """
+    def decorator(extractor):
+        for extension in extensions:
+            EXTRACTORS[extension.lower()] = (extractor, process_pool)
+        return extractor
+    return decorator
+
+
+@register_extractor('docx')
+def extract_docx_text(source):
+    return '\n'.join(iter_docx_text(source))
+
+
+@register_extractor('pptx')
+def extract_pptx_text(source):
+    return '\n'.join(iter_pptx_text(source))
+
+
+@register_extractor('pdf')
+def extract_pdf_text(source):
+    from pypdf import PdfReader
+
+    pages = (page.extract_text() or '' for page in PdfReader(source).pages)
+    return '\n'.join(line for page in pages for line in page.splitlines() if line.strip())
+
+
+@register_extractor('txt', 'md', 'markdown', process_pool=False)
+def extract_plain_text(source):
+    if hasattr(source, 'read'):
+        data = source.read()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    for encoding in ('utf-8-sig', 'gb18030'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('latin-1')
+
+
+def _run_extractor(file_type, source):
+    """Extract text with the registered extractor; also the entry point of pool processes."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    start = time.perf_counter()
+    text = EXTRACTORS[file_type][0](source)
+    return text, time.perf_counter() - start
+
+
+def _pool_payload(source):
+    """What to send a pool process: the file's path when it has one on disk, else its bytes."""
+    if isinstance(source, str):
+        return source
+    name = getattr(source, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        if hasattr(source, 'flush'):
+            source.flush()
+        return name
+    source.seek(0)
+    return source.read()
+
+
+class ExtractionMetrics:
+    """Per-format counters of this worker: extractions, failures, characters and timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._formats = {}
+
+    def _entry(self, file_type):
+        return self._formats.setdefault(file_type, {
+            'count': 0, 'failures': 0, 'characters': 0,
+            'parse_seconds': 0.0, 'wall_seconds': 0.0, 'max_wall_seconds': 0.0
+        })
+
+    def record(self, file_type, characters, parse_seconds, wall_seconds):
+        with self._lock:
+            entry = self._entry(file_type)
+            entry['count'] += 1
+            entry['characters'] += characters
+            entry['parse_seconds'] += parse_seconds
+            entry['wall_seconds'] += wall_seconds
+            entry['max_wall_seconds'] = max(entry['max_wall_seconds'], wall_seconds)
+
+    def record_failure(self, file_type):
+        with self._lock:
+            self._entry(file_type)['failures'] += 1
+
+    def stats(self):
+        """Totals per format plus mean parse time (in the extractor) and wall time (including the pool)."""
+        with self._lock:
+            formats = {file_type: dict(entry) for file_type, entry in self._formats.items()}
+        for entry in formats.values():
+            count = entry['count']
+            entry['mean_parse_seconds'] = round(entry['parse_seconds'] / count, 6) if count else None
+            entry['mean_wall_seconds'] = round(entry['wall_seconds'] / count, 6) if count else None
+        return formats
+
+
+class ExtractionPool:
+    """
+    Runs CPU-bound text extraction in a bounded pool of `processes` worker
+    processes, so parsing a large file neither holds the GIL of the web
+    worker nor competes with its request threads. processes=0 extracts on
+    the calling thread.
+    """
+
+    def __init__(self, processes=2, timeout=60):
+        self.processes = processes
+        self.timeout = timeout
+        self.metrics = ExtractionMetrics()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, processes=None, timeout=None):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.processes = self.processes if processes is None else processes
+            self.timeout = timeout or self.timeout
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a multi-threaded web worker is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset(self, executor, terminate=False):
+        """
+        Replace a broken pool, or with `terminate` one whose process is stuck
+        in an extraction: shutdown() alone leaves running work running, so
+        its processes are killed. Other extractions still running in that
+        pool then fail with BrokenProcessPool.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        if terminate:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+    def extract(self, source, file_type):
+        """
+        Extract the text of `source` (a path or seekable binary file object) as `file_type`.
+
+        Raises:
+            ValueError: When no extractor is registered for file_type
+            TimeoutError: When a pooled extraction takes longer than `timeout` seconds
+        """
+        file_type = file_type.lower()
+        if file_type not in EXTRACTORS:
+            raise ValueError(f'Unsupported file type: {file_type}')
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+        start = time.perf_counter()
+        try:
+            if EXTRACTORS[file_type][1] and self.processes > 0:
+                executor = self._pool()
+                future = executor.submit(_run_extractor, file_type, _pool_payload(source))
+                try:
+                    text, parse_seconds = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    self._reset(executor, terminate=True)
+                    raise TimeoutError(f'Extracting text from {file_type} timed out')
+                except BrokenProcessPool:
+                    self._reset(executor)
+                    raise
+            else:
+                text, parse_seconds = _run_extractor(file_type, source)
+        except Exception:
+            self.metrics.record_failure(file_type)
+            raise
+        self.metrics.record(file_type, len(text), parse_seconds, time.perf_counter() - start)
+        return text
+
+
+extraction_pool = ExtractionPool()
+
+
+def init_document_extraction(app):
+    """Apply the DOCUMENT_EXTRACT_* settings; the pool starts on the first pooled extraction."""
+    extraction_pool.configure(
+        processes=app.config.get('DOCUMENT_EXTRACT_PROCESSES'),
+        timeout=app.config.get('DOCUMENT_EXTRACT_TIMEOUT')
+    )
+
+
+def extract_text_python_docx(source):
+    """The former extractor: body paragraphs only, via python-docx's object model. Kept for benchmarks."""
+    return '\n'.join(paragraph.text for paragraph in Document(source).paragraphs if paragraph.text.strip())
+
+
+DOCX_EXTRACTORS = {
+    'python-docx': extract_text_python_docx,
+    'streaming': extract_docx_text
+}
+
+
+def _measure_extraction(name, path, repeat):
+    """Run in a fresh process, so ru_maxrss reflects this extractor alone."""
+    import resource  # Unix only, and only the benchmark needs it
+
+    extractor = DOCX_EXTRACTORS[name]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = extractor(path)
+    seconds = (time.perf_counter() - start) / repeat
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'extractor': name,
+        'seconds': seconds,
+        'peak_rss_growth_kb': peak_kb - baseline_kb,
+        'characters': len(text)
+    }
+
+
+def benchmark_docx_extraction(path, repeat=3):
+    """
+    Compare the streaming extractor with python-docx on one file: mean
+    seconds per extraction and peak RSS growth, each measured in its own
+    freshly spawned process.
+
+    Returns:
+        list: One dict per extractor
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for name in DOCX_EXTRACTORS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(_measure_extraction, name, path, repeat).result())
+    return results
+
 
 class DocumentAnalysisService:
     """
@@ -11,32 +375,47 @@ class DocumentAnalysisService:
     def __init__(self):
         self.ai_service = DeepseekAPIService()
     
-    def extract_text_from_docx(self, file_path):
+    def extract_text(self, source, file_type):
         """
-        Extract text content from a .docx file.
-        
+        Extract text content from courseware of any registered format
+        (see EXTRACTORS), on the extraction process pool where it is CPU-bound.
+
         Args:
-            file_path (str): Path to the .docx file
-            
+            source (str or file-like): Path to the file, or a seekable binary file object holding it
+            file_type (str): File extension, e.g. 'docx', 'pptx', 'pdf', 'md'
+
         Returns:
             str: Extracted text content
         """
         try:
-            doc = Document(file_path)
-            full_text = []
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    full_text.append(paragraph.text)
-            
-            return '\n'.join(full_text)
+            return extraction_pool.extract(source, file_type)
         except Exception as e:
-            current_app.logger.error(f"Error extracting text from docx: {str(e)}")
+            current_app.logger.error(f"Error extracting text from {file_type}: {str(e)}")
             raise
+
+    def extract_text_from_docx(self, source):
+        """
+        Extract text content from a .docx file: paragraphs, table rows and
+        header/footer text, streamed from the XML (see app.utils.docx_text).
+        
+        Args:
+            source (str or file-like): Path to the .docx file, or a seekable
+                binary file object holding it (read from the start)
+            
+        Returns:
+            str: Extracted text content
+        """
+        return self.extract_text(source, 'docx')
     
     def analyze_document(self, text_content):
         """
         Analyze document content and extract educational insights.
+
+        A document that fits in one chunk of DOCUMENT_CHUNK_TOKENS is analyzed
+        in a single call. A longer one is split on paragraph boundaries, its
+        chunks are analyzed in parallel on at most DOCUMENT_ANALYSIS_WORKERS
+        threads (map), and the partial lists are merged and deduplicated in
+        one final call (reduce).
         
         Args:
             text_content (str): The document text to analyze
@@ -44,51 +423,56 @@ class DocumentAnalysisService:
         Returns:
             dict: Analysis results with key_topics, learning_objectives, and activities
         """
-        # Create analysis prompt
-        analysis_prompt = f"""
-Analyze the following educational courseware content and provide:
+        chunks = split_into_chunks(text_content, current_app.config.get('DOCUMENT_CHUNK_TOKENS', 2000))
+        try:
+            if len(chunks) <= 1:
+                return self._ask(ANALYSIS_PROMPT.format(content=chunks[0] if chunks else ''))
 
-1. Key Topics: List 3-5 main topics covered
-2. Learning Objectives: List 3-5 specific learning objectives
-3. Suggested Activities: List 3-5 teaching activities that would complement this content
+            partials = self._map_chunks(chunks)
+            return self._reduce(partials)
+        except Exception as e:
+            current_app.logger.error(f"Error analyzing document: {str(e)}")
+            raise
 
-Format your response as JSON with these exact keys:
-- key_topics: array of strings
-- learning_objectives: array of strings
-- suggested_activities: array of strings
+    def _map_chunks(self, chunks):
+        app = current_app._get_current_object()
 
-Content to analyze:
-{text_content[:3000]}  
+        def analyze_chunk(numbered_chunk):
+            index, chunk = numbered_chunk
+            with app.app_context():
+                return self._ask(CHUNK_PROMPT.format(index=index, total=len(chunks), content=chunk))
+
+        workers = min(current_app.config.get('DOCUMENT_ANALYSIS_WORKERS', 4), len(chunks))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='document-chunk') as pool:
+            return list(pool.map(analyze_chunk, enumerate(chunks, start=1)))
+
+    def _reduce(self, partials):
+        merged = {key: _dedupe(item for partial in partials for item in partial[key]) for key in ANALYSIS_KEYS}
+        result = self._ask(MERGE_PROMPT.format(partials=json.dumps(merged, ensure_ascii=False, indent=2)))
+        if not any(result[key] for key in ANALYSIS_KEYS):
+            # Unusable merge answer: fall back to the locally deduplicated lists
+            return {key: items[:MAX_ITEMS] for key, items in merged.items()}
+        return result
+
+    def _ask(self, prompt):
+        """Send one analysis prompt and parse the answer into the three lists."""
+        response = self.ai_service.generate_text(prompt)
+        if response == UNAVAILABLE_MESSAGE:
+            raise RuntimeError('AI analysis is currently unavailable')
+        current_app.logger.info(f"AI Response: {response}")
 
-Provide ONLY the JSON response, no additional text.
-"""
-        
         try:
-            # Get AI analysis
-            response = self.ai_service.generate_text(analysis_prompt)
-            
-            # Debug: Log the response
-            current_app.logger.info(f"AI Response: {response}")
-            print(f"\n=== AI RESPONSE ===\n{response}\n===================\n")
-            
-            # Parse JSON response
-            import json
-            try:
-                analysis = json.loads(response)
-                return {
-                    'key_topics': analysis.get('key_topics', []),
-                    'learning_objectives': analysis.get('learning_objectives', []),
-                    'suggested_activities': analysis.get('suggested_activities', [])
-                }
-            except json.JSONDecodeError as e:
-                current_app.logger.warning(f"JSON decode failed: {e}, using fallback parser")
-                print(f"JSON decode failed, using fallback parser")
-                # Fallback: parse text response
-                return self._parse_text_response(response)
-                
-        except Exception as e:
-            current_app.logger.error(f"Error analyzing document: {str(e)}")
-            raise
+            analysis = json.loads(_strip_code_fence(response))
+        except json.JSONDecodeError as e:
+            current_app.logger.warning(f"JSON decode failed: {e}, using fallback parser")
+            # Fallback: parse text response
+            return self._parse_text_response(response)
+
+        values = [analysis.get(key, []) for key in ANALYSIS_KEYS] if isinstance(analysis, dict) else None
+        if values is None or not all(isinstance(value, list) for value in values):
+            current_app.logger.warning("JSON response is not three lists, using fallback parser")
+            return self._parse_text_response(response)
+        return {key: [str(item) for item in value] for key, value in zip(ANALYSIS_KEYS, values)}
     
     def _parse_text_response(self, response):
         """
@@ -0,0 +1,234 @@
+import itertools
+import json
+import queue
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from app import db
+from app.models import Assignment, Class, Notice, StudentProfile
+
+_PENDING_KEY = 'event_stream_pending'
+# Events buffered per subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LocalPubSub:
+    """
+    In-process pub/sub stand-in. A multi-worker deployment can replace it with
+    any backend exposing the same publish/subscribe pair (e.g. Redis pub/sub),
+    so events published in one worker reach subscribers in all of them.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+
+class Subscription:
+    """A single client's bounded event queue."""
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # A slow client loses the backlog and is told to refetch instead
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait({'id': message['id'], 'event': 'resync', 'data': {}})
+
+    def get(self, timeout):
+        """Next message, or None after `timeout` seconds without one."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroadcaster:
+    """Fans out published events to every subscription in this process."""
+
+    def __init__(self, backend=None):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.backend = backend or LocalPubSub()
+        self.backend.subscribe(self._fan_out)
+
+    def _fan_out(self, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def publish(self, event_name, data):
+        self.backend.publish({'id': next(self._ids), 'event': event_name, 'data': data})
+
+    def subscribe(self):
+        subscription = Subscription()
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+
+broadcaster = EventBroadcaster()
+
+
+def format_sse(message):
+    """Serialize a message as one server-sent event."""
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+def visible_to(message, role, user_id, class_id=None):
+    """
+    Tailor a message to one subscriber, or return None to skip it.
+
+    Counter deltas scoped to a teacher go to that teacher and admins only;
+    class sizes go to students of that class; per-student resyncs go to that student.
+    """
+    data = message['data']
+    if message['event'] == 'resync' and data.get('user_id') is not None:
+        if role == 'student' and data['user_id'] == user_id:
+            return dict(message, data={})
+        return None
+    if message['event'] != 'counters':
+        return message
+
+    data = dict(data)
+    teacher_id = data.pop('teacher_id', None)
+    target_class_id = data.pop('class_id', None)
+    if role == 'teacher' and teacher_id != user_id:
+        for counter in ('pending_assignments', 'class_count', 'total_students'):
+            data.pop(counter, None)
+    if role == 'student':
+        data.pop('class_count', None)
+        if target_class_id is None or target_class_id != class_id:
+            data.pop('total_students', None)
+    if not data:
+        return None
+    return dict(message, data=data)
+
+
+def _notice_payload(notice):
+    return {
+        'id': notice.id,
+        'title': notice.title,
+        'date': notice.date.strftime('%Y-%m-%d') if notice.date else None,
+        'priority': notice.priority,
+        'category': notice.category
+    }
+
+
+def _is_pending(status):
+    # New rows may not have the column default applied yet
+    return status in (None, 'pending')
+
+
+def _profile_resync(profile):
+    return ('resync', {'user_id': profile.user_id})
+
+
+def _collect_flush(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in session.new:
+        if isinstance(obj, Notice):
+            pending.append(('notice_created', _notice_payload(obj)))
+            pending.append(('counters', {'total_notices': 1}))
+        elif isinstance(obj, Assignment) and _is_pending(obj.status):
+            pending.append(('counters', {'pending_assignments': 1, 'teacher_id': obj.teacher_id}))
+        elif isinstance(obj, Class):
+            pending.append(('counters', {'class_count': 1, 'teacher_id': obj.teacher_id}))
+        elif isinstance(obj, StudentProfile):
+            pending.append(_profile_resync(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Notice) and session.is_modified(obj):
+            pending.append(('notice_updated', _notice_payload(obj)))
+        elif isinstance(obj, Assignment):
+            history = attributes.get_history(obj, 'status')
+            if history.has_changes():
+                was_pending = any(_is_pending(s) for s in history.deleted or ())
+                now_pending = _is_pending(obj.status)
+                if was_pending != now_pending:
+                    pending.append(('counters', {
+                        'pending_assignments': 1 if now_pending else -1,
+                        'teacher_id': obj.teacher_id
+                    }))
+        elif isinstance(obj, Class):
+            if attributes.get_history(obj, 'teacher_id').has_changes():
+                pending.append(('resync', {}))
+                continue
+            history = attributes.get_history(obj, 'students_count')
+            if history.has_changes():
+                before = sum(v or 0 for v in history.deleted or ())
+                delta = (obj.students_count or 0) - before
+                if delta:
+                    pending.append(('counters', {
+                        'total_students': delta,
+                        'teacher_id': obj.teacher_id,
+                        'class_id': obj.id
+                    }))
+        elif isinstance(obj, StudentProfile) and session.is_modified(obj):
+            pending.append(_profile_resync(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Notice):
+            pending.append(('notice_deleted', {'id': obj.id}))
+            pending.append(('counters', {'total_notices': -1}))
+        elif isinstance(obj, Assignment) and _is_pending(obj.status):
+            pending.append(('counters', {'pending_assignments': -1, 'teacher_id': obj.teacher_id}))
+        elif isinstance(obj, Class):
+            pending.append(('resync', {}))
+        elif isinstance(obj, StudentProfile):
+            pending.append(_profile_resync(obj))
+
+
+def _collect_bulk(orm_execute_state):
+    # Bulk Query.update()/delete() carry no per-row detail; clients refetch instead
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ in (Notice, Assignment, Class, StudentProfile):
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, []).append(('resync', {}))
+
+
+def _publish_on_commit(session):
+    events = session.info.pop(_PENDING_KEY, [])
+    if ('resync', {}) in events:
+        # A global resync supersedes every counter delta of the transaction
+        events = [(name, data) for name, data in events if name.startswith('notice_')] + [('resync', {})]
+    for name, data in events:
+        broadcaster.publish(name, data)
+
+
+def _discard_on_rollback(session):
+    # A rolled-back savepoint does not cancel the events of the outer transaction
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_event_stream(app):
+    """Publish committed notice/assignment/class writes to SSE subscribers."""
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk)
+        event.listen(db.session, 'after_commit', _publish_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
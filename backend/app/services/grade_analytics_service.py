@@ -0,0 +1,156 @@
+import numpy as np
+from app import db
+from app.models import Grade, StudentProfile
+
+SUBJECTS = ('chinese', 'math', 'english')
+SERIES = SUBJECTS + ('average',)
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def fetch_grade_rows(term, class_ids):
+    """
+    Bulk-fetch every score of the given classes for a term in one query.
+
+    Args:
+        term (str): Term to report on
+        class_ids (list): Classes in scope
+
+    Returns:
+        list: (student_id, class_id, subject, score) tuples
+    """
+    if not class_ids:
+        return []
+    return db.session.query(
+        Grade.student_id, StudentProfile.class_id, Grade.subject, Grade.score
+    ).join(
+        StudentProfile, StudentProfile.user_id == Grade.student_id
+    ).filter(
+        StudentProfile.class_id.in_(class_ids),
+        Grade.term == term
+    ).all()
+
+
+def _score_matrix(rows):
+    """Pivot rows into a (students x subjects) float matrix with NaN for missing scores."""
+    if not rows:
+        return np.empty((0, len(SUBJECTS))), np.empty(0, dtype=np.int64)
+
+    subject_index = {subject: i for i, subject in enumerate(SUBJECTS)}
+    rows = [row for row in rows if row[2] in subject_index and row[3] is not None]
+    if not rows:
+        return np.empty((0, len(SUBJECTS))), np.empty(0, dtype=np.int64)
+
+    student_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    class_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    subjects = np.fromiter((subject_index[row[2]] for row in rows), dtype=np.int64, count=len(rows))
+    scores = np.clip(np.fromiter((float(row[3]) for row in rows), dtype=np.float64, count=len(rows)), 0.0, 100.0)
+
+    unique_students, student_pos = np.unique(student_ids, return_inverse=True)
+    matrix = np.full((len(unique_students), len(SUBJECTS)), np.nan)
+    matrix[student_pos, subjects] = scores
+
+    # A student belongs to exactly one class; take it from any of their rows
+    student_classes = np.empty(len(unique_students), dtype=np.int64)
+    student_classes[student_pos] = class_ids
+    return matrix, student_classes
+
+
+def _bucket_edges(bucket_width):
+    edges = np.arange(0, 100, bucket_width, dtype=np.float64)
+    return np.append(edges, 100.0)
+
+
+def _bucket_labels(edges):
+    # Buckets are [low, high) except the last one, which also includes 100
+    return [f'{int(low)}-{int(high)}' for low, high in zip(edges[:-1], edges[1:])]
+
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+def _series_stats(values, edges, percentiles):
+    values = values[~np.isnan(values)]
+    histogram = np.histogram(values, bins=edges)[0].tolist()
+    if values.size == 0:
+        return {
+            'count': 0,
+            'mean': None,
+            'median': None,
+            'std': None,
+            'percentiles': {f'{p:g}': None for p in percentiles},
+            'histogram': histogram
+        }
+    points = np.percentile(values, percentiles) if percentiles else []
+    return {
+        'count': int(values.size),
+        'mean': _round(values.mean()),
+        'median': _round(np.median(values)),
+        'std': _round(values.std()),
+        'percentiles': {f'{p:g}': _round(v) for p, v in zip(percentiles, points)},
+        'histogram': histogram
+    }
+
+
+def _correlation(matrix):
+    """Pairwise Pearson correlation between subjects over students that have both scores."""
+    result = {}
+    for i, first in enumerate(SUBJECTS):
+        result[first] = {}
+        for j, second in enumerate(SUBJECTS):
+            mask = ~np.isnan(matrix[:, i]) & ~np.isnan(matrix[:, j])
+            x, y = matrix[mask, i], matrix[mask, j]
+            if x.size < 2 or x.std() == 0 or y.std() == 0:
+                result[first][second] = None
+            else:
+                result[first][second] = _round(np.corrcoef(x, y)[0, 1])
+    return result
+
+
+def compute_grade_analytics(rows, bucket_width=10, percentiles=DEFAULT_PERCENTILES):
+    """
+    Compute distribution statistics over many classes with vectorized NumPy operations.
+
+    Args:
+        rows (list): (student_id, class_id, subject, score) tuples from fetch_grade_rows
+        bucket_width (int): Histogram bucket width in points (1-100)
+        percentiles (list): Percentiles to report (0-100)
+
+    Returns:
+        dict: labels, overall per-series stats, subject correlation and per-class summaries
+    """
+    matrix, student_classes = _score_matrix(rows)
+    # Per-student average over the subjects they have scores for
+    has_any = ~np.isnan(matrix).all(axis=1)
+    averages = np.full(matrix.shape[0], np.nan)
+    if has_any.any():
+        averages[has_any] = np.nanmean(matrix[has_any], axis=1)
+    columns = {subject: matrix[:, i] for i, subject in enumerate(SUBJECTS)}
+    columns['average'] = averages
+
+    edges = _bucket_edges(bucket_width)
+    percentiles = list(percentiles)
+
+    classes = []
+    for class_id in np.unique(student_classes):
+        mask = student_classes == class_id
+        summary = {'class_id': int(class_id), 'student_count': int(mask.sum())}
+        for series in SERIES:
+            values = columns[series][mask]
+            values = values[~np.isnan(values)]
+            summary[series] = {
+                'count': int(values.size),
+                'mean': _round(values.mean()) if values.size else None,
+                'median': _round(np.median(values)) if values.size else None
+            }
+        classes.append(summary)
+
+    return {
+        'student_count': int(matrix.shape[0]),
+        'bucket_width': bucket_width,
+        'labels': _bucket_labels(edges),
+        'bucket_edges': [int(edge) for edge in edges],
+        'series': {series: _series_stats(columns[series], edges, percentiles) for series in SERIES},
+        'correlation': _correlation(matrix),
+        'classes': classes
+    }
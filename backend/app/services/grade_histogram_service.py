@@ -0,0 +1,282 @@
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Grade, GradeHistogram, StudentProfile
+
+SUBJECTS = ('chinese', 'math', 'english')
+SERIES = SUBJECTS + ('average',)
+BUCKET_COUNT = 101
+
+
+def score_bucket(score):
+    """Map a score to its 0-100 bucket (clamped, rounded to the nearest point)."""
+    return int(round(max(0.0, min(100.0, float(score)))))
+
+
+def student_buckets(subject_scores):
+    """
+    Compute the histogram buckets a student contributes to.
+
+    Args:
+        subject_scores (dict): {subject: score} for one student and term
+
+    Returns:
+        dict: {series: bucket}; 'average' is present if any subject has a score
+    """
+    clamped = {}
+    for subject, score in subject_scores.items():
+        if subject in SUBJECTS and score is not None:
+            clamped[subject] = max(0.0, min(100.0, float(score)))
+
+    buckets = {subject: score_bucket(value) for subject, value in clamped.items()}
+    if clamped:
+        buckets['average'] = score_bucket(sum(clamped.values()) / len(clamped))
+    return buckets
+
+
+def snapshot_student(student_id, term=None):
+    """
+    Capture the buckets a student currently occupies, per term.
+
+    Reads through the session, so pending (unflushed) grade changes are included.
+
+    Args:
+        student_id (int): Student user_id
+        term (str): Restrict to a single term; all terms when None
+
+    Returns:
+        dict: {term: {series: bucket}}
+    """
+    query = db.session.query(Grade.term, Grade.subject, Grade.score).filter(Grade.student_id == student_id)
+    if term is not None:
+        query = query.filter(Grade.term == term)
+
+    scores_by_term = {}
+    for grade_term, subject, score in query.all():
+        scores_by_term.setdefault(grade_term, {})[subject] = score
+    return {grade_term: student_buckets(scores) for grade_term, scores in scores_by_term.items()}
+
+
+def _histogram_exists(class_id, term):
+    return db.session.query(GradeHistogram.id).filter_by(class_id=class_id, term=term).first() is not None
+
+
+def _class_has_grades(class_id, term):
+    return db.session.query(Grade.id).join(
+        StudentProfile, StudentProfile.user_id == Grade.student_id
+    ).filter(
+        StudentProfile.class_id == class_id,
+        Grade.term == term
+    ).first() is not None
+
+
+def _compute_class_histogram(class_id, term):
+    """Recompute {series: [count] * 101} for a class and term from raw grades."""
+    histogram = {series: [0] * BUCKET_COUNT for series in SERIES}
+    rows = db.session.query(Grade.student_id, Grade.subject, Grade.score).join(
+        StudentProfile, StudentProfile.user_id == Grade.student_id
+    ).filter(
+        StudentProfile.class_id == class_id,
+        Grade.term == term
+    ).all()
+
+    scores_by_student = {}
+    for student_id, subject, score in rows:
+        scores_by_student.setdefault(student_id, {})[subject] = score
+    for scores in scores_by_student.values():
+        for series, bucket in student_buckets(scores).items():
+            histogram[series][bucket] += 1
+    return histogram
+
+
+def _insert_class_histogram(class_id, term, histogram):
+    db.session.bulk_insert_mappings(GradeHistogram, [
+        {'class_id': class_id, 'term': term, 'series': series, 'bucket': bucket, 'student_count': count}
+        for series, counts in histogram.items()
+        for bucket, count in enumerate(counts)
+    ])
+
+
+def _write_class_histogram(class_id, term, histogram):
+    GradeHistogram.query.filter_by(class_id=class_id, term=term).delete(synchronize_session=False)
+    _insert_class_histogram(class_id, term, histogram)
+
+
+def _materialize_class_histogram(class_id, term):
+    """
+    Build and store the first histogram of a class and term.
+
+    Two writers may both find it missing; the unique key then rejects the
+    second insert, which is rolled back to a savepoint.
+
+    Returns:
+        dict: The stored {series: [count] * 101}, or None when a concurrent
+        writer materialized it first
+    """
+    histogram = _compute_class_histogram(class_id, term)
+    try:
+        with db.session.begin_nested():
+            _insert_class_histogram(class_id, term, histogram)
+    except IntegrityError:
+        return None
+    return histogram
+
+
+def _shift_bucket(class_id, term, series, bucket, delta):
+    db.session.execute(
+        update(GradeHistogram).where(
+            GradeHistogram.class_id == class_id,
+            GradeHistogram.term == term,
+            GradeHistogram.series == series,
+            GradeHistogram.bucket == bucket
+        ).values(student_count=GradeHistogram.student_count + delta)
+    )
+
+
+def apply_student_change(student_id, old_class_id, before, new_class_id, after):
+    """
+    Move a student's contribution between histogram buckets after a write.
+
+    `before`/`after` are snapshots from snapshot_student taken around the change.
+    A histogram that has never been materialized is built from the (flushed)
+    current state instead of being patched, so it never starts out partial;
+    if a concurrent writer materializes it first, the change is patched into
+    theirs.
+
+    Args:
+        student_id (int): Student user_id
+        old_class_id (int): Class the student belonged to before the change (or None)
+        before (dict): {term: {series: bucket}} before the change
+        new_class_id (int): Class the student belongs to after the change (or None)
+        after (dict): {term: {series: bucket}} after the change
+    """
+    db.session.flush()
+    for term in set(before) | set(after):
+        old_buckets = before.get(term, {})
+        new_buckets = after.get(term, {})
+        if old_class_id == new_class_id and old_buckets == new_buckets:
+            continue
+
+        deltas = {}
+        if old_class_id is not None:
+            for series, bucket in old_buckets.items():
+                key = (old_class_id, series, bucket)
+                deltas[key] = deltas.get(key, 0) - 1
+        if new_class_id is not None:
+            for series, bucket in new_buckets.items():
+                key = (new_class_id, series, bucket)
+                deltas[key] = deltas.get(key, 0) + 1
+
+        for class_id in {key[0] for key in deltas}:
+            if not _histogram_exists(class_id, term) and _materialize_class_histogram(class_id, term) is not None:
+                continue
+            # The other writer's histogram cannot see this uncommitted change: patch it in
+            for (key_class_id, series, bucket), delta in deltas.items():
+                if key_class_id == class_id and delta:
+                    _shift_bucket(class_id, term, series, bucket, delta)
+
+
+def read_class_histogram(class_id, term):
+    """
+    Read the precomputed distribution for a class and term.
+
+    Builds and persists it on first access (e.g. for data that predates the
+    table), but only when the class has grades in that term: an arbitrary
+    term in a request never creates rows.
+
+    Returns:
+        dict: {series: [count] * 101}
+    """
+    query = db.session.query(
+        GradeHistogram.series, GradeHistogram.bucket, GradeHistogram.student_count
+    ).filter_by(class_id=class_id, term=term)
+    rows = query.all()
+
+    if not rows:
+        if not _class_has_grades(class_id, term):
+            return {series: [0] * BUCKET_COUNT for series in SERIES}
+        histogram = _materialize_class_histogram(class_id, term)
+        db.session.commit()
+        if histogram is not None:
+            return histogram
+        rows = query.all()
+
+    histogram = {series: [0] * BUCKET_COUNT for series in SERIES}
+    for series, bucket, count in rows:
+        if series in histogram and 0 <= bucket < BUCKET_COUNT:
+            histogram[series][bucket] = count
+    return histogram
+
+
+def recompute_class_histograms(class_terms):
+    """
+    Rebuild the stored histograms of the given (class_id, term) pairs from raw grades.
+
+    Used after bulk writes, where patching counters student by student would cost more.
+    """
+    for class_id, term in set(class_terms):
+        if class_id is not None and term is not None:
+            _write_class_histogram(class_id, term, _compute_class_histogram(class_id, term))
+
+
+def delete_class_histograms(class_id):
+    """Drop all stored histograms of a class."""
+    GradeHistogram.query.filter_by(class_id=class_id).delete(synchronize_session=False)
+
+
+def rebuild_histograms(class_id=None, term=None, dry_run=False):
+    """
+    Recompute stored histograms from raw grades and report any drift.
+
+    Args:
+        class_id (int): Restrict to one class; all classes when None
+        term (str): Restrict to one term; all terms when None
+        dry_run (bool): Only report drift, do not write
+
+    Returns:
+        list: Drift entries as dicts with class_id, term, series, bucket, stored, actual
+    """
+    keys = set()
+    actual_query = db.session.query(StudentProfile.class_id, Grade.term).join(
+        StudentProfile, StudentProfile.user_id == Grade.student_id
+    ).filter(StudentProfile.class_id.isnot(None))
+    stored_query = db.session.query(GradeHistogram.class_id, GradeHistogram.term)
+    if class_id is not None:
+        actual_query = actual_query.filter(StudentProfile.class_id == class_id)
+        stored_query = stored_query.filter(GradeHistogram.class_id == class_id)
+    if term is not None:
+        actual_query = actual_query.filter(Grade.term == term)
+        stored_query = stored_query.filter(GradeHistogram.term == term)
+    keys.update(actual_query.distinct().all())
+    keys.update(stored_query.distinct().all())
+
+    drift = []
+    for key_class_id, key_term in sorted(keys, key=lambda k: (k[0], k[1] or '')):
+        if key_term is None:
+            continue
+        actual = _compute_class_histogram(key_class_id, key_term)
+        stored = {series: [0] * BUCKET_COUNT for series in SERIES}
+        for series, bucket, count in db.session.query(
+            GradeHistogram.series, GradeHistogram.bucket, GradeHistogram.student_count
+        ).filter_by(class_id=key_class_id, term=key_term).all():
+            if series in stored and 0 <= bucket < BUCKET_COUNT:
+                stored[series][bucket] = count
+
+        for series in SERIES:
+            for bucket in range(BUCKET_COUNT):
+                if stored[series][bucket] != actual[series][bucket]:
+                    drift.append({
+                        'class_id': key_class_id,
+                        'term': key_term,
+                        'series': series,
+                        'bucket': bucket,
+                        'stored': stored[series][bucket],
+                        'actual': actual[series][bucket]
+                    })
+
+        if not dry_run:
+            _write_class_histogram(key_class_id, key_term, actual)
+
+    if not dry_run:
+        db.session.commit()
+    return drift
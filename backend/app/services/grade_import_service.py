@@ -0,0 +1,327 @@
+import csv
+import io
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import or_
+from app import db
+from app.models import Class, Grade, StudentProfile, User
+from app.services.grade_histogram_service import recompute_class_histograms
+from app.services.student_average_service import recompute_student_averages
+
+SUBJECTS = ('chinese', 'math', 'english')
+IMPORT_EXTENSIONS = {'csv', 'xlsx'}
+# Rows validated and upserted per batch
+IMPORT_CHUNK_SIZE = 1000
+# The per-row error report is truncated after this many entries
+MAX_REPORTED_ERRORS = 1000
+
+
+def _normalize_header(header):
+    return [str(h).strip().lower() if h is not None else '' for h in header]
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, {column: value}) from a binary CSV stream, one row at a time."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text_stream)
+        header = _normalize_header(next(reader, []))
+        for row_number, row in enumerate(reader, start=2):
+            if any(cell.strip() for cell in row):
+                yield row_number, dict(zip(header, row))
+    finally:
+        # Leave the underlying upload stream open for its owner
+        text_stream.detach()
+
+
+def iter_xlsx_rows(stream):
+    """Yield (row_number, {column: value}) from the first sheet of an XLSX stream, one row at a time."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        for row_number, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield row_number, dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(filename, stream):
+    """Pick the row reader for an uploaded file by extension."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in IMPORT_EXTENSIONS:
+        raise ValueError('Only .csv and .xlsx files are supported')
+    if extension == 'xlsx':
+        return iter_xlsx_rows(stream)
+    return iter_csv_rows(stream)
+
+
+def _merge_grades(entries, now):
+    """Row-by-row upsert for dialects without a native one: update existing grades, insert the rest."""
+    for entry in entries:
+        grade = Grade.query.filter_by(
+            student_id=entry['student_id'], term=entry['term'], subject=entry['subject']
+        ).first()
+        if grade is None:
+            db.session.add(Grade(created_at=now, **entry))
+        else:
+            grade.score = entry['score']
+    db.session.flush()
+
+
+def upsert_grades(entries):
+    """
+    Insert or update many grades in one statement using the unique key
+    (student_id, term, subject); on other databases than MySQL, SQLite and
+    PostgreSQL, one row at a time.
+
+    Args:
+        entries (list): Dicts with student_id, subject, term, score
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    values = [dict(entry, created_at=now) for entry in entries]
+    table = Grade.__table__
+
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(values)
+        statement = statement.on_duplicate_key_update(score=statement.inserted.score)
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=['student_id', 'term', 'subject'],
+            set_={'score': statement.excluded.score}
+        )
+    else:
+        _merge_grades(entries, now)
+        return
+    db.session.execute(statement)
+
+
+def _parse_score(raw):
+    if raw is None or str(raw).strip() == '':
+        return None
+    try:
+        score = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError('score must be a number')
+    if score < 0 or score > 100:
+        raise ValueError('score must be between 0 and 100')
+    return round(score, 2)
+
+
+def _row_entries(row, default_term):
+    """
+    Turn one sheet row into (identifier, [(subject, score, term)]).
+
+    Accepts either long format (subject, score columns) or wide format
+    (one column per subject). Raises ValueError with a readable message.
+    """
+    if row.get('student_id') not in (None, ''):
+        try:
+            identifier = ('student_id', int(float(row['student_id'])))
+        except (TypeError, ValueError):
+            raise ValueError('student_id must be an integer')
+    elif row.get('username') not in (None, ''):
+        identifier = ('username', str(row['username']).strip().lower())
+    elif row.get('student_no') not in (None, ''):
+        identifier = ('student_no', str(row['student_no']).strip().upper())
+    else:
+        raise ValueError('One of student_id, username or student_no is required')
+
+    term = str(row.get('term') or '').strip() or default_term
+
+    entries = []
+    if 'subject' in row:
+        subject = str(row.get('subject') or '').strip().lower()
+        if subject not in SUBJECTS:
+            raise ValueError('subject must be one of: chinese, math, english')
+        score = _parse_score(row.get('score'))
+        if score is None:
+            raise ValueError('score is required')
+        entries.append((subject, score, term))
+    else:
+        for subject in SUBJECTS:
+            try:
+                score = _parse_score(row.get(subject))
+            except ValueError as e:
+                raise ValueError(f'{subject}: {e}')
+            if score is not None:
+                entries.append((subject, score, term))
+        if not entries:
+            raise ValueError('No scores in row')
+    return identifier, entries
+
+
+def _resolve_students(identifiers, class_id=None, teacher_id=None):
+    """
+    Resolve a chunk of identifiers to (user_id, class_id) with one query.
+
+    Returns:
+        dict: {(kind, value): [(user_id, class_id), ...]}
+    """
+    by_kind = {'student_id': set(), 'username': set(), 'student_no': set()}
+    for kind, value in identifiers:
+        by_kind[kind].add(value)
+
+    conditions = []
+    if by_kind['student_id']:
+        conditions.append(User.id.in_(by_kind['student_id']))
+    if by_kind['username']:
+        conditions.append(User.username.in_(by_kind['username']))
+    if by_kind['student_no']:
+        conditions.append(StudentProfile.student_no.in_(by_kind['student_no']))
+    if not conditions:
+        return {}
+
+    query = db.session.query(
+        User.id, User.username, StudentProfile.class_id, StudentProfile.student_no
+    ).join(
+        StudentProfile, StudentProfile.user_id == User.id
+    ).filter(User.role == 'student', or_(*conditions))
+    if class_id is not None:
+        query = query.filter(StudentProfile.class_id == class_id)
+    if teacher_id is not None:
+        query = query.join(Class, Class.id == StudentProfile.class_id).filter(Class.teacher_id == teacher_id)
+
+    resolved = {}
+    for user_id, username, student_class_id, student_no in query.all():
+        match = (user_id, student_class_id)
+        resolved.setdefault(('student_id', user_id), []).append(match)
+        resolved.setdefault(('username', username), []).append(match)
+        if student_no:
+            resolved.setdefault(('student_no', student_no), []).append(match)
+    return resolved
+
+
+def import_grades(rows, default_term='current', class_id=None, teacher_id=None):
+    """
+    Validate and upsert grade rows in chunks.
+
+    Each chunk is resolved with one query, written with one batched upsert and
+    followed by one set-based average recompute, and committed on its own;
+    a chunk that fails is rolled back and its rows reported as errors.
+    Histograms of affected classes are rebuilt once at the end.
+
+    Args:
+        rows (iterable): (row_number, {column: value}) from iter_upload_rows
+        default_term (str): Term for rows without a `term` column
+        class_id (int): Only accept students of this class
+        teacher_id (int): Only accept students of this teacher's classes
+
+    A file that cannot be read to the end (bad encoding, corrupt workbook)
+    keeps the rows read before the problem: they are imported, the problem
+    is reported as an error at the row where reading stopped and `complete`
+    is False.
+
+    Returns:
+        dict: rows (read), imported (rows written), grades (grade values
+        written), students_updated, complete, error_count and errors [{row, message}]
+    """
+    report = {
+        'rows': 0, 'imported': 0, 'grades': 0, 'students_updated': 0,
+        'complete': True, 'error_count': 0, 'errors': []
+    }
+    affected_class_terms = set()
+
+    def add_error(row_number, message):
+        report['error_count'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row_number, 'message': message})
+
+    def flush_chunk(chunk):
+        # Each chunk is its own transaction: when it fails, its rows are reported
+        # as not imported and the import carries on with the next chunk
+        row_errors = []
+        written_rows = 0
+        pending = {}
+        students_by_term = {}
+        try:
+            resolved = _resolve_students([identifier for _, identifier, _ in chunk], class_id, teacher_id)
+            for row_number, identifier, entries in chunk:
+                matches = resolved.get(identifier, [])
+                if not matches:
+                    row_errors.append((row_number, f'Student not found: {identifier[1]}'))
+                    continue
+                if len(matches) > 1:
+                    row_errors.append(
+                        (row_number, f'Ambiguous {identifier[0]} {identifier[1]}; pass class_id to disambiguate')
+                    )
+                    continue
+                user_id, student_class_id = matches[0]
+                written_rows += 1
+                for subject, score, term in entries:
+                    # Later rows win for the same student/subject/term
+                    pending[(user_id, subject, term)] = (score, student_class_id)
+
+            if pending:
+                upsert_grades([
+                    {'student_id': user_id, 'subject': subject, 'term': term, 'score': score}
+                    for (user_id, subject, term), (score, _) in pending.items()
+                ])
+                for (user_id, _, term), _ in pending.items():
+                    students_by_term.setdefault(term, set()).add(user_id)
+                for term, student_ids in students_by_term.items():
+                    recompute_student_averages(student_ids, term)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for row_number, _, _ in chunk:
+                add_error(row_number, f'Not imported, its batch failed: {str(e)}')
+            return
+
+        for row_number, message in row_errors:
+            add_error(row_number, message)
+        for (_, _, term), (_, student_class_id) in pending.items():
+            affected_class_terms.add((student_class_id, term))
+        report['students_updated'] += sum(len(student_ids) for student_ids in students_by_term.values())
+        report['imported'] += written_rows
+        report['grades'] += len(pending)
+
+    chunk = []
+    last_row = 1
+    try:
+        # The readers are lazy: decoding and parsing errors surface while iterating
+        for row_number, row in rows:
+            last_row = row_number
+            report['rows'] += 1
+            try:
+                identifier, entries = _row_entries(row, default_term)
+            except ValueError as e:
+                add_error(row_number, str(e))
+                continue
+            chunk.append((row_number, identifier, entries))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush_chunk(chunk)
+                chunk = []
+    except Exception as e:
+        report['complete'] = False
+        # Reported even past MAX_REPORTED_ERRORS: it explains every missing row
+        report['error_count'] += 1
+        report['errors'].append({
+            'row': last_row + 1,
+            'message': f'File could not be read from this row on: {str(e)}'
+        })
+    if chunk:
+        flush_chunk(chunk)
+
+    if affected_class_terms:
+        try:
+            recompute_class_histograms(affected_class_terms)
+            db.session.commit()
+        except Exception as e:
+            # The grades are committed; `flask rebuild-grade-histograms` repairs the histograms
+            db.session.rollback()
+            current_app.logger.error(f"Histogram recompute after grade import failed: {str(e)}")
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
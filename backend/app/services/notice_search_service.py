@@ -0,0 +1,222 @@
+import re
+import threading
+from flask import current_app
+from sqlalchemy import event, false, text as sql_text
+from app import db
+from app.models import Notice
+
+# Latin words/numbers, or single CJK ideographs (combined into bigrams below)
+_TOKEN_RE = re.compile(r'[0-9a-z]+|[\u3400-\u9fff]')
+# Characters with special meaning in MySQL boolean-mode full-text search
+_BOOLEAN_OPERATORS_RE = re.compile(r'[+\-<>()~*"@]+')
+
+_PENDING_KEY = 'notice_search_changes'
+_BULK_KEY = 'notice_search_bulk_write'
+# FULLTEXT index created by schema.sql over notices (title, content)
+FULLTEXT_INDEX = 'ft_notices__title_content'
+# Whether FULLTEXT_INDEX exists, checked once per process (None until then)
+_fulltext_available = None
+
+
+def _is_cjk(char):
+    return '\u3400' <= char <= '\u9fff'
+
+
+def tokenize(text):
+    """
+    Split text into search tokens: lowercase words, plus unigrams and bigrams
+    of consecutive CJK characters (mirroring MySQL's ngram parser).
+    """
+    tokens = []
+    cjk_run = []
+
+    def flush_cjk():
+        tokens.extend(cjk_run)
+        tokens.extend(a + b for a, b in zip(cjk_run, cjk_run[1:]))
+        cjk_run.clear()
+
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        token = match.group()
+        if len(token) == 1 and _is_cjk(token):
+            # Consecutive ideographs form one run
+            if cjk_run and match.start() != cjk_run_end:
+                flush_cjk()
+            cjk_run.append(token)
+            cjk_run_end = match.end()
+        else:
+            flush_cjk()
+            tokens.append(token)
+    flush_cjk()
+    return tokens
+
+
+def _query_tokens(text):
+    """Tokens a query must all match; for CJK runs the bigrams suffice (or the unigram alone)."""
+    tokens = tokenize(text)
+    bigrams = {t for t in tokens if len(t) == 2 and _is_cjk(t[0])}
+    covered = {ch for bigram in bigrams for ch in bigram}
+    return {t for t in tokens if t not in covered}
+
+
+class NoticeInvertedIndex:
+    """
+    In-process inverted index over notice titles and content, used where the
+    database has no full-text index (SQLite in development). Built lazily on
+    first search and kept current from session commits.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._doc_tokens = {}
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _add(self, notice_id, title, content):
+        tokens = set(tokenize(title)) | set(tokenize(content))
+        self._doc_tokens[notice_id] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(notice_id)
+
+    def _remove(self, notice_id):
+        for token in self._doc_tokens.pop(notice_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(notice_id)
+                if not postings:
+                    del self._postings[token]
+
+    def build(self):
+        """(Re)build the index from the notices table."""
+        with self._lock:
+            self._postings = {}
+            self._doc_tokens = {}
+            rows = db.session.query(Notice.id, Notice.title, Notice.content).yield_per(1000)
+            for notice_id, title, content in rows:
+                self._add(notice_id, title, content)
+            self._built = True
+
+    def invalidate(self):
+        """Force a rebuild on the next search (e.g. after a bulk delete)."""
+        with self._lock:
+            self._built = False
+
+    def update(self, notice_id, title, content):
+        with self._lock:
+            if self._built:
+                self._remove(notice_id)
+                self._add(notice_id, title, content)
+
+    def remove(self, notice_id):
+        with self._lock:
+            if self._built:
+                self._remove(notice_id)
+
+    def search(self, text):
+        """Return the ids of notices containing every query token."""
+        if not self._built:
+            self.build()
+        tokens = _query_tokens(text)
+        if not tokens:
+            return set()
+        with self._lock:
+            postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+            result = set(postings[0])
+            for other in postings[1:]:
+                result &= other
+                if not result:
+                    break
+            return result
+
+
+notice_index = NoticeInvertedIndex()
+
+
+def _has_fulltext_index():
+    found = db.session.execute(sql_text(
+        'SELECT COUNT(*) FROM information_schema.statistics '
+        "WHERE table_schema = DATABASE() AND table_name = 'notices' "
+        "AND index_name = :index_name AND index_type = 'FULLTEXT'"
+    ), {'index_name': FULLTEXT_INDEX}).scalar()
+    if not found:
+        current_app.logger.warning(
+            f"Index {FULLTEXT_INDEX} is missing, notice search uses the in-process index; "
+            "apply schema.sql and restart to use it"
+        )
+    return bool(found)
+
+
+def uses_fulltext():
+    """Whether notice search can use MySQL's FULLTEXT index (checked once per process)."""
+    global _fulltext_available
+    if _fulltext_available is None:
+        _fulltext_available = db.engine.dialect.name == 'mysql' and _has_fulltext_index()
+    return _fulltext_available
+
+
+def apply_search(query, text):
+    """
+    Restrict a Notice query to notices matching `text` in title or content.
+
+    MySQL uses the FULLTEXT index (boolean mode, every word required);
+    other databases, or a MySQL schema still without the index, use the
+    in-process inverted index.
+    """
+    if uses_fulltext():
+        from sqlalchemy.dialects.mysql import match
+
+        words = _BOOLEAN_OPERATORS_RE.sub(' ', text).split()
+        if not words:
+            return query.filter(false())
+        against = ' '.join(f'+{word}' for word in words)
+        return query.filter(match(Notice.title, Notice.content, against=against).in_boolean_mode())
+
+    notice_ids = notice_index.search(text)
+    if not notice_ids:
+        return query.filter(false())
+    return query.filter(Notice.id.in_(notice_ids))
+
+
+def _collect_flush(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Notice):
+            pending[obj.id] = (obj.title, obj.content)
+    for obj in session.deleted:
+        if isinstance(obj, Notice):
+            pending[obj.id] = None
+
+
+def _collect_bulk(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is Notice:
+        orm_execute_state.session.info[_BULK_KEY] = True
+
+
+def _apply_on_commit(session):
+    changes = session.info.pop(_PENDING_KEY, {})
+    if session.info.pop(_BULK_KEY, False):
+        notice_index.invalidate()
+        return
+    for notice_id, values in changes.items():
+        if values is None:
+            notice_index.remove(notice_id)
+        else:
+            notice_index.update(notice_id, *values)
+
+
+def _discard_on_rollback(session):
+    # A savepoint rollback leaves the enclosing transaction (and its changes) alive
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BULK_KEY, None)
+
+
+def init_notice_search(app):
+    """Keep the in-process notice index in sync with committed notice writes."""
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk)
+        event.listen(db.session, 'after_commit', _apply_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
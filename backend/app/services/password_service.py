@@ -0,0 +1,277 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from sqlalchemy import and_, update
+from app import db
+from app.models import User
+
+LEGACY_PREFIX = 'hashed:'
+PBKDF2_ALGORITHM = 'pbkdf2_sha256'
+SCRYPT_ALGORITHM = 'scrypt'
+SALT_BYTES = 16
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+# Below this many passwords a bulk hash runs inline rather than starting processes
+BULK_INLINE_THRESHOLD = 8
+
+
+class PasswordHasherBusy(Exception):
+    """The verification queue is full, or a verification timed out."""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _derive(algorithm, cost, salt, raw_password):
+    password = raw_password.encode('utf-8')
+    if algorithm == PBKDF2_ALGORITHM:
+        return hashlib.pbkdf2_hmac('sha256', password, salt, cost)
+    if algorithm == SCRYPT_ALGORITHM:
+        return hashlib.scrypt(
+            password, salt=salt, n=cost, r=SCRYPT_BLOCK_SIZE, p=SCRYPT_PARALLELISM,
+            maxmem=256 * cost * SCRYPT_BLOCK_SIZE
+        )
+    raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+
+
+def make_hash(raw_password, algorithm, cost):
+    """
+    Hash a password synchronously. Module-level (and free of app state) so
+    process pools can pickle it.
+
+    Format: '<algorithm>$<cost>$<salt>$<hash>' with unpadded base64 parts.
+    """
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(algorithm, cost, salt, raw_password)
+    return f'{algorithm}${cost}${_b64encode(salt)}${_b64encode(digest)}'
+
+
+def _parse(stored_hash):
+    parts = stored_hash.split('$')
+    if len(parts) != 4 or parts[0] not in (PBKDF2_ALGORITHM, SCRYPT_ALGORITHM):
+        return None
+    try:
+        return parts[0], int(parts[1]), _b64decode(parts[2]), _b64decode(parts[3])
+    except ValueError:
+        return None
+
+
+def check_hash(stored_hash, raw_password):
+    """
+    Verify a password synchronously against any supported format, including
+    legacy 'hashed:<plaintext>' values and bare plaintext from older rows.
+    """
+    if not stored_hash or raw_password is None:
+        return False
+    parsed = _parse(stored_hash)
+    if parsed is None:
+        legacy = stored_hash[len(LEGACY_PREFIX):] if stored_hash.startswith(LEGACY_PREFIX) else stored_hash
+        return hmac.compare_digest(legacy.encode('utf-8'), raw_password.encode('utf-8'))
+    algorithm, cost, salt, digest = parsed
+    return hmac.compare_digest(_derive(algorithm, cost, salt, raw_password), digest)
+
+
+class PasswordHasher:
+    """
+    Password hashing with a tunable cost, run on a bounded thread pool.
+
+    hashlib releases the GIL while deriving keys, so the pool verifies
+    `workers` passwords in parallel and leaves the request threads free.
+    At most `workers + queue_size` verifications are admitted at once;
+    beyond that, callers get PasswordHasherBusy immediately instead of
+    queueing behind a login spike.
+    """
+
+    def __init__(self, algorithm=PBKDF2_ALGORITHM, cost=600000, workers=None, queue_size=64, timeout=10):
+        self.algorithm = algorithm
+        self.cost = cost
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def configure(self, algorithm=None, cost=None, workers=None, queue_size=None, timeout=None):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.algorithm = algorithm or self.algorithm
+            self.cost = cost or self.cost
+            self.workers = workers or self.workers
+            self.queue_size = self.queue_size if queue_size is None else queue_size
+            self.timeout = timeout or self.timeout
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            return self._executor, self._slots
+
+    def _run(self, fn, *args):
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        # The slot is held until the hash finishes (or is cancelled before it
+        # starts), not just while this caller waits for it
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('Password hashing timed out')
+
+    def hash(self, raw_password):
+        """Hash a new password with the current algorithm and cost."""
+        return self._run(make_hash, raw_password, self.algorithm, self.cost)
+
+    def verify(self, stored_hash, raw_password):
+        """Check a password against a stored hash of any supported format."""
+        if not stored_hash or raw_password is None:
+            return False
+        if _parse(stored_hash) is None:
+            # Legacy plaintext comparison needs no worker
+            return check_hash(stored_hash, raw_password)
+        return self._run(check_hash, stored_hash, raw_password)
+
+    def needs_rehash(self, stored_hash):
+        """True for legacy values and hashes made with another algorithm or a lower cost."""
+        parsed = _parse(stored_hash or '')
+        return parsed is None or parsed[0] != self.algorithm or parsed[1] < self.cost
+
+    def hash_many(self, raw_passwords, processes=None):
+        """
+        Hash many passwords (e.g. a bulk user import) on a process pool,
+        keeping the web worker's own hashing pool free.
+
+        Returns:
+            list: Hashes in the order of `raw_passwords`
+        """
+        raw_passwords = list(raw_passwords)
+        if len(raw_passwords) < BULK_INLINE_THRESHOLD:
+            return [make_hash(raw, self.algorithm, self.cost) for raw in raw_passwords]
+        processes = processes or os.cpu_count() or 1
+        chunksize = max(len(raw_passwords) // (processes * 4), 1)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(
+                make_hash, raw_passwords,
+                [self.algorithm] * len(raw_passwords), [self.cost] * len(raw_passwords),
+                chunksize=chunksize
+            ))
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(raw_password):
+    return password_hasher.hash(raw_password)
+
+
+def verify_password(stored_hash, raw_password):
+    return password_hasher.verify(stored_hash, raw_password)
+
+
+def needs_rehash(stored_hash):
+    return password_hasher.needs_rehash(stored_hash)
+
+
+def legacy_plaintext(stored_hash):
+    """The plaintext behind a legacy value, or None for real hashes."""
+    if stored_hash is None or _parse(stored_hash) is not None:
+        return None
+    return stored_hash[len(LEGACY_PREFIX):] if stored_hash.startswith(LEGACY_PREFIX) else stored_hash
+
+
+def rehash_legacy_passwords(chunk_size=500, processes=None, progress=None):
+    """
+    Replace every legacy 'hashed:'/plaintext password with a real hash,
+    hashing each chunk on a process pool and committing per chunk.
+
+    Returns:
+        int: Number of users migrated
+    """
+    legacy = and_(
+        ~User.password_hash.like(f'{PBKDF2_ALGORITHM}$%'),
+        ~User.password_hash.like(f'{SCRYPT_ALGORITHM}$%')
+    )
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(User.id, User.password_hash).filter(legacy, User.id > last_id) \
+            .order_by(User.id).limit(chunk_size).all()
+        if not rows:
+            break
+        hashes = password_hasher.hash_many([legacy_plaintext(stored) for _, stored in rows], processes=processes)
+        db.session.execute(update(User), [
+            {'id': user_id, 'password_hash': new_hash} for (user_id, _), new_hash in zip(rows, hashes)
+        ])
+        db.session.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(total)
+    return total
+
+
+def benchmark(seconds=3.0, threads=None):
+    """
+    Measure login verifications per second with the current algorithm and
+    cost: on one thread, and on `threads` threads (default: one per core).
+
+    Returns:
+        dict: algorithm, cost, single-thread rate, pooled rate and rate per core
+    """
+    threads = threads or os.cpu_count() or 1
+    stored = make_hash('benchmark-password', password_hasher.algorithm, password_hasher.cost)
+
+    def run_for(deadline):
+        done = 0
+        while time.perf_counter() < deadline:
+            check_hash(stored, 'benchmark-password')
+            done += 1
+        return done
+
+    start = time.perf_counter()
+    single = run_for(start + seconds)
+    single_rate = single / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pooled = sum(pool.map(run_for, [start + seconds] * threads))
+    pooled_rate = pooled / (time.perf_counter() - start)
+
+    return {
+        'algorithm': password_hasher.algorithm,
+        'cost': password_hasher.cost,
+        'threads': threads,
+        'single_thread_per_sec': single_rate,
+        'pooled_per_sec': pooled_rate,
+        'per_core_per_sec': pooled_rate / min(threads, os.cpu_count() or 1)
+    }
+
+
+def init_password_hasher(app):
+    """Apply the PASSWORD_HASH_* settings."""
+    password_hasher.configure(
+        algorithm=app.config.get('PASSWORD_HASH_ALGORITHM'),
+        cost=app.config.get('PASSWORD_HASH_COST'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS'),
+        queue_size=app.config.get('PASSWORD_HASH_QUEUE_SIZE'),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT')
+    )
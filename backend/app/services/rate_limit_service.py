@@ -0,0 +1,210 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, jsonify, request
+
+# Chance per hit that the SQLite backend deletes expired rows
+_PRUNE_PROBABILITY = 0.01
+
+
+def parse_limit(value):
+    """Parse '<count>/<seconds>' (e.g. '20/60') into (count, seconds); empty disables."""
+    if not value:
+        return None
+    count, _, seconds = str(value).partition('/')
+    return int(count), int(seconds or 60)
+
+
+def _window_start(now, window):
+    return math.floor(now / window) * window
+
+
+def _roll(entry, start, window):
+    """Counts (current, previous) of a stored (start, current, previous) entry as of window `start`."""
+    if entry is None or entry[0] < start - window:
+        return 0, 0
+    if entry[0] < start:
+        return 0, entry[1]
+    return entry[1], entry[2]
+
+
+class MemoryRateLimitBackend:
+    """
+    Per-process window counters in a bounded LRU map: once `max_keys` keys
+    are tracked, the least recently seen key is dropped.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, now):
+        """Count one hit; return (current, previous) window counts including it."""
+        start = _window_start(now, window)
+        with self._lock:
+            current, previous = _roll(self._data.get(key), start, window)
+            current += 1
+            self._data[key] = (start, current, previous)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        return current, previous
+
+    def reset(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Window counters in a local SQLite file, shared by every worker process on
+    the host. A stand-in for a networked store such as Redis: any object with
+    the same hit/reset pair can be used instead. Never touches the app database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limits ('
+                'key TEXT PRIMARY KEY, window_start REAL, current INTEGER, previous INTEGER, expires_at REAL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, window, now):
+        start = _window_start(now, window)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT window_start, current, previous FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            current, previous = _roll(row, start, window)
+            current += 1
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limits (key, window_start, current, previous, expires_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, start, current, previous, start + 2 * window)
+            )
+            if random.random() < _PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM rate_limits WHERE expires_at < ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return current, previous
+
+    def reset(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window rate limiting approximated from two fixed windows: the
+    previous window's count is weighted by how much of it still overlaps the
+    trailing `window` seconds. Constant memory per key.
+    """
+
+    def __init__(self, backend=None, clock=time.time):
+        self.backend = backend or MemoryRateLimitBackend()
+        self._clock = clock
+
+    def hit(self, key, limit, window):
+        """
+        Record an attempt for `key`.
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = self._clock()
+        current, previous = self.backend.hit(key, window, now)
+        elapsed = now - _window_start(now, window)
+        estimate = previous * (window - elapsed) / window + current
+        if estimate <= limit:
+            return True, 0
+        return False, max(int(math.ceil(window - elapsed)), 1)
+
+    def reset(self, key):
+        self.backend.reset(key)
+
+
+limiter = SlidingWindowLimiter()
+
+
+def client_ip():
+    # Behind a reverse proxy, wrap the app in werkzeug's ProxyFix so this is the client
+    return request.remote_addr or 'unknown'
+
+
+def _too_many(retry_after):
+    response = jsonify({'message': 'Too many requests, please try again later'})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def check_rate_limit(scope, config_key, key_func=client_ip):
+    """
+    Count this request against the limit configured under `config_key`.
+    Returns a 429 response when over the limit, else None.
+    """
+    rule = parse_limit(current_app.config.get(config_key))
+    key = key_func()
+    if rule is None or key is None:
+        return None
+    allowed, retry_after = limiter.hit(f'{scope}:{key}', *rule)
+    if not allowed:
+        return _too_many(retry_after)
+    return None
+
+
+def reset_rate_limit(scope, key):
+    limiter.reset(f'{scope}:{key}')
+
+
+def rate_limit(scope, config_key, key_func=client_ip):
+    """Reject requests over the configured limit with 429 before the view (and any DB work) runs."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            rejected = check_rate_limit(scope, config_key, key_func)
+            if rejected is not None:
+                return rejected
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def limit_blueprints(app, blueprint_names, config_key='RATE_LIMIT_DEFAULT'):
+    """Apply a per-client-IP limit to every route of the named blueprints."""
+    blueprint_names = set(blueprint_names)
+
+    @app.before_request
+    def _check_blueprint_limit():
+        if request.blueprint not in blueprint_names or request.method == 'OPTIONS':
+            # CORS preflights are not counted
+            return None
+        return check_rate_limit(f'bp-{request.blueprint}', config_key)
+
+
+def init_rate_limiter(app):
+    """Pick the counter backend: 'memory' (per worker) or 'sqlite:///<path>' (shared on the host)."""
+    backend = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    if backend.startswith('sqlite:///'):
+        path = backend[len('sqlite:///'):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        limiter.backend = SQLiteRateLimitBackend(path)
+    else:
+        limiter.backend = MemoryRateLimitBackend(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
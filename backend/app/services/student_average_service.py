@@ -0,0 +1,103 @@
+from sqlalchemy import bindparam, text
+from app import db
+from app.models import StudentProfile
+
+# Profiles updated per statement by recompute_all_averages
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def recompute_student_averages(student_ids=None, term='current', class_id=None):
+    """
+    Recompute `student_profiles.avg_grade` set-based, in one UPDATE statement.
+
+    Scope is a list of students, a whole class, or (neither given) every
+    profile for the term. Students without any score in the term get NULL,
+    like _sync_student_average.
+
+    Args:
+        student_ids (iterable): Student user_ids
+        term (str): Term the averages are computed over
+        class_id (int): Recompute every student of this class
+
+    Returns:
+        int: Number of profiles updated
+    """
+    scoped = student_ids is not None
+    if scoped:
+        student_ids = sorted({int(sid) for sid in student_ids})
+        if not student_ids:
+            return 0
+
+    filters = []
+    if scoped:
+        filters.append('{alias}user_id IN :student_ids')
+    if class_id is not None:
+        filters.append('{alias}class_id = :class_id')
+
+    if db.engine.dialect.name == 'mysql':
+        where = ' AND '.join(filters).format(alias='sp.')
+        statement = text(f"""
+            UPDATE student_profiles sp
+            LEFT JOIN (
+                SELECT student_id, ROUND(AVG(score), 2) AS avg_score
+                FROM grades
+                WHERE term = :term {'AND student_id IN :student_ids' if scoped else ''}
+                GROUP BY student_id
+            ) g ON g.student_id = sp.user_id
+            SET sp.avg_grade = g.avg_score
+            {'WHERE ' + where if where else ''}
+        """)
+    else:
+        # Portable form (SQLite in development): correlated subquery
+        where = ' AND '.join(filters).format(alias='')
+        statement = text(f"""
+            UPDATE student_profiles
+            SET avg_grade = (
+                SELECT ROUND(AVG(score), 2)
+                FROM grades
+                WHERE grades.student_id = student_profiles.user_id AND grades.term = :term
+            )
+            {'WHERE ' + where if where else ''}
+        """)
+
+    params = {'term': term}
+    if class_id is not None:
+        params['class_id'] = class_id
+    if scoped:
+        statement = statement.bindparams(bindparam('student_ids', expanding=True))
+        params['student_ids'] = student_ids
+    return db.session.execute(statement, params).rowcount
+
+
+def recompute_all_averages(term='current', class_id=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Recompute averages across the database in chunks of `chunk_size` profiles,
+    committing after each chunk so no single transaction grows unbounded.
+
+    Args:
+        term (str): Term the averages are computed over
+        class_id (int): Restrict to one class
+        chunk_size (int): Profiles per UPDATE statement
+        progress (callable): Called with the running total after each chunk
+
+    Returns:
+        int: Number of profiles updated
+    """
+    total = 0
+    last_user_id = None
+    while True:
+        query = db.session.query(StudentProfile.user_id)
+        if class_id is not None:
+            query = query.filter(StudentProfile.class_id == class_id)
+        if last_user_id is not None:
+            query = query.filter(StudentProfile.user_id > last_user_id)
+        chunk = [user_id for (user_id,) in query.order_by(StudentProfile.user_id).limit(chunk_size).all()]
+        if not chunk:
+            break
+
+        total += recompute_student_averages(chunk, term)
+        db.session.commit()
+        last_user_id = chunk[-1]
+        if progress:
+            progress(total)
+    return total
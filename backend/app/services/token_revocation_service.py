@@ -0,0 +1,200 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import attributes
+from app import db, jwt
+from app.models import RevokedToken, User
+from app.services.user_cache_service import get_user, user_cache
+from app.utils.bloom import BloomFilter
+
+_PENDING_KEY = 'token_revocation_users'
+# Overlap between consecutive syncs, covering transactions that commit late
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _jti_key(jti):
+    return f'jti:{jti}'
+
+
+def _user_key(user_id):
+    return f'user:{user_id}'
+
+
+class RevocationList:
+    """
+    Revoked token ids and deactivated users, screened by an in-memory bloom
+    filter. Nearly every token misses the filter and is accepted without a
+    query; only a possible hit is confirmed against the database.
+
+    Each worker keeps its own filter. It is built on first use and catches up
+    with revocations made by other workers every `sync_interval` seconds.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_interval=30, clock=time.monotonic):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._synced_until = None
+        self._next_sync_at = 0
+
+    def add_token(self, jti):
+        self._filter.add(_jti_key(jti))
+
+    def add_user(self, user_id):
+        self._filter.add(_user_key(user_id))
+
+    def _rebuild(self):
+        now = datetime.utcnow()
+        jtis = [jti for (jti,) in db.session.query(RevokedToken.jti).filter(
+            or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > now)
+        )]
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.is_active.is_(False))]
+
+        bloom = BloomFilter(max(self.capacity, 2 * (len(jtis) + len(user_ids))), self.error_rate)
+        for jti in jtis:
+            bloom.add(_jti_key(jti))
+        for user_id in user_ids:
+            bloom.add(_user_key(user_id))
+        self._filter = bloom
+        self._synced_until = now
+
+    def _sync(self):
+        now = datetime.utcnow()
+        since = self._synced_until - SYNC_OVERLAP
+        for (jti,) in db.session.query(RevokedToken.jti).filter(RevokedToken.revoked_at >= since):
+            self.add_token(jti)
+        for (user_id,) in db.session.query(User.id).filter(User.is_active.is_(False), User.updated_at >= since):
+            self.add_user(user_id)
+            # Another worker deactivated the user; do not trust a cached row
+            user_cache.delete(user_id)
+        self._synced_until = now
+
+    def refresh(self, force=False):
+        """Build the filter, or pull in revocations from other workers when due."""
+        now = self._clock()
+        if not force and self._loaded and now < self._next_sync_at:
+            return
+        with self._lock:
+            if not force and self._loaded and now < self._next_sync_at:
+                return
+            try:
+                if not self._loaded or self._filter.is_saturated():
+                    self._rebuild()
+                    self._loaded = True
+                else:
+                    self._sync()
+            except SQLAlchemyError as e:
+                # Keep serving from the current filter and retry on the next interval
+                db.session.rollback()
+                print(f"Token revocation sync failed: {str(e)}")
+                if not self._loaded:
+                    raise
+            self._next_sync_at = now + self.sync_interval
+
+    def is_revoked(self, payload):
+        """Whether a decoded JWT was revoked or belongs to a deactivated user."""
+        self.refresh()
+        jti = payload.get('jti')
+        if jti and _jti_key(jti) in self._filter:
+            if db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None:
+                return True
+        user_id = payload.get('sub')
+        if user_id is not None and _user_key(user_id) in self._filter:
+            user = get_user(int(user_id))
+            if user is None or not user.is_active:
+                return True
+        return False
+
+
+revocation_list = RevocationList()
+
+
+def is_token_revoked(payload):
+    return revocation_list.is_revoked(payload)
+
+
+def is_token_expired(payload):
+    exp = payload.get('exp')
+    return exp is not None and exp <= time.time()
+
+
+def revoke_tokens(*payloads):
+    """
+    Revoke decoded JWTs (access or refresh) until they expire.
+
+    Args:
+        payloads (dict): Decoded token payloads, e.g. from get_jwt() or decode_token()
+
+    Returns:
+        int: Number of tokens newly revoked
+    """
+    jtis = {payload['jti'] for payload in payloads if payload.get('jti')}
+    if not jtis:
+        return 0
+    already = {jti for (jti,) in db.session.query(RevokedToken.jti).filter(RevokedToken.jti.in_(jtis))}
+
+    revoked = []
+    for payload in payloads:
+        jti = payload.get('jti')
+        if not jti or jti in already:
+            continue
+        already.add(jti)
+        exp = payload.get('exp')
+        db.session.add(RevokedToken(
+            jti=jti,
+            token_type=payload.get('type', 'access'),
+            user_id=int(payload['sub']) if payload.get('sub') else None,
+            expires_at=datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp else None
+        ))
+        revoked.append(jti)
+    db.session.commit()
+
+    for jti in revoked:
+        revocation_list.add_token(jti)
+    return len(revoked)
+
+
+def prune_revoked_tokens():
+    """Delete revocation rows whose tokens have expired; returns the number removed."""
+    removed = RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def _collect_flush(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, User) and attributes.get_history(obj, 'is_active').has_changes() and not obj.is_active:
+            pending.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending.add(obj.id)
+
+
+def _apply_on_commit(session):
+    for user_id in session.info.pop(_PENDING_KEY, set()):
+        revocation_list.add_user(user_id)
+
+
+def _discard_on_rollback(session):
+    # Only a savepoint was rolled back; the outer transaction may still commit
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_token_revocation(app):
+    """Register the JWT blocklist check and revoke tokens of users deactivated in this process."""
+    revocation_list.capacity = app.config.get('JWT_REVOCATION_FILTER_CAPACITY', 100000)
+    revocation_list.sync_interval = app.config.get('JWT_REVOCATION_SYNC_SECONDS', 30)
+    jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: is_token_revoked(jwt_payload))
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'after_commit', _apply_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
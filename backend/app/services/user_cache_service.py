@@ -0,0 +1,80 @@
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.models import User
+from app.utils.cache import TTLCache
+
+# Column values of recently authenticated users, keyed by user id;
+# configured by init_user_cache
+user_cache = TTLCache(maxsize=2048, ttl=300)
+
+_PENDING_KEY = 'user_cache_invalidations'
+_CLEAR_ALL = 'all'
+# Password hashes are never kept in the cache; they load on access if needed
+_CACHED_COLUMNS = ('id', 'username', 'full_name', 'role', 'email', 'avatar',
+                   'is_active', 'created_at', 'updated_at')
+
+
+def get_user(user_id):
+    """
+    Return the User row for `user_id` attached to the current session,
+    served from the cache without a query when fresh.
+    """
+    values = user_cache.get(user_id)
+    if values is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, {column: getattr(user, column) for column in _CACHED_COLUMNS})
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    # load=False attaches the cached state without a SELECT (or returns the
+    # instance already in this session's identity map)
+    return db.session.merge(user, load=False)
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _collect_flush(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            pending.add(obj.id)
+
+
+def _collect_bulk(orm_execute_state):
+    # Query.update()/delete() on users bypass the flush; drop everything
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is User:
+        _pending(orm_execute_state.session).add(_CLEAR_ALL)
+
+
+def _apply_on_commit(session):
+    user_ids = session.info.pop(_PENDING_KEY, set())
+    if _CLEAR_ALL in user_ids:
+        user_cache.clear()
+        return
+    for user_id in user_ids:
+        user_cache.delete(user_id)
+
+
+def _discard_on_rollback(session):
+    # Nested rollback: the evictions of the enclosing transaction still apply
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_user_cache(app):
+    """Configure the user cache and evict users on committed updates or deletes."""
+    user_cache.maxsize = app.config.get('USER_CACHE_SIZE', 2048)
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', 300)
+    if not event.contains(db.session, 'after_flush', _collect_flush):
+        event.listen(db.session, 'after_flush', _collect_flush)
+        event.listen(db.session, 'do_orm_execute', _collect_bulk)
+        event.listen(db.session, 'after_commit', _apply_on_commit)
+        event.listen(db.session, 'after_rollback', _discard_on_rollback)
@@ -0,0 +1,42 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set: `in` never misses an added key, and reports
+    a key that was never added with probability about `error_rate` while no
+    more than `capacity` keys have been added. Keys cannot be removed.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions derived from one 128-bit digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def is_saturated(self):
+        """True once more than `capacity` keys were added (error rate exceeds the target)."""
+        return self.count > self.capacity
@@ -1,16 +1,29 @@
 from functools import wraps
-from flask import jsonify, request
+from flask import g, jsonify, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
-from app.models import User
+from app.services.user_cache_service import get_user
 import traceback
 
 
+def _load_identity():
+    """
+    Verify the request's JWT once and keep the identity on `g`.
+    Later decorators and get_current_user on the same request reuse it.
+    """
+    if 'jwt_identity' not in g:
+        verify_jwt_in_request()
+        # JWT identity is stored as string, convert to int for database queries
+        user_id_str = get_jwt_identity()
+        g.jwt_identity = (int(user_id_str) if user_id_str else None, get_jwt().get('role'))
+    return g.jwt_identity
+
+
 def jwt_required(f):
     """JWT Authentication Decorator"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
-            verify_jwt_in_request()
+            _load_identity()
         except Exception as e:
             # Capture all JWT-related errors (including NoAuthorizationError, JWTDecodeError, etc.)
             auth_header = request.headers.get('Authorization', 'Not found')
@@ -33,34 +46,30 @@ def role_required(*allowed_roles):
         @jwt_required
         def decorated_function(*args, **kwargs):
             try:
-                claims = get_jwt()
-                user_role = claims.get('role')
-                
+                # Already verified by jwt_required; read the identity cached on g
+                user_id, user_role = _load_identity()
+
                 if user_role not in allowed_roles:
                     return jsonify({'message': 'Insufficient permissions'}), 403
-                
+
                 # Inject the current user ID and role into kwargs to facilitate future usage.
-                # JWT identity is stored as string, convert to int for database queries
-                user_id_str = get_jwt_identity()
-                kwargs['current_user_id'] = int(user_id_str) if user_id_str else None
+                kwargs['current_user_id'] = user_id
                 kwargs['current_user_role'] = user_role
-                
+
             except Exception as e:
                 return jsonify({'message': 'Permission verification failed'}), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
 
 def get_current_user():
-    """Get the current logged-in user object"""
+    """Get the current logged-in user object (cached across requests, see user_cache_service)"""
     try:
-        user_id_str = get_jwt_identity()
-        if user_id_str:
-            user_id = int(user_id_str)
-            return User.query.get(user_id)
-        return None
+        user_id, _ = _load_identity()
+        if user_id is None:
+            return None
+        return get_user(user_id)
     except:
         return None
-
@@ -0,0 +1,128 @@
+import posixpath
+import zipfile
+from lxml import etree
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+_HEADER_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/header'
+_FOOTER_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer'
+
+P, T, TAB, BR, CR, TBL, TR, TC = (_W + name for name in ('p', 't', 'tab', 'br', 'cr', 'tbl', 'tr', 'tc'))
+# Separator between the cells of a table row in the extracted text
+CELL_SEPARATOR = ' | '
+
+
+def _release(elem):
+    """Drop a processed element and its already processed siblings, keeping memory flat."""
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def iter_part_text(stream):
+    """
+    Yield the text of one WordprocessingML part (document, header or footer)
+    in document order, parsing it incrementally: one line per non-empty
+    paragraph outside tables, one line per table row with its cells joined
+    by CELL_SEPARATOR. Fallback copies of alternate content are skipped.
+    """
+    paragraphs = []  # text pieces of the paragraphs being read (text boxes nest)
+    tables = []      # per open table: (cells of the current row, paragraphs of the current cell)
+    skip_depth = 0
+    for event, elem in etree.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if tag == _MC_FALLBACK:
+            skip_depth += 1 if event == 'start' else -1
+            if event == 'end':
+                _release(elem)
+            continue
+        if skip_depth:
+            continue
+
+        if event == 'start':
+            if tag == P:
+                paragraphs.append([])
+            elif tag == TBL:
+                tables.append(([], []))
+            elif tag == TC and tables:
+                del tables[-1][1][:]
+            continue
+
+        if tag == T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == TAB:
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (BR, CR):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == P:
+            text = ''.join(paragraphs.pop()).strip() if paragraphs else ''
+            if text:
+                if tables:
+                    tables[-1][1].append(text)
+                else:
+                    yield text
+            _release(elem)
+        elif tag == TC and tables:
+            cells, cell_paragraphs = tables[-1]
+            cells.append(' '.join(cell_paragraphs))
+        elif tag == TR and tables:
+            cells = tables[-1][0]
+            if any(cells):
+                row = CELL_SEPARATOR.join(cells)
+                if len(tables) > 1:
+                    # Nested table: its rows become text of the enclosing cell
+                    tables[-2][1].append(row)
+                else:
+                    yield row
+            del cells[:]
+            _release(elem)
+        elif tag == TBL:
+            tables.pop()
+            _release(elem)
+
+
+def _related_parts(archive, rel_type):
+    try:
+        rels = archive.read('word/_rels/document.xml.rels')
+    except KeyError:
+        return []
+    return [
+        posixpath.normpath(posixpath.join('word', rel.get('Target')))
+        for rel in etree.fromstring(rels).iter(_RELS)
+        if rel.get('Type') == rel_type and rel.get('TargetMode') != 'External'
+    ]
+
+
+def _iter_parts_text(archive, names):
+    seen = set()
+    for name in names:
+        if name not in archive.NameToInfo:
+            continue
+        with archive.open(name) as stream:
+            for line in iter_part_text(stream):
+                # First-page, even-page and default headers often repeat the same text
+                if line not in seen:
+                    seen.add(line)
+                    yield line
+
+
+def iter_docx_text(source):
+    """
+    Yield the text lines of a .docx file without building its object model:
+    header text, then the body (paragraphs and table rows in order), then
+    footer text. Memory use stays flat however large the document is.
+
+    Args:
+        source (str or file-like): Path to the .docx file, or a seekable binary file object
+    """
+    with zipfile.ZipFile(source) as archive:
+        yield from _iter_parts_text(archive, _related_parts(archive, _HEADER_TYPE))
+        with archive.open('word/document.xml') as stream:
+            yield from iter_part_text(stream)
+        yield from _iter_parts_text(archive, _related_parts(archive, _FOOTER_TYPE))
@@ -1,2 +1,134 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, false, or_
+
+# Keyset pagination limits for list endpoints
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
 def helper_function():
     pass
+
+
+def wants_pagination(args):
+    """Whether the request opted into cursor pagination (via `limit` or `cursor`)."""
+    return 'limit' in args or 'cursor' in args
+
+
+def parse_page_limit(raw_limit):
+    """Parse the `limit` query argument, clamped to MAX_PAGE_LIMIT. Raises ValueError on bad input."""
+    if raw_limit in (None, ''):
+        return DEFAULT_PAGE_LIMIT
+    try:
+        limit = int(raw_limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be a positive integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row of a page into an opaque cursor."""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor produced by encode_cursor back into typed values.
+
+    Args:
+        cursor (str): Opaque cursor from a previous page
+        columns (list): Sort columns the cursor was built for
+
+    Returns:
+        list: One value per column, converted to the column's Python type
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the columns
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    values = []
+    for column, value in zip(columns, payload):
+        if value is None:
+            values.append(None)
+            continue
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif python_type is date:
+                values.append(date.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+    return values
+
+
+def _after_key(column, value):
+    """Condition for rows sorting strictly after `value` on a DESC column (NULLs sort last)."""
+    if value is None:
+        return None
+    if getattr(column.expression, 'nullable', True):
+        return or_(column < value, column.is_(None))
+    return column < value
+
+
+def _equal_key(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def keyset_paginate(query, columns, limit, cursor=None, key_func=None):
+    """
+    Fetch one page of `query` ordered by `columns` DESC using keyset pagination.
+
+    The last column must be unique (normally the primary key) so that every row
+    has a distinct position. Cost per page depends only on `limit`, never on how
+    deep the page is.
+
+    Args:
+        query: SQLAlchemy query without ORDER BY/LIMIT applied
+        columns (list): Sort columns, all descending
+        limit (int): Page size
+        cursor (str): Cursor returned with the previous page, if any
+        key_func (callable): Maps a result row to its sort-key values;
+            defaults to reading the column attributes from the row
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        clauses = []
+        for i, (column, value) in enumerate(zip(columns, values)):
+            after = _after_key(column, value)
+            if after is None:
+                continue
+            prefix = [_equal_key(c, v) for c, v in zip(columns[:i], values[:i])]
+            clauses.append(and_(*prefix, after))
+        query = query.filter(or_(*clauses)) if clauses else query.filter(false())
+
+    rows = query.order_by(*[c.desc() for c in columns]).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if key_func is None:
+            key_func = lambda row: [getattr(row, c.key) for c in columns]
+        next_cursor = encode_cursor(key_func(rows[-1]))
+    return rows, next_cursor
@@ -0,0 +1,53 @@
+import posixpath
+import zipfile
+from lxml import etree
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+PARAGRAPH, TEXT, BREAK = _A + 'p', _A + 't', _A + 'br'
+
+
+def _slide_names(archive):
+    """Slide part names in presentation order (p:sldIdLst), not zip order."""
+    rels = etree.fromstring(archive.read('ppt/_rels/presentation.xml.rels'))
+    targets = {
+        rel.get('Id'): posixpath.normpath(posixpath.join('ppt', rel.get('Target')))
+        for rel in rels.iter(_RELS)
+    }
+    presentation = etree.fromstring(archive.read('ppt/presentation.xml'))
+    return [targets[slide.get(_R_ID)] for slide in presentation.iter(_P + 'sldId') if slide.get(_R_ID) in targets]
+
+
+def iter_slide_text(stream):
+    """Yield the non-empty text paragraphs of one slide part, parsed incrementally."""
+    pieces = []
+    for _, elem in etree.iterparse(stream, events=('end',), tag=(TEXT, BREAK, PARAGRAPH)):
+        if elem.tag == TEXT:
+            pieces.append(elem.text or '')
+        elif elem.tag == BREAK:
+            pieces.append('\n')
+        else:
+            text = ''.join(pieces).strip()
+            pieces = []
+            if text:
+                yield text
+            elem.clear(keep_tail=True)
+
+
+def iter_pptx_text(source):
+    """
+    Yield the text lines of a .pptx file, slide by slide in presentation
+    order, without loading the whole presentation.
+
+    Args:
+        source (str or file-like): Path to the .pptx file, or a seekable binary file object
+    """
+    with zipfile.ZipFile(source) as archive:
+        for name in _slide_names(archive):
+            if name not in archive.NameToInfo:
+                continue
+            with archive.open(name) as stream:
+                yield from iter_slide_text(stream)
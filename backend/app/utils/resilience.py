@@ -0,0 +1,135 @@
+import math
+import threading
+import time
+
+
+class ServiceUnavailable(Exception):
+    """An outbound call was refused locally, without reaching the upstream service."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BulkheadFull(ServiceUnavailable):
+    """Every slot is busy and the wait queue is full, or the wait timed out."""
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """The circuit breaker is open after repeated upstream failures."""
+
+
+class Bulkhead:
+    """
+    Caps concurrent calls to a dependency at `max_concurrent`. Up to
+    `max_waiting` callers may wait (each for at most `timeout` seconds) for a
+    slot; anyone beyond that is rejected immediately, so a slow dependency
+    can tie up at most max_concurrent + max_waiting request threads.
+    """
+
+    def __init__(self, max_concurrent=8, max_waiting=16, timeout=5.0, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self.rejected = 0
+
+    def acquire(self):
+        with self._cond:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                return
+            if self._waiting >= self.max_waiting:
+                self.rejected += 1
+                raise BulkheadFull('Too many requests in progress')
+            self._waiting += 1
+            try:
+                deadline = self._clock() + self.timeout
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise BulkheadFull('Timed out waiting for a free slot')
+                    self._cond.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self._active,
+                'waiting': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting,
+                'rejected': self.rejected
+            }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and then rejects
+    calls for `reset_timeout` seconds. After that a single probe call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+
+    Every before_call() must be followed by record_success() or record_failure().
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (self._clock() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError('Service temporarily unavailable', retry_after=math.ceil(remaining))
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError('Service temporarily unavailable')
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
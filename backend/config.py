@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
@@ -11,6 +12,81 @@ class Config:
     DB_PORT = os.environ.get('DB_PORT', '3306')
     DB_NAME = os.environ.get('DB_NAME', 'edusmart')
 
+    # Seconds a cached dashboard summary may be served before it is recomputed
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', '60'))
+    # Access tokens are short-lived; clients renew them with the refresh token
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', '15')))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', '30')))
+    # Expected revoked tokens per worker filter, and seconds between syncs with other workers
+    JWT_REVOCATION_FILTER_CAPACITY = int(os.environ.get('JWT_REVOCATION_FILTER_CAPACITY', '100000'))
+    JWT_REVOCATION_SYNC_SECONDS = int(os.environ.get('JWT_REVOCATION_SYNC_SECONDS', '30'))
+    # Password KDF ('pbkdf2_sha256' iterations or 'scrypt' N) and the bounded hashing pool;
+    # see `flask benchmark-password-hashing` to size the cost against login throughput
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2_sha256')
+    PASSWORD_HASH_COST = int(os.environ.get('PASSWORD_HASH_COST', '600000'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '64'))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+    # Rate limits as '<count>/<seconds>' (empty disables). Counters live per worker ('memory')
+    # or in a SQLite file shared by the workers on one host ('sqlite:///<path>')
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+    LOGIN_RATE_LIMIT_PER_IP = os.environ.get('LOGIN_RATE_LIMIT_PER_IP', '20/60')
+    LOGIN_RATE_LIMIT_PER_USERNAME = os.environ.get('LOGIN_RATE_LIMIT_PER_USERNAME', '10/300')
+    # Optional per-IP limit on every route of RATE_LIMITED_BLUEPRINTS (comma-separated; default all)
+    RATE_LIMIT_DEFAULT = os.environ.get('RATE_LIMIT_DEFAULT', '')
+    RATE_LIMITED_BLUEPRINTS = [name for name in os.environ.get('RATE_LIMITED_BLUEPRINTS', '').split(',') if name]
+    # DeepSeek API: one pooled client per worker. Point DEEPSEEK_BASE_URL at a local stub to test
+    DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY')
+    DEEPSEEK_BASE_URL = os.environ.get('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+    DEEPSEEK_MODEL = os.environ.get('DEEPSEEK_MODEL', 'deepseek-chat')
+    DEEPSEEK_CONNECT_TIMEOUT = float(os.environ.get('DEEPSEEK_CONNECT_TIMEOUT', '5'))
+    DEEPSEEK_READ_TIMEOUT = float(os.environ.get('DEEPSEEK_READ_TIMEOUT', '60'))
+    DEEPSEEK_MAX_RETRIES = int(os.environ.get('DEEPSEEK_MAX_RETRIES', '2'))
+    DEEPSEEK_BACKOFF_BASE = float(os.environ.get('DEEPSEEK_BACKOFF_BASE', '0.5'))
+    DEEPSEEK_BACKOFF_MAX = float(os.environ.get('DEEPSEEK_BACKOFF_MAX', '8'))
+    # Calls in flight per worker (also the connection pool size)
+    DEEPSEEK_MAX_CONCURRENCY = int(os.environ.get('DEEPSEEK_MAX_CONCURRENCY', '8'))
+    # Requests allowed to wait for a free call slot, and for how long; keep
+    # MAX_CONCURRENCY + MAX_WAITING below the worker's thread count so AI
+    # spikes cannot occupy every thread serving the rest of the API
+    DEEPSEEK_MAX_WAITING = int(os.environ.get('DEEPSEEK_MAX_WAITING', '16'))
+    DEEPSEEK_QUEUE_TIMEOUT = float(os.environ.get('DEEPSEEK_QUEUE_TIMEOUT', '5'))
+    # Circuit breaker: consecutive failed calls before failing fast, and seconds before a trial call
+    DEEPSEEK_BREAKER_FAILURES = int(os.environ.get('DEEPSEEK_BREAKER_FAILURES', '5'))
+    DEEPSEEK_BREAKER_RESET = float(os.environ.get('DEEPSEEK_BREAKER_RESET', '30'))
+    DEEPSEEK_KEEPALIVE_EXPIRY = float(os.environ.get('DEEPSEEK_KEEPALIVE_EXPIRY', '30'))
+    # Cache of AI answers keyed on normalized prompt + system prompt + model; the optional
+    # disk tier (a local SQLite file) is shared by workers on a host and survives restarts
+    AI_CACHE_ENABLED = os.environ.get('AI_CACHE_ENABLED', 'true').lower() != 'false'
+    AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', '1024'))
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', '86400'))
+    AI_CACHE_DISK_PATH = os.environ.get('AI_CACHE_DISK_PATH', '')
+    # Courseware analysis runs as background jobs: worker threads per process, and jobs
+    # allowed to wait for one
+    DOCUMENT_JOB_WORKERS = int(os.environ.get('DOCUMENT_JOB_WORKERS', '2'))
+    DOCUMENT_JOB_QUEUE_SIZE = int(os.environ.get('DOCUMENT_JOB_QUEUE_SIZE', '32'))
+    # Uploads up to this size are held in memory until their job runs; larger ones
+    # spill to a file in UPLOAD_FOLDER, kept until the job finishes
+    DOCUMENT_SPOOL_MAX_BYTES = int(os.environ.get('DOCUMENT_SPOOL_MAX_BYTES', str(2 * 1024 * 1024)))
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    # Worker processes parsing uploaded courseware (0 parses on the job thread), and the
+    # seconds one file may take
+    DOCUMENT_EXTRACT_PROCESSES = int(os.environ.get('DOCUMENT_EXTRACT_PROCESSES', str(min(os.cpu_count() or 1, 2))))
+    DOCUMENT_EXTRACT_TIMEOUT = float(os.environ.get('DOCUMENT_EXTRACT_TIMEOUT', '60'))
+    # SQLite file holding the BM25 index over extracted courseware text (rebuild it from
+    # the database with `flask rebuild-courseware-index`)
+    COURSEWARE_INDEX_PATH = os.environ.get('COURSEWARE_INDEX_PATH', 'data/courseware_index.db')
+    # Long documents are analyzed in chunks of about this many tokens, on at most
+    # DOCUMENT_ANALYSIS_WORKERS parallel calls per job, then merged in one final call
+    DOCUMENT_CHUNK_TOKENS = int(os.environ.get('DOCUMENT_CHUNK_TOKENS', '2000'))
+    DOCUMENT_ANALYSIS_WORKERS = int(os.environ.get('DOCUMENT_ANALYSIS_WORKERS', '4'))
+    # Authenticated user rows kept in memory, and seconds before one is re-read
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '2048'))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', '300'))
+    # Seconds between keep-alive comments on idle server-sent event streams
+    EVENT_STREAM_HEARTBEAT = int(os.environ.get('EVENT_STREAM_HEARTBEAT', '15'))
+
     @property
     def SQLALCHEMY_DATABASE_URI(self):
         # Prefer explicit URL env vars when provided
@@ -1,4 +1,6 @@
 import os
+import click
+from flask.cli import with_appcontext
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -7,13 +9,139 @@ load_dotenv()
 from app import create_app, db
 from app.models import User, Assignment, Notice, Class, UserPreferences
 
-app = create_app(os.getenv('FLASK_CONFIG') or 'default')
 
-
-@app.shell_context_processor
 def make_shell_context():
     return dict(db=db, User=User, Assignment=Assignment, Notice=Notice, Class=Class, UserPreferences=UserPreferences)
 
 
+@click.command('rebuild-grade-histograms')
+@with_appcontext
+@click.option('--class-id', type=int, default=None, help='Only rebuild this class.')
+@click.option('--term', default=None, help='Only rebuild this term.')
+@click.option('--dry-run', is_flag=True, help='Report drift without writing.')
+def rebuild_grade_histograms(class_id, term, dry_run):
+    """Recompute the precomputed grade histograms from raw grades and report drift."""
+    from app.services.grade_histogram_service import rebuild_histograms
+
+    drift = rebuild_histograms(class_id=class_id, term=term, dry_run=dry_run)
+    for entry in drift:
+        click.echo(
+            f"class={entry['class_id']} term={entry['term']} {entry['series']}[{entry['bucket']}]: "
+            f"stored={entry['stored']} actual={entry['actual']}"
+        )
+    click.echo(f"{len(drift)} drifted bucket(s){' (dry run, nothing written)' if dry_run else ', histograms rebuilt'}")
+
+
+@click.command('recompute-averages')
+@with_appcontext
+@click.option('--term', default='current', show_default=True, help='Term to average over.')
+@click.option('--class-id', type=int, default=None, help='Only recompute this class.')
+@click.option('--chunk-size', type=int, default=1000, show_default=True, help='Profiles per UPDATE statement.')
+def recompute_averages(term, class_id, chunk_size):
+    """Recompute student_profiles.avg_grade set-based, in chunks."""
+    from app.services.student_average_service import recompute_all_averages
+
+    total = recompute_all_averages(
+        term=term,
+        class_id=class_id,
+        chunk_size=chunk_size,
+        progress=lambda done: click.echo(f'{done} profile(s) updated...')
+    )
+    click.echo(f'Recomputed averages for {total} profile(s) (term={term})')
+
+
+@click.command('prune-revoked-tokens')
+@with_appcontext
+def prune_revoked_tokens_command():
+    """Delete revocation entries for tokens that have expired anyway."""
+    from app.services.token_revocation_service import prune_revoked_tokens
+
+    click.echo(f'Removed {prune_revoked_tokens()} expired revocation(s)')
+
+
+@click.command('hash-legacy-passwords')
+@with_appcontext
+@click.option('--chunk-size', type=int, default=500, show_default=True, help='Users hashed and updated per batch.')
+@click.option('--processes', type=int, default=None, help='Hashing processes (default: one per core).')
+def hash_legacy_passwords(chunk_size, processes):
+    """Replace legacy 'hashed:' passwords with real hashes, in bulk."""
+    from app.services.password_service import rehash_legacy_passwords
+
+    total = rehash_legacy_passwords(
+        chunk_size=chunk_size,
+        processes=processes,
+        progress=lambda done: click.echo(f'{done} password(s) hashed...')
+    )
+    click.echo(f'Migrated {total} legacy password(s)')
+
+
+@click.command('benchmark-password-hashing')
+@with_appcontext
+@click.option('--seconds', type=float, default=3.0, show_default=True, help='Duration of each measurement.')
+@click.option('--threads', type=int, default=None, help='Concurrent verifications (default: one per core).')
+def benchmark_password_hashing(seconds, threads):
+    """Measure logins per second per core at the configured PASSWORD_HASH_* cost."""
+    from app.services.password_service import benchmark
+
+    result = benchmark(seconds=seconds, threads=threads)
+    click.echo(f"{result['algorithm']} cost={result['cost']}")
+    click.echo(f"  1 thread:   {result['single_thread_per_sec']:.1f} verifications/s")
+    click.echo(f"  {result['threads']} threads: {result['pooled_per_sec']:.1f} verifications/s "
+               f"({result['per_core_per_sec']:.1f}/s per core)")
+
+
+@click.command('benchmark-docx-extraction')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--repeat', type=int, default=3, show_default=True, help='Extractions averaged per extractor.')
+def benchmark_docx_extraction_command(path, repeat):
+    """Compare streaming and python-docx text extraction on PATH: speed and peak memory."""
+    from app.services.document_service import benchmark_docx_extraction
+
+    for result in benchmark_docx_extraction(path, repeat=repeat):
+        click.echo(f"{result['extractor']:<12} {result['seconds'] * 1000:9.1f} ms  "
+                   f"peak RSS +{result['peak_rss_growth_kb'] / 1024:7.1f} MB  "
+                   f"{result['characters']} characters")
+
+
+@click.command('rebuild-courseware-index')
+@with_appcontext
+def rebuild_courseware_index_command():
+    """Re-index the extracted text of every uploaded courseware file for search."""
+    from app.services.courseware_search_service import rebuild_courseware_index
+
+    click.echo(f'Indexed {rebuild_courseware_index()} file(s)')
+
+
+@click.command('requeue-document-jobs')
+@with_appcontext
+@click.option('--stale-after', type=int, default=30, show_default=True,
+              help='Minutes after which a job still marked processing is considered lost.')
+def requeue_document_jobs(stale_after):
+    """Run the document analyses left unfinished when a worker stopped."""
+    from app.services.document_job_service import pending_document_jobs, process_document_job
+
+    file_ids = pending_document_jobs(stale_after_minutes=stale_after)
+    for file_id in file_ids:
+        process_document_job(file_id)
+        click.echo(f'Processed document {file_id}')
+    click.echo(f'{len(file_ids)} pending document job(s) run')
+
+
+# Spawned pool processes (text extraction, password hashing) re-import this script as
+# __mp_main__; they only run worker functions and must not build a whole app each
+if __name__ != '__mp_main__':
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+    app.shell_context_processor(make_shell_context)
+    app.cli.add_command(rebuild_grade_histograms)
+    app.cli.add_command(recompute_averages)
+    app.cli.add_command(prune_revoked_tokens_command)
+    app.cli.add_command(hash_legacy_passwords)
+    app.cli.add_command(benchmark_password_hashing)
+    app.cli.add_command(benchmark_docx_extraction_command)
+    app.cli.add_command(rebuild_courseware_index_command)
+    app.cli.add_command(requeue_document_jobs)
+
+
 if __name__ == '__main__':
     app.run()
@@ -21,7 +21,11 @@ CREATE TABLE IF NOT EXISTS users (
   created_at     DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at     DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   CONSTRAINT pk_users PRIMARY KEY (user_id),
-  CONSTRAINT uq_users__username UNIQUE (username)
+  CONSTRAINT uq_users__username UNIQUE (username),
+  -- Keyset pagination order for GET /api/admin/users
+  INDEX idx_users__created_at (created_at, user_id),
+  -- Deactivated users picked up by the token revocation sync
+  INDEX idx_users__is_active_updated_at (is_active, updated_at)
 ) ENGINE=InnoDB;
 
 -- ===============
@@ -57,9 +61,25 @@ CREATE TABLE IF NOT EXISTS notices (
   CONSTRAINT pk_notices PRIMARY KEY (notice_id),
   CONSTRAINT fk_notices__author FOREIGN KEY (author_id)
       REFERENCES users(user_id) ON UPDATE CASCADE ON DELETE SET NULL,
-  INDEX idx_notices__author_id (author_id)
+  INDEX idx_notices__author_id (author_id),
+  -- Keyset pagination order for GET /api/admin/notices
+  INDEX idx_notices__date_created (date, created_at, notice_id),
+  -- Full-text search (?q=) over title and content; ngram parser handles Chinese text
+  FULLTEXT INDEX ft_notices__title_content (title, content) WITH PARSER ngram
 ) ENGINE=InnoDB;
 
+-- Databases created before the FULLTEXT index existed: add it once (re-running is a no-op)
+SET @ft_notices_sql = IF(
+  (SELECT COUNT(*) FROM information_schema.statistics
+   WHERE table_schema = DATABASE() AND table_name = 'notices'
+     AND index_name = 'ft_notices__title_content') = 0,
+  'ALTER TABLE notices ADD FULLTEXT INDEX ft_notices__title_content (title, content) WITH PARSER ngram',
+  'DO 0'
+);
+PREPARE ft_notices_stmt FROM @ft_notices_sql;
+EXECUTE ft_notices_stmt;
+DEALLOCATE PREPARE ft_notices_stmt;
+
 -- ===============
 -- grades (Unique for each student x term x subject)
 -- ===============
@@ -114,7 +134,9 @@ REFERENCES classes(class_id) ON UPDATE CASCADE ON DELETE CASCADE,
 CONSTRAINT fk_assignments__teacher FOREIGN KEY (teacher_id)
 REFERENCES users(user_id) ON UPDATE CASCADE ON DELETE SET NULL,
 INDEX idx_assignments__class_id (class_id),
-INDEX idx_assignments__teacher_id (teacher_id)
+INDEX idx_assignments__teacher_id (teacher_id),
+-- Keyset pagination order for GET /api/teacher-tasks/assignments
+INDEX idx_assignments__due_date (due_date, assignment_id)
 ) ENGINE=InnoDB;
 
 -- =====================
@@ -138,4 +160,65 @@ REFERENCES classes(class_id) ON UPDATE CASCADE ON DELETE SET NULL,
 UNIQUE KEY uq_student_profiles__class_studentno (class_id, student_no),
 INDEX idx_student_profiles__class_id (class_id),
 INDEX idx_student_profiles__user_id (user_id)
-) ENGINE=InnoDB;
\ No newline at end of file
+) ENGINE=InnoDB;
+-- =====================
+-- grade_histograms (Precomputed 0-100 score distribution per class x term x series,
+-- maintained incrementally on grade writes)
+-- =====================
+CREATE TABLE IF NOT EXISTS grade_histograms (
+histogram_id     BIGINT AUTO_INCREMENT,
+class_id         BIGINT NOT NULL,
+term             VARCHAR(50) NOT NULL,
+series           ENUM('chinese','math','english','average') NOT NULL,
+bucket           SMALLINT NOT NULL,
+student_count    INT NOT NULL DEFAULT 0,
+CONSTRAINT pk_grade_histograms PRIMARY KEY (histogram_id),
+CONSTRAINT uq_grade_histograms__class_term_series_bucket UNIQUE (class_id, term, series, bucket),
+CONSTRAINT fk_grade_histograms__class FOREIGN KEY (class_id)
+REFERENCES classes(class_id) ON UPDATE CASCADE ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- =====================
+-- revoked_tokens (JWTs revoked before expiry, e.g. on logout)
+-- =====================
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+revoked_token_id BIGINT AUTO_INCREMENT,
+jti              VARCHAR(36) NOT NULL,
+token_type       ENUM('access','refresh') NOT NULL,
+user_id          BIGINT,
+expires_at       DATETIME,
+revoked_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+CONSTRAINT pk_revoked_tokens PRIMARY KEY (revoked_token_id),
+CONSTRAINT uq_revoked_tokens__jti UNIQUE (jti),
+INDEX idx_revoked_tokens__expires_at (expires_at),
+-- Incremental sync of each worker's in-memory revocation filter
+INDEX idx_revoked_tokens__revoked_at (revoked_at),
+CONSTRAINT fk_revoked_tokens__user FOREIGN KEY (user_id)
+REFERENCES users(user_id) ON UPDATE CASCADE ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- =====================
+-- ai_files (Uploaded courseware and its asynchronous AI analysis job)
+-- =====================
+CREATE TABLE IF NOT EXISTS ai_files (
+ai_file_id       BIGINT AUTO_INCREMENT,
+user_id          BIGINT NOT NULL,
+file_name        VARCHAR(255) NOT NULL,
+file_path        VARCHAR(255) NOT NULL,
+file_type        VARCHAR(50),
+source           VARCHAR(20) DEFAULT 'upload',
+status           ENUM('uploaded','processing','done','failed') NOT NULL DEFAULT 'uploaded',
+content_hash     CHAR(64),
+text_content     MEDIUMTEXT,
+analysis_summary TEXT,
+error_message    VARCHAR(255),
+created_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+updated_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+CONSTRAINT pk_ai_files PRIMARY KEY (ai_file_id),
+-- Jobs to pick up again after a restart (flask requeue-document-jobs)
+INDEX idx_ai_files__status (status, updated_at),
+-- Earlier analyses of the same extracted text
+INDEX idx_ai_files__content_hash (content_hash, status),
+CONSTRAINT fk_ai_files__user FOREIGN KEY (user_id)
+REFERENCES users(user_id) ON UPDATE CASCADE ON DELETE CASCADE
+) ENGINE=InnoDB;
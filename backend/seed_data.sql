@@ -1,7 +1,7 @@
 -- seed_data.sql (aligned with normalized schema)
 USE edusmart;
 
--- example 'hashed:123456'
+-- example 'hashed:123456' (legacy format: upgraded to a real hash on first login, or via `flask hash-legacy-passwords`)
 INSERT INTO users (username, password_hash, full_name, role, email, avatar)
 VALUES
 ('admin',   'hashed:123456', 'Administrator', 'admin',   'admin@example.com',   '👨‍💼'),
@@ -0,0 +1,87 @@
+import pytest
+from flask import g
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the app under test; override this fixture in a test module to add more."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    """An app on an in-memory SQLite database, with every local file under tmp_path."""
+    from config import DevelopmentConfig
+
+    settings = {
+        'AI_CACHE_ENABLED': False,
+        'COURSEWARE_INDEX_PATH': str(tmp_path / 'courseware_index.db'),
+        'DEEPSEEK_API_KEY': 'test-key',
+        'DOCUMENT_EXTRACT_PROCESSES': 0,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads')
+    }
+    settings.update(app_config)
+    # Config values are read from the environment at import time, so patch the class
+    for key, value in settings.items():
+        monkeypatch.setattr(DevelopmentConfig, key, value, raising=False)
+    monkeypatch.setenv('DEV_DATABASE_URL', 'sqlite://')
+
+    from app import create_app, db
+
+    app = create_app('default')
+    app.config['TESTING'] = True
+
+    # Requests reuse the app context pushed below, so `g` would outlive each request
+    @app.teardown_request
+    def clear_request_globals(exc):
+        for name in list(g):
+            g.pop(name)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """auth_headers(user_id, role) -> Authorization header of a valid access token."""
+    def make(user_id, role):
+        token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+
+@pytest.fixture
+def make_class(app):
+    """make_class(students, teacher_id=None) -> (Class, [student User]) with a profile per student."""
+    from app import db
+    from app.models import Class, StudentProfile, User
+
+    created = {'classes': 0, 'students': 0}
+
+    def make(students, teacher_id=None):
+        created['classes'] += 1
+        class_obj = Class(name=f"Class {created['classes']}", grade='Grade 5', teacher_id=teacher_id)
+        db.session.add(class_obj)
+        db.session.flush()
+        users = []
+        for _ in range(students):
+            created['students'] += 1
+            number = created['students']
+            user = User(username=f'student{number}', password_hash='x', full_name=f'Student {number}', role='student')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(StudentProfile(user_id=user.id, class_id=class_obj.id, student_no=f'S{number:04d}'))
+            users.append(user)
+        class_obj.students_count = students
+        db.session.commit()
+        return class_obj, users
+    return make
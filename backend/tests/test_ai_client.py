@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubDeepSeek(BaseHTTPRequestHandler):
+    """Chat completions stub: replays `server.statuses`, then answers 200."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+
+        body = json.dumps({
+            'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': 'deepseek-chat',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'Hello'}}]
+        } if status == 200 else {'error': {'message': 'upstream failure'}}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubDeepSeek)
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.requests = server.active = server.max_active = 0
+    server.statuses = []
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app_config(stub):
+    return {
+        'DEEPSEEK_BASE_URL': f'http://127.0.0.1:{stub.server_port}',
+        'DEEPSEEK_BACKOFF_BASE': 0.01,
+        'DEEPSEEK_BACKOFF_MAX': 0.01,
+        'DEEPSEEK_MAX_CONCURRENCY': 2,
+        'DEEPSEEK_MAX_WAITING': 8
+    }
+
+
+def _ask(service):
+    return service.create_completion([{'role': 'user', 'content': 'Hi'}]).choices[0].message.content
+
+
+def test_calls_share_one_pooled_connection(app, stub):
+    from app.services.ai_service import DeepseekAPIService, get_shared_client
+
+    assert DeepseekAPIService().client is get_shared_client()
+    for _ in range(5):
+        assert _ask(DeepseekAPIService()) == 'Hello'
+    assert stub.requests == 5
+    assert len(stub.connections) == 1
+
+
+def test_transient_failures_are_retried(app, stub):
+    from app.services.ai_service import DeepseekAPIService
+
+    stub.statuses = [500, 503]
+    assert _ask(DeepseekAPIService()) == 'Hello'
+    assert stub.requests == 3
+
+
+def test_retries_give_up_after_max_retries(app, stub):
+    from openai import InternalServerError
+    from app.services.ai_service import DeepseekAPIService
+
+    stub.statuses = [500, 500, 500]
+    with pytest.raises(InternalServerError):
+        _ask(DeepseekAPIService())
+    assert stub.requests == 3
+
+
+def _ask_concurrently(app, count):
+    from app.services.ai_service import DeepseekAPIService
+
+    errors = []
+
+    def call():
+        with app.app_context():
+            try:
+                _ask(DeepseekAPIService())
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrency_is_capped(app, stub):
+    stub.delay = 0.2
+    assert _ask_concurrently(app, 6) == []
+    assert stub.requests == 6
+    assert stub.max_active == 2
+
+
+def test_calls_beyond_the_queue_are_shed(app, stub):
+    from app.services.ai_service import init_deepseek_client
+    from app.utils.resilience import BulkheadFull
+
+    app.config.update(DEEPSEEK_MAX_CONCURRENCY=1, DEEPSEEK_MAX_WAITING=0)
+    init_deepseek_client(app)
+    stub.delay = 0.3
+    errors = _ask_concurrently(app, 3)
+    assert len(errors) == 2
+    assert all(isinstance(error, BulkheadFull) for error in errors)
+    assert stub.requests == 1
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlalchemy import event
+
+
+def _add_assignments(count):
+    from app import db
+    from app.models import Assignment, AssignmentSubmission, Class
+
+    for n in range(count):
+        cls = Class(name=f'Class {n}', grade='Grade 5', students_count=30)
+        db.session.add(cls)
+        db.session.flush()
+        assignment = Assignment(
+            title=f'Assignment {n}', subject='math', due_date=date(2024, 1, 1 + n % 28), class_id=cls.id
+        )
+        db.session.add(assignment)
+        db.session.flush()
+        for student_id in range(3):
+            db.session.add(AssignmentSubmission(assignment_id=assignment.id, student_id=student_id + 1))
+    db.session.commit()
+
+
+def _count_listing_queries(client, headers):
+    from app import db
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get('/api/teacher-tasks/assignments', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def test_assignment_listing_query_count_does_not_grow(client, auth_headers):
+    headers = auth_headers(1, 'teacher')
+    # Warm the token blocklist and inactive-user caches loaded on the first request
+    _count_listing_queries(client, headers)
+
+    _add_assignments(1)
+    single, listing = _count_listing_queries(client, headers)
+    assert len(listing) == 1
+
+    _add_assignments(19)
+    many, listing = _count_listing_queries(client, headers)
+    assert len(listing) == 20
+
+    assert many == single
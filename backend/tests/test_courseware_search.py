@@ -0,0 +1,129 @@
+import pytest
+
+from app import db
+from app.models import AIFile
+from app.services import courseware_search_service
+from app.services.courseware_search_service import (
+    CoursewareIndex, courseware_index, make_snippet, rebuild_courseware_index
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return CoursewareIndex(str(tmp_path / 'index.db'))
+
+
+def _ids(results):
+    return [file_id for file_id, _ in results]
+
+
+def _add_file(user_id, text, name='plan.docx'):
+    ai_file = AIFile(user_id=user_id, file_name=name, file_path=f'/uploads/{name}', text_content=text)
+    db.session.add(ai_file)
+    db.session.commit()
+    return ai_file
+
+
+def test_bm25_ranks_by_term_frequency_length_and_rarity(index):
+    index.add(1, 10, 'fractions fractions fractions worksheet')
+    index.add(2, 10, 'fractions worksheet with a long introduction about many other classroom topics')
+    index.add(3, 10, 'geometry worksheet')
+    index.add(4, 20, 'photosynthesis worksheet')
+
+    assert _ids(index.search('fractions')) == [1, 2]
+    # The rare term outweighs the one every document shares
+    assert _ids(index.search('worksheet photosynthesis'))[0] == 4
+    assert _ids(index.search('worksheet', user_id=20)) == [4]
+    assert index.search('absent') == [] and index.search('   ') == []
+    assert _ids(index.search('worksheet', limit=2)) == _ids(index.search('worksheet'))[:2]
+
+
+def test_add_replaces_and_remove_drops_a_files_postings(index):
+    index.add(1, 10, 'algebra basics')
+    index.add(1, 10, 'calculus basics')
+    assert index.search('algebra') == []
+    assert _ids(index.search('calculus')) == [1]
+    assert index.stats() == {'documents': 1, 'terms': 2, 'tokens': 2}
+
+    index.remove(1)
+    assert index.search('basics') == []
+    assert index.stats()['documents'] == 0
+
+
+def test_rebuild_swaps_in_a_complete_new_index(index, monkeypatch):
+    monkeypatch.setattr(courseware_search_service, 'REBUILD_BATCH', 2)
+    index.add(99, 10, 'stale lesson')
+
+    index.rebuild((file_id, 10, f'lesson number{file_id}') for file_id in range(1, 6))
+    assert index.search('stale') == []
+    assert sorted(_ids(index.search('lesson'))) == [1, 2, 3, 4, 5]
+    assert _ids(index.search('number3')) == [3]
+
+    # The rebuilt index keeps taking incremental updates
+    index.remove(3)
+    assert index.search('number3') == []
+
+
+def test_committed_file_text_is_indexed_and_rollbacks_are_not(app):
+    kept = _add_file(1, 'Quadratic equations lesson')
+    assert _ids(courseware_index.search('quadratic')) == [kept.id]
+
+    db.session.add(AIFile(user_id=1, file_name='gone.docx', file_path='/uploads/gone.docx',
+                          text_content='Trigonometry lesson'))
+    db.session.flush()
+    db.session.rollback()
+    assert courseware_index.search('trigonometry') == []
+
+    kept.text_content = 'Linear equations lesson'
+    db.session.commit()
+    assert courseware_index.search('quadratic') == []
+    assert _ids(courseware_index.search('linear')) == [kept.id]
+
+    db.session.delete(kept)
+    db.session.commit()
+    assert courseware_index.search('linear') == []
+
+
+def test_bulk_delete_schedules_a_rebuild(app, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(courseware_search_service, '_schedule_rebuild', lambda: scheduled.append(True))
+    _add_file(1, 'Poetry unit')
+
+    AIFile.query.filter(AIFile.user_id == 1).delete()
+    db.session.commit()
+    assert scheduled == [True]
+
+    assert rebuild_courseware_index() == 0
+    assert courseware_index.search('poetry') == []
+
+
+def test_rebuild_courseware_index_reads_every_file(app):
+    first = _add_file(1, 'Volcano lesson')
+    second = _add_file(2, 'Volcano quiz')
+    courseware_index.rebuild([])
+    assert courseware_index.search('volcano') == []
+
+    assert rebuild_courseware_index() == 2
+    assert sorted(_ids(courseware_index.search('volcano'))) == sorted([first.id, second.id])
+
+
+def test_search_endpoint_scopes_teachers_to_their_files(client, auth_headers):
+    own = _add_file(1, 'Intro. ' + 'filler text ' * 40 + 'The water cycle explained.', name='water.docx')
+    _add_file(2, 'Water cycle worksheet', name='other.docx')
+
+    response = client.get('/api/ai/documents/search?q=water', headers=auth_headers(1, 'teacher'))
+    assert response.status_code == 200
+    (result,) = response.get_json()['results']
+    assert result['file_id'] == own.id and result['file_name'] == 'water.docx'
+    assert 'water cycle' in result['snippet'].lower() and result['snippet'].startswith('…')
+
+    response = client.get('/api/ai/documents/search?q=water', headers=auth_headers(3, 'admin'))
+    assert len(response.get_json()['results']) == 2
+    assert client.get('/api/ai/documents/search', headers=auth_headers(1, 'teacher')).status_code == 400
+
+
+def test_make_snippet_centres_on_the_first_match():
+    text = 'a ' * 300 + 'keyword here'
+    snippet = make_snippet(text, 'keyword', width=50)
+    assert 'keyword' in snippet and snippet.startswith('…')
+    assert make_snippet('short text', 'missing') == 'short text'
@@ -0,0 +1,54 @@
+import io
+import time
+
+import pytest
+
+from app.services import document_service
+from app.services.document_service import ExtractionPool
+
+
+def run_test_extractor(file_type, source):
+    """Stands in for document_service._run_extractor in pool processes (which cannot see test registrations)."""
+    if file_type == 'hang':
+        time.sleep(600)
+    return source.decode('utf-8'), 0.0
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(document_service, '_run_extractor', run_test_extractor)
+    for file_type in ('hang', 'echo'):
+        monkeypatch.setitem(document_service.EXTRACTORS, file_type, (None, True))
+    pool = ExtractionPool(processes=1, timeout=3)
+    yield pool
+    pool.configure(processes=0)
+
+
+def test_pooled_extraction_returns_text(pool):
+    assert pool.extract(io.BytesIO(b'plain text'), 'echo') == 'plain text'
+    assert pool.metrics.stats()['echo']['count'] == 1
+
+
+def test_hanging_extraction_is_killed_and_the_pool_recovers(pool):
+    pool.extract(io.BytesIO(b'warm up'), 'echo')
+    pool.timeout = 0.5
+    stuck = list(pool._executor._processes.values())
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            pool.extract(io.BytesIO(b''), 'hang')
+    for process in stuck:
+        process.join(timeout=5)
+        assert not process.is_alive()
+
+    # With the only pool process still stuck, this would time out as well
+    pool.timeout = 30
+    start = time.perf_counter()
+    assert pool.extract(io.BytesIO(b'after the timeouts'), 'echo') == 'after the timeouts'
+    assert time.perf_counter() - start < 15
+    assert pool.metrics.stats()['hang']['failures'] == 2
+
+
+def test_unknown_file_type_is_rejected(pool):
+    with pytest.raises(ValueError):
+        pool.extract(io.BytesIO(b''), 'exe')
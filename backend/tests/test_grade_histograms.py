@@ -0,0 +1,115 @@
+from app import db
+from app.models import Grade, GradeHistogram, StudentProfile
+from app.services import grade_histogram_service
+from app.services.grade_histogram_service import (
+    apply_student_change, read_class_histogram, rebuild_histograms, snapshot_student
+)
+
+
+def _set_grade(student, subject, score, term='t1'):
+    before = snapshot_student(student.id, term)
+    grade = Grade.query.filter_by(student_id=student.id, subject=subject, term=term).first()
+    if grade is None:
+        db.session.add(Grade(student_id=student.id, subject=subject, term=term, score=score))
+    else:
+        grade.score = score
+    class_id = StudentProfile.query.filter_by(user_id=student.id).one().class_id
+    apply_student_change(student.id, class_id, before, class_id, snapshot_student(student.id, term))
+    db.session.commit()
+
+
+def _stored_rows(class_id, term='t1'):
+    return GradeHistogram.query.filter_by(class_id=class_id, term=term).count()
+
+
+def test_grade_writes_move_students_between_buckets(app, make_class):
+    class_obj, (first, second) = make_class(2)
+    _set_grade(first, 'math', 80)
+    _set_grade(second, 'math', 80)
+    _set_grade(second, 'chinese', 60)
+    _set_grade(first, 'math', 90.4)
+
+    histogram = read_class_histogram(class_obj.id, 't1')
+    assert histogram['math'][80] == 1 and histogram['math'][90] == 1
+    assert histogram['chinese'][60] == 1
+    # Averages: first 90.4 -> 90, second (80 + 60) / 2 = 70
+    assert histogram['average'][90] == 1 and histogram['average'][70] == 1
+    assert sum(histogram['math']) == 2
+    assert rebuild_histograms(class_id=class_obj.id, dry_run=True) == []
+
+
+def test_moving_a_student_updates_both_classes(app, make_class):
+    old_class, (student,) = make_class(1)
+    new_class, _ = make_class(0)
+    _set_grade(student, 'english', 75)
+
+    before = snapshot_student(student.id)
+    profile = StudentProfile.query.filter_by(user_id=student.id).one()
+    profile.class_id = new_class.id
+    # The new class has no histogram yet: it is built from the flushed state
+    apply_student_change(student.id, old_class.id, before, new_class.id, snapshot_student(student.id))
+    db.session.commit()
+
+    assert read_class_histogram(old_class.id, 't1')['english'][75] == 0
+    assert read_class_histogram(new_class.id, 't1')['english'][75] == 1
+
+
+def test_reading_a_term_without_grades_writes_nothing(app, make_class):
+    class_obj, (student,) = make_class(1)
+    _set_grade(student, 'math', 50)
+
+    histogram = read_class_histogram(class_obj.id, 'no-such-term')
+    assert all(sum(counts) == 0 for counts in histogram.values())
+    assert _stored_rows(class_obj.id, 'no-such-term') == 0
+
+
+def test_legacy_grades_are_materialized_on_first_read(app, make_class):
+    class_obj, (student,) = make_class(1)
+    db.session.add(Grade(student_id=student.id, subject='math', term='t1', score=66))
+    db.session.commit()
+
+    assert read_class_histogram(class_obj.id, 't1')['math'][66] == 1
+    assert _stored_rows(class_obj.id) == 101 * 4
+
+
+def test_concurrent_first_write_patches_the_other_writers_histogram(app, make_class, monkeypatch):
+    class_obj, (student,) = make_class(1)
+    db.session.add(Grade(student_id=student.id, subject='math', term='t1', score=40))
+    db.session.commit()
+    # Another request materialized the histogram (without this change) after our existence check
+    grade_histogram_service._insert_class_histogram(
+        class_obj.id, 't1', grade_histogram_service._compute_class_histogram(class_obj.id, 't1')
+    )
+    db.session.commit()
+    monkeypatch.setattr(grade_histogram_service, '_histogram_exists', lambda class_id, term: False)
+
+    _set_grade(student, 'math', 45)
+
+    histogram = read_class_histogram(class_obj.id, 't1')
+    assert histogram['math'][40] == 0 and histogram['math'][45] == 1
+    assert _stored_rows(class_obj.id) == 101 * 4
+
+
+def test_savepoint_rollback_keeps_pending_invalidations(app, make_class):
+    class_obj, (student,) = make_class(1)
+    _set_grade(student, 'math', 40)
+    pending = {'pending-token'}
+    db.session.info['dashboard_invalidations'] = pending
+
+    assert grade_histogram_service._materialize_class_histogram(class_obj.id, 't1') is None
+    assert db.session.info['dashboard_invalidations'] is pending
+    db.session.rollback()
+    assert 'dashboard_invalidations' not in db.session.info
+
+
+def test_rebuild_reports_and_repairs_drift(app, make_class):
+    class_obj, (student,) = make_class(1)
+    _set_grade(student, 'math', 70)
+    GradeHistogram.query.filter_by(class_id=class_obj.id, series='math', bucket=70).update({'student_count': 5})
+    db.session.commit()
+
+    drift = rebuild_histograms(class_id=class_obj.id)
+    assert [(entry['series'], entry['bucket'], entry['stored'], entry['actual']) for entry in drift] == [
+        ('math', 70, 5, 1)
+    ]
+    assert rebuild_histograms(class_id=class_obj.id, dry_run=True) == []
@@ -0,0 +1,112 @@
+import io
+
+import pytest
+
+from app import db
+from app.models import Grade, StudentProfile
+from app.services import grade_import_service
+from app.services.grade_import_service import import_grades, iter_csv_rows, iter_upload_rows, upsert_grades
+
+
+def _csv(text):
+    return iter_csv_rows(io.BytesIO(text.encode('utf-8')))
+
+
+def _scores():
+    return {(grade.student_id, grade.subject, grade.term): float(grade.score) for grade in Grade.query.all()}
+
+
+def test_long_and_wide_rows_are_imported(app, make_class):
+    _, (first, second) = make_class(2)
+    report = import_grades(_csv(
+        'username,subject,score\n'
+        f'{first.username},math,91\n'
+    ), default_term='t1')
+    assert report['imported'] == 1 and report['grades'] == 1 and report['complete']
+
+    report = import_grades(_csv(
+        'student_no,chinese,math,english\n'
+        'S0002,80,70,\n'
+    ), default_term='t1')
+    assert report['imported'] == 1 and report['grades'] == 2
+    assert _scores() == {
+        (first.id, 'math', 't1'): 91.0,
+        (second.id, 'chinese', 't1'): 80.0,
+        (second.id, 'math', 't1'): 70.0
+    }
+    profile = StudentProfile.query.filter_by(user_id=second.id).one()
+    assert float(profile.avg_grade) == 75.0
+
+
+def test_existing_grades_are_updated_and_bad_rows_reported(app, make_class):
+    _, (student,) = make_class(1)
+    import_grades(_csv(f'student_id,math\n{student.id},60\n'), default_term='t1')
+    report = import_grades(_csv(
+        'student_id,math\n'
+        f'{student.id},65\n'
+        'abc,70\n'
+        '9999,70\n'
+        f'{student.id},101\n'
+    ), default_term='t1')
+    assert report['rows'] == 4 and report['imported'] == 1
+    assert [error['row'] for error in report['errors']] == [3, 4, 5]
+    assert _scores() == {(student.id, 'math', 't1'): 65.0}
+
+
+def test_failed_chunk_is_reported_and_later_chunks_still_import(app, make_class, monkeypatch):
+    _, students = make_class(6)
+    monkeypatch.setattr(grade_import_service, 'IMPORT_CHUNK_SIZE', 2)
+    recompute = grade_import_service.recompute_student_averages
+    calls = []
+
+    def failing_second_chunk(student_ids, term):
+        calls.append(student_ids)
+        if len(calls) == 2:
+            raise RuntimeError('deadlock')
+        return recompute(student_ids, term)
+
+    monkeypatch.setattr(grade_import_service, 'recompute_student_averages', failing_second_chunk)
+    rows = 'username,math\n' + ''.join(f'{student.username},50\n' for student in students)
+    report = import_grades(_csv(rows), default_term='t1')
+
+    assert report['imported'] == 4
+    assert [error['row'] for error in report['errors']] == [4, 5]
+    assert all('deadlock' in error['message'] for error in report['errors'])
+    assert {student_id for student_id, _, _ in _scores()} == {s.id for s in students[:2] + students[4:]}
+
+
+def test_unreadable_file_keeps_rows_read_before_the_problem(app, make_class, monkeypatch):
+    _, students = make_class(3)
+    monkeypatch.setattr(grade_import_service, 'IMPORT_CHUNK_SIZE', 1)
+    good = ''.join(f'{student.username},50\n' for student in students)
+    # Blank padding rows push the undecodable byte past the reader's first decoded block
+    data = ('username,math\n' + good + (',\n' * 20000)).encode('utf-8') + b'\xff\xfe,1\n'
+    report = import_grades(iter_csv_rows(io.BytesIO(data)), default_term='t1')
+
+    assert not report['complete']
+    assert report['imported'] == 3
+    assert 'could not be read' in report['errors'][-1]['message']
+    assert len(_scores()) == 3
+
+
+def test_corrupt_workbook_is_reported(app):
+    report = import_grades(iter_upload_rows('grades.xlsx', io.BytesIO(b'not a zip file')))
+    assert not report['complete']
+    assert report['imported'] == 0 and report['error_count'] == 1
+
+
+def test_unsupported_extension_is_rejected():
+    with pytest.raises(ValueError):
+        iter_upload_rows('grades.txt', io.BytesIO(b''))
+
+
+def test_per_row_merge_fallback(app, make_class, monkeypatch):
+    _, (student,) = make_class(1)
+    monkeypatch.setattr(db.engine.dialect, 'name', 'oracle')
+    upsert_grades([{'student_id': student.id, 'subject': 'math', 'term': 't1', 'score': 40}])
+    upsert_grades([
+        {'student_id': student.id, 'subject': 'math', 'term': 't1', 'score': 45},
+        {'student_id': student.id, 'subject': 'english', 'term': 't1', 'score': 88}
+    ])
+    db.session.commit()
+    assert _scores() == {(student.id, 'math', 't1'): 45.0, (student.id, 'english', 't1'): 88.0}
@@ -0,0 +1,104 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+from app.models import Assignment, Notice, User
+from app.utils.helpers import MAX_PAGE_LIMIT, decode_cursor, encode_cursor
+
+
+def _walk(client, url, headers, limit):
+    """Follow next_cursor from the first page to the last; returns (ids, page count)."""
+    ids, pages, cursor = [], 0, None
+    while True:
+        query = f'{url}?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body['items']) <= limit
+        ids.extend(item['id'] for item in body['items'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    columns = [Notice.date, Notice.created_at, Notice.id]
+    values = [date(2024, 3, 1), datetime(2024, 3, 1, 8, 30, 15, 250), 42]
+    cursor = encode_cursor(values)
+    assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+    assert decode_cursor(cursor, columns) == values
+    assert decode_cursor(encode_cursor([None, 7]), [Assignment.due_date, Assignment.id]) == [None, 7]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    encode_cursor([1])[:-2] + '%%',
+    encode_cursor([1, 2]),
+    encode_cursor(['yesterday', '2024-03-01T08:30:00', 1]),
+    encode_cursor(['2024-03-01', '2024-03-01T08:30:00', 'one']),
+    encode_cursor({'date': '2024-03-01'}),
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor, [Notice.date, Notice.created_at, Notice.id])
+
+
+def test_notice_pages_are_stable_with_equal_sort_keys(client, auth_headers):
+    same_day, same_time = date(2024, 3, 1), datetime(2024, 3, 1, 9, 0)
+    for n in range(7):
+        db.session.add(Notice(title=f'Notice {n}', content='text', date=same_day, created_at=same_time))
+    for n in range(3):
+        db.session.add(Notice(title=f'Older {n}', content='text', date=date(2024, 2, 1), created_at=same_time))
+    db.session.commit()
+    headers = auth_headers(1, 'admin')
+
+    full = [notice['id'] for notice in client.get('/api/admin/notices', headers=headers).get_json()]
+    paged, pages = _walk(client, '/api/admin/notices', headers, 3)
+    assert paged == full and len(set(paged)) == 10
+    assert pages == 4
+
+
+def test_user_pages_are_stable_with_equal_sort_keys(client, auth_headers):
+    created = datetime(2024, 1, 1)
+    for n in range(5):
+        db.session.add(User(username=f'user{n}', password_hash='x', full_name=f'User {n}', role='teacher',
+                            created_at=created))
+    db.session.commit()
+    headers = auth_headers(1, 'admin')
+
+    full = [user['id'] for user in client.get('/api/admin/users', headers=headers).get_json()]
+    paged, _ = _walk(client, '/api/admin/users', headers, 2)
+    assert paged == full and len(paged) == 5
+
+
+def test_assignment_pages_include_undated_rows_last(client, auth_headers):
+    for n in range(4):
+        db.session.add(Assignment(title=f'Dated {n}', subject='math', due_date=date(2024, 5, 1)))
+    for n in range(3):
+        db.session.add(Assignment(title=f'Undated {n}', subject='math'))
+    db.session.commit()
+    headers = auth_headers(1, 'teacher')
+
+    paged, _ = _walk(client, '/api/teacher-tasks/assignments', headers, 2)
+    titles = {a.id: a.title for a in Assignment.query.all()}
+    assert len(paged) == len(set(paged)) == 7
+    assert [titles[i].split()[0] for i in paged] == ['Dated'] * 4 + ['Undated'] * 3
+
+
+def test_bad_cursor_and_limit_return_400(client, auth_headers):
+    headers = auth_headers(1, 'admin')
+    for url in ('/api/admin/notices', '/api/admin/users'):
+        assert client.get(f'{url}?cursor=garbage', headers=headers).status_code == 400
+        assert client.get(f'{url}?limit=0', headers=headers).status_code == 400
+        assert client.get(f'{url}?limit=ten', headers=headers).status_code == 400
+
+
+def test_limit_is_capped(client, auth_headers):
+    for n in range(MAX_PAGE_LIMIT + 5):
+        db.session.add(Notice(title=f'Notice {n}', content='text', date=date(2024, 3, 1)))
+    db.session.commit()
+
+    body = client.get('/api/admin/notices?limit=100000', headers=auth_headers(1, 'admin')).get_json()
+    assert len(body['items']) == MAX_PAGE_LIMIT and body['next_cursor']
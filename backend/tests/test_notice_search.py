@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Notice
+from app.services import notice_search_service
+from app.services.notice_search_service import apply_search, tokenize, uses_fulltext
+
+
+@pytest.fixture(autouse=True)
+def unchecked_fulltext(monkeypatch):
+    monkeypatch.setattr(notice_search_service, '_fulltext_available', None)
+
+
+def _add_notice(title, content='details'):
+    notice = Notice(title=title, content=content, date=date(2024, 3, 1))
+    db.session.add(notice)
+    db.session.commit()
+    return notice.id
+
+
+def _search(text):
+    return {notice.id for notice in apply_search(Notice.query, text).all()}
+
+
+def test_tokenize_splits_words_and_cjk_bigrams():
+    assert tokenize('Exam-Week 2024') == ['exam', 'week', '2024']
+    assert tokenize('期末考试') == ['期', '末', '考', '试', '期末', '末考', '考试']
+
+
+def test_in_process_index_requires_every_query_token(app):
+    exam = _add_notice('Final exam schedule', '期末考试安排')
+    trip = _add_notice('School trip', 'Bring a packed lunch')
+    assert not uses_fulltext()
+
+    assert _search('exam') == {exam}
+    assert _search('exam trip') == set()
+    assert _search('考试') == {exam}
+    assert _search('LUNCH') == {trip}
+    assert _search('+-*') == set()
+
+
+def test_mysql_without_the_fulltext_index_falls_back(app, monkeypatch):
+    checks = []
+    monkeypatch.setattr(db.engine.dialect, 'name', 'mysql')
+    monkeypatch.setattr(notice_search_service, '_has_fulltext_index', lambda: checks.append(True) or False)
+    notice_id = _add_notice('Parent meeting')
+
+    assert _search('meeting') == {notice_id}
+    assert _search('parent') == {notice_id}
+    # The index is looked up once per process
+    assert checks == [True]
@@ -0,0 +1,122 @@
+import io
+import zipfile
+
+import docx
+
+from app.utils.docx_text import CELL_SEPARATOR, iter_docx_text
+from app.utils.pptx_text import iter_pptx_text
+
+
+def _docx_bytes(build):
+    document = docx.Document()
+    build(document)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_docx_paragraphs_and_tables_in_document_order():
+    def build(document):
+        document.add_paragraph('Lesson plan')
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = 'Week'
+        table.cell(0, 1).text = 'Topic'
+        table.cell(1, 0).text = '1'
+        table.cell(1, 1).text = 'Fractions'
+        document.add_paragraph('')
+        document.add_paragraph('Homework: page 12')
+
+    assert list(iter_docx_text(_docx_bytes(build))) == [
+        'Lesson plan',
+        f'Week{CELL_SEPARATOR}Topic',
+        f'1{CELL_SEPARATOR}Fractions',
+        'Homework: page 12'
+    ]
+
+
+def test_docx_nested_tables_and_multi_paragraph_cells():
+    def build(document):
+        table = document.add_table(rows=1, cols=2)
+        outer = table.cell(0, 0)
+        outer.text = 'Goals'
+        outer.add_paragraph('Second goal')
+        inner = table.cell(0, 1).add_table(rows=1, cols=2)
+        inner.cell(0, 0).text = 'a'
+        inner.cell(0, 1).text = 'b'
+
+    assert list(iter_docx_text(_docx_bytes(build))) == [
+        f'Goals Second goal{CELL_SEPARATOR}a{CELL_SEPARATOR}b'
+    ]
+
+
+def test_docx_headers_and_footers_wrap_the_body():
+    def build(document):
+        section = document.sections[0]
+        section.header.paragraphs[0].text = 'School letterhead'
+        section.footer.paragraphs[0].text = 'Page footer'
+        document.add_paragraph('Body text')
+        # A second section repeating the same header is reported once
+        second = document.add_section()
+        second.header.is_linked_to_previous = False
+        second.header.paragraphs[0].text = 'School letterhead'
+        document.add_paragraph('More body text')
+
+    assert list(iter_docx_text(_docx_bytes(build))) == [
+        'School letterhead', 'Body text', 'More body text', 'Page footer'
+    ]
+
+
+def test_docx_from_a_path(tmp_path):
+    path = tmp_path / 'plan.docx'
+    document = docx.Document()
+    document.add_paragraph('From disk')
+    document.save(path)
+    assert list(iter_docx_text(str(path))) == ['From disk']
+
+
+_PML = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+_DML = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def _slide_xml(paragraphs):
+    body = ''.join(
+        '<a:p>' + ''.join(
+            '<a:br/>' if run is None else f'<a:r><a:t>{run}</a:t></a:r>' for run in runs
+        ) + '</a:p>'
+        for runs in paragraphs
+    )
+    return (
+        f'<p:sld xmlns:p="{_PML}" xmlns:a="{_DML}"><p:cSld><p:spTree><p:sp><p:txBody>'
+        f'{body}</p:txBody></p:sp></p:spTree></p:cSld></p:sld>'
+    )
+
+
+def _pptx_bytes(slides, order):
+    """slides: {file name: paragraphs}; order: file names in presentation order."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        rels = ''.join(
+            f'<Relationship Id="rId{n}" Type="{_REL}/slide" Target="slides/{name}"/>'
+            for n, name in enumerate(order, 1)
+        )
+        archive.writestr('ppt/_rels/presentation.xml.rels', f'<Relationships xmlns="{_PKG_REL}">{rels}</Relationships>')
+        ids = ''.join(f'<p:sldId id="{255 + n}" r:id="rId{n}"/>' for n in range(1, len(order) + 1))
+        archive.writestr(
+            'ppt/presentation.xml',
+            f'<p:presentation xmlns:p="{_PML}" xmlns:r="{_REL}"><p:sldIdLst>{ids}</p:sldIdLst></p:presentation>'
+        )
+        for name, paragraphs in slides.items():
+            archive.writestr(f'ppt/slides/{name}', _slide_xml(paragraphs))
+    buffer.seek(0)
+    return buffer
+
+
+def test_pptx_slides_follow_presentation_order():
+    source = _pptx_bytes(
+        {'slide1.xml': [['Second slide']], 'slide2.xml': [['Title'], ['Line one', None, 'line two'], []]},
+        order=['slide2.xml', 'slide1.xml']
+    )
+    assert list(iter_pptx_text(source)) == ['Title', 'Line one\nline two', 'Second slide']
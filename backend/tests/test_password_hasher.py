@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from app.services.password_service import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(cost=1000, workers=1, queue_size=1, timeout=0.2)
+    yield hasher
+    hasher.configure()
+
+
+def _drain(hasher):
+    """Wait until everything submitted so far has run (one worker, FIFO)."""
+    executor, _ = hasher._pool()
+    executor.submit(lambda: None).result(timeout=5)
+
+
+def test_hash_and_verify(hasher):
+    stored = hasher.hash('secret')
+    assert hasher.verify(stored, 'secret')
+    assert not hasher.verify(stored, 'wrong')
+    assert not hasher.needs_rehash(stored)
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes(hasher):
+    release = threading.Event()
+    try:
+        # Running on the only worker; the caller gives up, the work does not
+        with pytest.raises(PasswordHasherBusy, match='timed out'):
+            hasher._run(release.wait, 5)
+        # Queued behind it and cancelled on timeout, which frees its slot
+        with pytest.raises(PasswordHasherBusy, match='timed out'):
+            hasher._run(release.wait, 5)
+        with pytest.raises(PasswordHasherBusy, match='timed out'):
+            hasher._run(release.wait, 5)
+        hasher.configure(queue_size=0)
+        with pytest.raises(PasswordHasherBusy, match='timed out'):
+            hasher._run(release.wait, 5)
+        # The only slot is still held by the unfinished hash
+        with pytest.raises(PasswordHasherBusy, match='queue is full'):
+            hasher._run(lambda: 'ok')
+    finally:
+        release.set()
+
+    _drain(hasher)
+    assert hasher._run(lambda: 'ok') == 'ok'
+
+
+def test_slots_are_released_after_completed_work(hasher):
+    for _ in range(5):
+        assert hasher._run(lambda: 'ok') == 'ok'
+    _, slots = hasher._pool()
+    assert all(slots.acquire(blocking=False) for _ in range(hasher.workers + hasher.queue_size))
@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.services.rate_limit_service import (
+    MemoryRateLimitBackend, SQLiteRateLimitBackend, SlidingWindowLimiter, limiter, parse_limit
+)
+
+
+class FakeClock:
+    def __init__(self, now=6000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend_factory(request, tmp_path):
+    if request.param == 'memory':
+        shared = MemoryRateLimitBackend()
+        return lambda: shared
+    return lambda: SQLiteRateLimitBackend(str(tmp_path / 'rate_limits.db'))
+
+
+def test_parse_limit():
+    assert parse_limit('20/60') == (20, 60)
+    assert parse_limit('5') == (5, 60)
+    assert parse_limit('') is None
+
+
+def test_limit_within_a_window(backend_factory):
+    clock = FakeClock()
+    limiter = SlidingWindowLimiter(backend_factory(), clock=clock)
+    assert [limiter.hit('ip:1', 3, 60)[0] for _ in range(3)] == [True] * 3
+    clock.now += 20
+    assert limiter.hit('ip:1', 3, 60) == (False, 40)
+    # Other keys are counted separately
+    assert limiter.hit('ip:2', 3, 60) == (True, 0)
+
+
+def test_previous_window_is_weighted_by_its_overlap(backend_factory):
+    clock = FakeClock()
+    limiter = SlidingWindowLimiter(backend_factory(), clock=clock)
+    for _ in range(4):
+        limiter.hit('user:alice', 4, 60)
+
+    # Right after the window rolls over, the old hits still count in full
+    clock.now += 60
+    assert limiter.hit('user:alice', 4, 60)[0] is False
+    # Three quarters later only a quarter of them do: 4 * 0.25 + 2 = 3
+    clock.now += 45
+    assert limiter.hit('user:alice', 4, 60)[0] is True
+    # Two windows later everything has expired
+    clock.now += 120
+    assert [limiter.hit('user:alice', 4, 60)[0] for _ in range(4)] == [True] * 4
+
+
+def test_reset_forgets_a_key(backend_factory):
+    limiter = SlidingWindowLimiter(backend_factory(), clock=FakeClock())
+    for _ in range(2):
+        limiter.hit('user:bob', 1, 60)
+    limiter.reset('user:bob')
+    assert limiter.hit('user:bob', 1, 60) == (True, 0)
+
+
+def test_workers_share_counts_through_the_backend(backend_factory):
+    clock = FakeClock()
+    first = SlidingWindowLimiter(backend_factory(), clock=clock)
+    second = SlidingWindowLimiter(backend_factory(), clock=clock)
+    first.hit('ip:9', 2, 60)
+    second.hit('ip:9', 2, 60)
+    assert first.hit('ip:9', 2, 60)[0] is False
+
+
+def test_memory_backend_evicts_least_recently_seen_keys():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    limiter = SlidingWindowLimiter(backend, clock=FakeClock())
+    limiter.hit('a', 1, 60)
+    limiter.hit('b', 1, 60)
+    limiter.hit('a', 1, 60)
+    limiter.hit('c', 1, 60)
+    assert list(backend._data) == ['a', 'c']
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def app_config(request, tmp_path):
+    backend = 'memory' if request.param == 'memory' else f"sqlite:///{tmp_path / 'limits' / 'rate_limits.db'}"
+    return {
+        'RATE_LIMIT_BACKEND': backend,
+        'LOGIN_RATE_LIMIT_PER_IP': '4/60',
+        'LOGIN_RATE_LIMIT_PER_USERNAME': '2/60'
+    }
+
+
+def _login(client, username):
+    return client.post('/api/auth/login', json={'username': username, 'password': 'wrong'})
+
+
+def test_rejected_logins_never_query_the_database(app, client):
+    sqlite = app.config['RATE_LIMIT_BACKEND'].startswith('sqlite')
+    assert isinstance(limiter.backend, SQLiteRateLimitBackend if sqlite else MemoryRateLimitBackend)
+    assert [_login(client, 'eve').status_code for _ in range(2)] == [401, 401]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = _login(client, 'EVE ')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert statements == []
+
+    # Every attempt, rejected or not, counts against the per-IP limit
+    assert _login(client, 'mallory').status_code == 401
+    assert _login(client, 'trent').status_code == 429
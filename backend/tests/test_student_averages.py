@@ -0,0 +1,74 @@
+from sqlalchemy import event, update
+
+from app import db
+from app.models import Grade, StudentProfile
+from app.services.student_average_service import recompute_all_averages, recompute_student_averages
+
+
+def _grade_class(make_class, scores):
+    class_obj, students = make_class(len(scores))
+    for student, student_scores in zip(students, scores):
+        for n, score in enumerate(student_scores):
+            db.session.add(Grade(student_id=student.id, subject=f'subject{n}', term='t1', score=score))
+    db.session.commit()
+    return class_obj, students
+
+
+def _scramble_averages():
+    db.session.execute(update(StudentProfile).values(avg_grade=-1))
+    db.session.commit()
+
+
+def _averages(students):
+    by_user = dict(db.session.query(StudentProfile.user_id, StudentProfile.avg_grade).all())
+    return [None if by_user[s.id] is None else float(by_user[s.id]) for s in students]
+
+
+def _statements(run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_class_scope_is_one_update(app, make_class):
+    class_obj, students = _grade_class(make_class, [[80, 90], [70], []])
+    _, others = _grade_class(make_class, [[50]])
+    _scramble_averages()
+    class_id = class_obj.id
+
+    updated, statements = _statements(lambda: recompute_student_averages(term='t1', class_id=class_id))
+
+    assert updated == 3
+    assert len(statements) == 1 and statements[0].lstrip().startswith('UPDATE')
+    assert _averages(students) == [85.0, 70.0, None]
+    assert _averages(others) == [-1.0]
+
+
+def test_student_list_is_intersected_with_class(app, make_class):
+    class_obj, students = _grade_class(make_class, [[60], [65]])
+    _, others = _grade_class(make_class, [[50]])
+    _scramble_averages()
+
+    updated = recompute_student_averages([students[0].id, others[0].id], term='t1', class_id=class_obj.id)
+
+    assert updated == 1
+    assert _averages(students + others) == [60.0, -1.0, -1.0]
+    assert recompute_student_averages([], term='t1') == 0
+
+
+def test_recompute_all_runs_in_chunks(app, make_class):
+    _, students = _grade_class(make_class, [[10], [20], [30], [40], [50]])
+    _scramble_averages()
+    progress = []
+
+    assert recompute_all_averages(term='t1', chunk_size=2, progress=progress.append) == 5
+    assert progress == [2, 4, 5]
+    assert _averages(students) == [10.0, 20.0, 30.0, 40.0, 50.0]
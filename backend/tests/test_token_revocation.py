@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import RevokedToken, User
+from app.services.password_service import make_hash
+from app.services.token_revocation_service import revocation_list
+from app.utils.bloom import BloomFilter
+
+
+@pytest.fixture
+def app_config():
+    return {'PASSWORD_HASH_COST': 1000}
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocation_list(monkeypatch):
+    # The list is process-wide; rebuild it from this test's database
+    monkeypatch.setattr(revocation_list, '_loaded', False)
+
+
+def _add_user(username, role='teacher'):
+    user = User(username=username, password_hash=make_hash('secret', 'pbkdf2_sha256', 1000),
+                full_name=username.title(), role=role)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _login(client, username):
+    response = client.post('/api/auth/login', json={'username': username, 'password': 'secret'})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_bloom_filter_has_no_false_negatives_and_a_bounded_error_rate():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for n in range(1000):
+        bloom.add(f'member-{n}')
+    assert all(f'member-{n}' in bloom for n in range(1000))
+    false_positives = sum(f'other-{n}' in bloom for n in range(10000))
+    assert false_positives < 10000 * 0.01 * 2
+    assert not bloom.is_saturated()
+    bloom.add('one-too-many')
+    assert bloom.is_saturated()
+
+
+def test_logout_revokes_access_and_refresh_tokens(client):
+    _add_user('alice')
+    tokens = _login(client, 'alice')
+    assert client.get('/api/auth/me', headers=_bearer(tokens['access_token'])).status_code == 200
+
+    response = client.post('/api/auth/logout', headers=_bearer(tokens['access_token']),
+                           json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    assert RevokedToken.query.count() == 2
+
+    assert client.get('/api/auth/me', headers=_bearer(tokens['access_token'])).status_code == 401
+    assert client.post('/api/auth/refresh', headers=_bearer(tokens['refresh_token'])).status_code == 401
+
+
+def test_refresh_issues_a_working_access_token(client):
+    _add_user('bob')
+    tokens = _login(client, 'bob')
+    response = client.post('/api/auth/refresh', headers=_bearer(tokens['refresh_token']))
+    assert response.status_code == 200
+    assert client.get('/api/auth/me', headers=_bearer(response.get_json()['access_token'])).status_code == 200
+    # An access token is not accepted as a refresh token
+    assert client.post('/api/auth/refresh', headers=_bearer(tokens['access_token'])).status_code == 401
+
+
+def test_deactivated_users_tokens_stop_working(client, auth_headers):
+    admin = _add_user('root', role='admin')
+    user = _add_user('carol')
+    tokens = _login(client, 'carol')
+
+    response = client.put(f'/api/admin/users/{user.id}/status', headers=auth_headers(admin.id, 'admin'),
+                          json={'is_active': False})
+    assert response.status_code == 200
+
+    assert client.get('/api/auth/me', headers=_bearer(tokens['access_token'])).status_code == 401
+    assert client.post('/api/auth/refresh', headers=_bearer(tokens['refresh_token'])).status_code == 401
+
+
+def test_unrevoked_tokens_are_checked_without_a_query(client):
+    _add_user('dave')
+    headers = _bearer(_login(client, 'dave')['access_token'])
+    client.get('/api/auth/me', headers=headers)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get('/api/auth/me', headers=headers).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert not [s for s in statements if 'revoked_tokens' in s]
+
+
+def test_revocations_by_other_workers_are_picked_up_on_sync(app):
+    revocation_list.refresh()
+    assert not revocation_list.is_revoked({'jti': 'elsewhere', 'sub': '1'})
+
+    # Written by another worker: this process's filter does not know it yet
+    db.session.add(RevokedToken(jti='elsewhere', token_type='access'))
+    db.session.commit()
+    assert not revocation_list.is_revoked({'jti': 'elsewhere', 'sub': '1'})
+
+    revocation_list.refresh(force=True)
+    assert revocation_list.is_revoked({'jti': 'elsewhere', 'sub': '1'})
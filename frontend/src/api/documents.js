@@ -0,0 +1,46 @@
+import api from './index.js'
+
+// Courseware analysis runs as a background job: submit, then poll until done or failed
+// refresh: analyze again even if identical content was analyzed before
+export const submitDocumentAnalysis = async (file, refresh = false) => {
+  const formData = new FormData()
+  formData.append('file', file)
+  if (refresh) formData.append('refresh', 'true')
+  const res = await api.post('/ai/analyze-document', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  })
+  return res.data
+}
+
+export const getDocumentJob = async (fileId) => {
+  const res = await api.get(`/ai/documents/${fileId}`)
+  return res.data
+}
+
+export const getDocumentAnalysis = async (fileId) => {
+  const res = await api.get(`/ai/documents/${fileId}/result`)
+  return res.data
+}
+
+// Resolves with the analysis once the job is done; rejects when it failed.
+// Polls quickly at first, since already-analyzed documents finish almost at once
+export const waitForDocumentAnalysis = async (fileId, maxIntervalMs = 1500) => {
+  let intervalMs = 200
+  while (true) {
+    const job = await getDocumentJob(fileId)
+    if (job.status === 'done') {
+      return (await getDocumentAnalysis(fileId)).analysis
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Analysis failed')
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+    intervalMs = Math.min(intervalMs * 2, maxIntervalMs)
+  }
+}
+
+// Ranked matches among earlier uploads: [{ file_id, file_name, score, snippet, ... }]
+export const searchCourseware = async (q, limit = 10) => {
+  const res = await api.get('/ai/documents/search', { params: { q, limit } })
+  return res.data.results
+}
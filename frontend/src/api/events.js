@@ -0,0 +1,47 @@
+import api, { refreshAccessToken } from './index.js'
+
+/**
+ * 订阅服务器推送事件（通知变更、仪表盘计数增量）
+ * EventSource 不能设置请求头，token 通过查询参数传递
+ * 服务器在 access token 过期或被吊销时关闭连接，此时刷新 token 后重连
+ * @param {Object} handlers - 事件名 -> 回调(data)，如 { counters, resync, notice_created }
+ * @returns {Function} 取消订阅
+ */
+export const subscribeEvents = (handlers = {}) => {
+    let source = null
+    let closed = false
+
+    const connect = () => {
+        const token = localStorage.getItem('token')
+        const url = `${api.defaults.baseURL}/admin/events/stream?jwt=${encodeURIComponent(token || '')}`
+        source = new EventSource(url)
+
+        Object.entries(handlers).forEach(([name, handler]) => {
+            source.addEventListener(name, (e) => {
+                try {
+                    handler(JSON.parse(e.data))
+                } catch (err) {
+                    console.error(`Failed to handle ${name} event:`, err)
+                }
+            })
+        })
+
+        source.onerror = () => {
+            // 连接被拒绝（如 token 过期）时 EventSource 不会自动重连
+            if (closed || source.readyState !== EventSource.CLOSED) return
+            refreshAccessToken().then(() => {
+                if (!closed) {
+                    connect()
+                    // 断线期间可能错过事件
+                    handlers.resync?.({})
+                }
+            }).catch(() => {})
+        }
+    }
+
+    connect()
+    return () => {
+        closed = true
+        source.close()
+    }
+}
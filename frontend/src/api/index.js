@@ -21,14 +21,48 @@ api.interceptors.request.use(
     }
 );
 
+// 刷新 access token（并发的 401 共用同一次刷新）
+let refreshPromise = null;
+export const refreshAccessToken = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+        return Promise.reject(new Error('No refresh token'));
+    }
+    if (!refreshPromise) {
+        refreshPromise = axios.post(`${api.defaults.baseURL}/auth/refresh`, null, {
+            headers: { Authorization: `Bearer ${refreshToken}` }
+        }).then((response) => {
+            localStorage.setItem('token', response.data.access_token);
+            return response.data.access_token;
+        }).finally(() => {
+            refreshPromise = null;
+        });
+    }
+    return refreshPromise;
+};
+
 // 响应拦截器：处理401错误（token过期）
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
+    async (error) => {
+        const original = error.config;
+        if (error.response?.status === 401 && original && !original._retried
+            && !original.url?.startsWith('/auth/login') && !original.url?.startsWith('/auth/logout')) {
+            // Access token 过期：用 refresh token 换新后重试一次
+            original._retried = true;
+            try {
+                const token = await refreshAccessToken();
+                original.headers.Authorization = `Bearer ${token}`;
+                return api(original);
+            } catch (e) {
+                // 刷新失败，走下面的登出流程
+            }
+        }
         if (error.response?.status === 401) {
             // Token过期或无效，清除本地存储
             const currentPath = window.location.pathname;
             localStorage.removeItem('token');
+            localStorage.removeItem('refresh_token');
             localStorage.removeItem('user');
             
             if (currentPath !== '/login') {
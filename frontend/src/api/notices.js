@@ -2,12 +2,13 @@ import api from './index.js'
 
 /**
  * 获取通知列表
- * @param {Object} filters - 过滤条件 { priority, category }
+ * @param {Object} filters - 过滤条件 { priority, category, q }
  */
 export const getNotices = async (filters = {}) => {
     const params = {}
     if (filters.priority) params.priority = filters.priority
     if (filters.category) params.category = filters.category
+    if (filters.q) params.q = filters.q
     
     const response = await api.get('/admin/notices', { params })
     return response.data
@@ -96,6 +96,7 @@ export const useAuthStore = defineStore('auth', () => {
                     avatar: response.data.user.avatar || '👤'
                 }
                 localStorage.setItem('token', token.value)
+                localStorage.setItem('refresh_token', response.data.refresh_token)
                 localStorage.setItem('user', JSON.stringify(user.value))
 
                 await loadPreferences()
@@ -109,9 +110,17 @@ export const useAuthStore = defineStore('auth', () => {
     }
 
     const logout = () => {
+        // Revoke tokens server-side; local logout proceeds regardless
+        const refreshToken = localStorage.getItem('refresh_token')
+        if (token.value) {
+            api.post('/auth/logout', { refresh_token: refreshToken }, {
+                headers: { Authorization: `Bearer ${token.value}` }
+            }).catch(() => {})
+        }
         token.value = null
         user.value = null
         localStorage.removeItem('token')
+        localStorage.removeItem('refresh_token')
         localStorage.removeItem('user')
     }
 
@@ -125,6 +134,7 @@ export const useAuthStore = defineStore('auth', () => {
         } catch (e) {
             localStorage.removeItem('user')
             localStorage.removeItem('token')
+            localStorage.removeItem('refresh_token')
         }
     }
 